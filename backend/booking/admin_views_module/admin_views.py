@@ -1,22 +1,73 @@
 """
 Views for Location and Room management with admin permissions
 """
+import datetime
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
 from django.contrib.auth.models import User
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
-from ..models import Location, Room, Floor, UserGroup
+from ..models import Booking, Location, Room, Floor, Desk, UserGroup
+from .. import events
+from ..db_router import ReplicaReadsMixin
 from ..models_audit import AuditLog
 from ..serializers.location import LocationSerializer, LocationListSerializer
 from ..serializers.room import RoomSerializer, RoomListSerializer, RoomWithDesksSerializer
+from ..serializers.desk import DeskSerializer, DeskLayoutSerializer
+from ..serializers.dynamic_fields import DynamicFieldsViewSetMixin
+from ..serializers.querysets import annotate_location_counts, annotate_room_counts
 from ..permissions import IsLocationManager, IsRoomManager
+from ..services import heatmap, occupancy, outbox, room_maps
+
+MAX_UTILIZATION_DAYS = 366
+DEFAULT_HEATMAP_GRID = 32
+MAX_HEATMAP_GRID = 128
+
+
+def _date_range(request):
+    """
+    Parse ?start=YYYY-MM-DD&end=YYYY-MM-DD. Defaults to the last 30 days.
+    """
+    p = request.query_params
+    try:
+        end = datetime.date.fromisoformat(p['end']) if p.get('end') else timezone.now().date()
+        start = datetime.date.fromisoformat(p['start']) if p.get('start') else end - datetime.timedelta(days=29)
+    except ValueError:
+        raise ValidationError({'detail': 'start and end must be YYYY-MM-DD dates'})
+    if start > end or (end - start).days >= MAX_UTILIZATION_DAYS:
+        raise ValidationError({'detail': f'start must be before end, at most {MAX_UTILIZATION_DAYS} days apart'})
+    return start, end
+
+
+def _utilization_params(request):
+    """
+    Parse ?start=&end= (see _date_range) and ?granularity=day|week.
+    """
+    start, end = _date_range(request)
+    granularity = request.query_params.get('granularity', 'day')
+    if granularity not in ('day', 'week'):
+        raise ValidationError({'detail': 'granularity must be day or week'})
+    return start, end, granularity
+
+
+def _heatmap_params(request):
+    """
+    Parse ?start=&end= (see _date_range) and ?grid=<cells per side>.
+    """
+    start, end = _date_range(request)
+    grid = request.query_params.get('grid', str(DEFAULT_HEATMAP_GRID))
+    if not grid.isdigit() or not 1 <= int(grid) <= MAX_HEATMAP_GRID:
+        raise ValidationError({'detail': f'grid must be an integer between 1 and {MAX_HEATMAP_GRID}'})
+    return start, end, int(grid)
 
 
-class LocationManagementViewSet(viewsets.ModelViewSet):
+class LocationManagementViewSet(ReplicaReadsMixin, DynamicFieldsViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Location management by Location Managers.
     
@@ -39,10 +90,12 @@ class LocationManagementViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         if user.is_superuser:
-            return Location.objects.all()
-        
-        # Return locations where user is a location manager
-        return user.managed_locations.all()
+            qs = Location.objects.all()
+        else:
+            # Return locations where user is a location manager
+            qs = user.managed_locations.all()
+
+        return annotate_location_counts(self, qs)
     
     def create(self, request, *args, **kwargs):
         """
@@ -174,11 +227,21 @@ class LocationManagementViewSet(viewsets.ModelViewSet):
         Endpoint: GET /api/locations/{id}/rooms/
         """
         location = self.get_object()
-        rooms = Room.objects.filter(floor__location=location)
+        rooms = Room.objects.filter(location=location)
         
         serializer = RoomListSerializer(rooms, many=True, context={'request': request})
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def utilization(self, request, pk=None):
+        """
+        Desk utilization and peak occupancy for this location, read from the rollups.
+        Endpoint: GET /api/admin/locations/{id}/utilization/?start=&end=&granularity=day|week
+        """
+        location = self.get_object()
+        start, end, granularity = _utilization_params(request)
+        return Response(occupancy.location_utilization(location, start, end, granularity))
+
     @action(detail=True, methods=['get'])
     def user_groups(self, request, pk=None):
         """
@@ -227,7 +290,7 @@ class LocationManagementViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class RoomManagementViewSet(viewsets.ModelViewSet):
+class RoomManagementViewSet(ReplicaReadsMixin, DynamicFieldsViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Room management by Room Managers and Location Managers.
     
@@ -252,16 +315,15 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         if user.is_superuser:
-            return Room.objects.all()
+            return annotate_room_counts(self, Room.objects.all())
         
-        # Rooms where user is a room manager
-        managed_rooms = user.managed_rooms.all()
-        
-        # Rooms in locations where user is a location manager
+        # Rooms where user is a room manager, or in locations the user manages
         managed_locations = user.managed_locations.all()
-        location_rooms = Room.objects.filter(floor__location__in=managed_locations)
-        
-        return (managed_rooms | location_rooms).distinct()
+        qs = Room.objects.filter(
+            Q(room_managers=user) | Q(location__in=managed_locations)
+        ).distinct()
+
+        return annotate_room_counts(self, Room.objects.filter(pk__in=qs.values('pk')))
     
     def perform_create(self, serializer):
         """Create a new room"""
@@ -288,7 +350,7 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
     
     def perform_destroy(self, instance):
         """Delete room - only location managers"""
-        if not instance.floor.location.is_location_manager(self.request.user) and not self.request.user.is_superuser:
+        if not instance.get_location().is_location_manager(self.request.user) and not self.request.user.is_superuser:
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('Only location managers can delete rooms')
         
@@ -304,7 +366,7 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
         room = self.get_object()
         
         # Only location managers can appoint room managers
-        if not room.floor.location.is_location_manager(request.user):
+        if not room.get_location().is_location_manager(request.user):
             return Response(
                 {'error': 'Only location managers can appoint room managers'},
                 status=status.HTTP_403_FORBIDDEN
@@ -333,7 +395,7 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
         """
         room = self.get_object()
         
-        if not room.floor.location.is_location_manager(request.user):
+        if not room.get_location().is_location_manager(request.user):
             return Response(
                 {'error': 'Only location managers can remove room managers'},
                 status=status.HTTP_403_FORBIDDEN
@@ -373,7 +435,7 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
         # Validate groups belong to the same location
         if group_ids:
             groups = UserGroup.objects.filter(id__in=group_ids)
-            invalid_groups = groups.exclude(location=room.floor.location)
+            invalid_groups = groups.exclude(location=room.get_location())
             
             if invalid_groups.exists():
                 return Response(
@@ -389,6 +451,26 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
         serializer = RoomSerializer(room, context={'request': request})
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def utilization(self, request, pk=None):
+        """
+        Per-day (or per-week) and per-desk utilization for this room, read from the rollups.
+        Endpoint: GET /api/admin/rooms/{id}/utilization/?start=&end=&granularity=day|week
+        """
+        room = self.get_object()
+        start, end, granularity = _utilization_params(request)
+        return Response(occupancy.room_utilization(room, start, end, granularity))
+
+    @action(detail=True, methods=['get'])
+    def heatmap(self, request, pk=None):
+        """
+        Per-desk utilization, weekday x hour occupancy and a density grid over the room map.
+        Endpoint: GET /api/admin/rooms/{id}/heatmap/?start=&end=&grid=32
+        """
+        room = self.get_object()
+        start, end, grid = _heatmap_params(request)
+        return Response(heatmap.get(room, start, end, grid))
+
     @action(detail=True, methods=['post'], url_path='upload-map')
     def upload_map(self, request, pk=None):
         """
@@ -410,12 +492,20 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Delete old map if exists
+        upload = request.FILES['map_image']
+        # Content-hashed name: the URL can be cached forever
+        upload.name = room_maps.hashed_upload_name(upload)
+
+        # Delete old map and its renditions if they exist
+        room_maps.delete_files(room.map_variants, room.id)
         if room.map_image:
             room.map_image.delete(save=False)
         
-        room.map_image = request.FILES['map_image']
+        room.map_image = upload
+        room.map_variants = {}
         room.save()
+        # Resized / WebP variants are rendered by the worker
+        outbox.enqueue_task("booking.tasks.process_room_map", room_id=room.id)
         
         serializer = RoomSerializer(room, context={'request': request})
         return Response(serializer.data)
@@ -434,13 +524,18 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        room_maps.delete_files(room.map_variants, room.id)
+        room.map_variants = {}
         if room.map_image:
             room.map_image.delete(save=True)
+        else:
+            room.save(update_fields=['map_variants'])
         
         serializer = RoomSerializer(room, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'], url_path='set-maintenance')
+    @transaction.atomic
     def set_maintenance(self, request, pk=None):
         room = self.get_object()
         if not room.is_room_manager(request.user) and not request.user.is_superuser:
@@ -450,6 +545,7 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
             return Response({'is_under_maintenance': True, 'maintenance_by_name': room.maintenance_by_name})
 
         by = request.user.get_full_name() or request.user.username
+        location = room.get_location()
         room.is_under_maintenance = True
         room.maintenance_by_name = by
         room.save(update_fields=['is_under_maintenance', 'maintenance_by_name'])
@@ -462,21 +558,21 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
             target_snapshot={
                 'room': room.name,
                 'room_id': room.id,
-                'location': room.floor.location.name,
-                'location_id': room.floor.location.id,
+                'location': location.name,
+                'location_id': location.id,
                 'maintenance': True,
                 'by': by,
             },
             ip_address=request.META.get('REMOTE_ADDR'),
         )
 
-        event = {'type': 'room_maintenance', 'room_id': room.id, 'enabled': True, 'by': by}
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(f'room_{room.id}', event)
-        async_to_sync(channel_layer.group_send)(f'location_{room.floor.location_id}', event)
+        events.emit(events.RoomMaintenanceChanged(
+            room_id=room.id, location_id=location.id, enabled=True, by=by
+        ))
         return Response({'is_under_maintenance': True, 'maintenance_by_name': by})
 
     @action(detail=True, methods=['post'], url_path='clear-maintenance')
+    @transaction.atomic
     def clear_maintenance(self, request, pk=None):
         room = self.get_object()
         if not room.is_room_manager(request.user) and not request.user.is_superuser:
@@ -486,6 +582,7 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
             return Response({'is_under_maintenance': False, 'maintenance_by_name': ''})
 
         by = request.user.get_full_name() or request.user.username
+        location = room.get_location()
         room.is_under_maintenance = False
         room.maintenance_by_name = ''
         room.save(update_fields=['is_under_maintenance', 'maintenance_by_name'])
@@ -498,16 +595,107 @@ class RoomManagementViewSet(viewsets.ModelViewSet):
             target_snapshot={
                 'room': room.name,
                 'room_id': room.id,
-                'location': room.floor.location.name,
-                'location_id': room.floor.location.id,
+                'location': location.name,
+                'location_id': location.id,
                 'maintenance': False,
                 'by': by,
             },
             ip_address=request.META.get('REMOTE_ADDR'),
         )
 
-        event = {'type': 'room_maintenance', 'room_id': room.id, 'enabled': False, 'by': by}
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(f'room_{room.id}', event)
-        async_to_sync(channel_layer.group_send)(f'location_{room.floor.location_id}', event)
-        return Response({'is_under_maintenance': False, 'maintenance_by_name': ''})
\ No newline at end of file
+        events.emit(events.RoomMaintenanceChanged(
+            room_id=room.id, location_id=location.id, enabled=False, by=by
+        ))
+        return Response({'is_under_maintenance': False, 'maintenance_by_name': ''})
+
+    @action(detail=True, methods=['post'])
+    @transaction.atomic
+    def layout(self, request, pk=None):
+        """
+        Apply a room editor save in one transaction.
+        Endpoint: POST /api/admin/rooms/{id}/layout/
+        Body: {"create": [{"key": "n1", "name": "D9", "pos_x": 0.4, "pos_y": 0.6, "orientation": "left"}],
+               "update": [{"id": 12, "pos_x": 0.3, "pos_y": 0.7}],
+               "delete": [15]}
+        Returns the room's desks and created: {key: id}.
+        """
+        room = self.get_object()
+        if not room.is_room_manager(request.user) and not request.user.is_superuser:
+            return Response({'error': 'Only room managers can edit the desk layout'}, status=status.HTTP_403_FORBIDDEN)
+        location = room.get_location()
+
+        serializer = DeskLayoutSerializer(data=request.data, context={'room': room})
+        serializer.is_valid(raise_exception=True)
+        creates, updates, deletes = (serializer.validated_data[k] for k in ('create', 'update', 'delete'))
+
+        changes = {item['id']: item for item in updates}
+        # Lock every touched desk in id order before writing, so two editors never deadlock
+        locked = {d.id: d for d in room.desks.select_for_update().filter(pk__in=[*changes, *deletes]).order_by('id')}
+        desks = [locked[desk_id] for desk_id in sorted(changes) if desk_id in locked]
+        fields = sorted({f for item in updates for f in item if f != 'id'})
+        for desk in desks:
+            for field, value in changes[desk.id].items():
+                setattr(desk, field, value)
+        if desks and fields:
+            Desk.objects.bulk_update(desks, fields)
+
+        if deletes:
+            # Deleting a desk cascades to its bookings; announce them like any other cancellation
+            doomed = {}
+            for booking_id, desk_id, user_id, start, end in (
+                Booking.objects.filter(desk_id__in=deletes, desk__room=room)
+                .order_by('desk_id', 'id').values_list('id', 'desk_id', 'user_id', 'start_time', 'end_time')
+            ):
+                doomed.setdefault(desk_id, []).append(((booking_id, user_id), (start, end)))
+            for desk_id, bookings in doomed.items():
+                events.emit(events.BookingsChanged(
+                    desk_id=desk_id,
+                    room_id=room.id,
+                    deleted=tuple(pair for pair, _ in bookings),
+                    intervals=tuple(interval for _, interval in bookings),
+                    actor_id=request.user.id,
+                ))
+            room.desks.filter(pk__in=deletes).delete()
+
+        new_desks = Desk.objects.bulk_create([
+            Desk(room=room, location=location, name=item['name'], pos_x=item['pos_x'],
+                 pos_y=item['pos_y'], orientation=item['orientation'])
+            for item in creates
+        ])
+        created = {item['key']: desk.id for item, desk in zip(creates, new_desks) if 'key' in item}
+
+        by = request.user.get_full_name() or request.user.username
+        AuditLog.log(
+            user=request.user,
+            action=AuditLog.Action.ROOM_LAYOUT_CHANGED,
+            target_type='room',
+            target_id=room.id,
+            target_snapshot={
+                'room': room.name,
+                'room_id': room.id,
+                'location': location.name,
+                'location_id': location.id,
+                'created': [{'id': d.id, 'name': d.name} for d in new_desks],
+                'updated': [d.id for d in desks],
+                'deleted': sorted(deletes),
+            },
+            ip_address=request.META.get('REMOTE_ADDR'),
+        )
+
+        events.emit(events.RoomLayoutChanged(
+            room_id=room.id,
+            location_id=location.id,
+            desks=tuple(
+                {'id': d.id, 'name': d.name, 'pos_x': d.pos_x, 'pos_y': d.pos_y, 'orientation': d.orientation}
+                for d in (*desks, *new_desks)
+            ),
+            created_ids=tuple(d.id for d in new_desks),
+            deleted_ids=tuple(sorted(deletes)),
+            by=by,
+        ))
+
+        room_desks = room.desks.select_related('room', 'locked_by', 'booked_by', 'permanent_assignee').order_by('id')
+        return Response({
+            'desks': DeskSerializer(room_desks, many=True).data,
+            'created': created,
+        })
@@ -1,5 +1,33 @@
+from django import forms
 from rest_framework import serializers, viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from ..db_router import ReplicaReadsMixin
 from ..models_audit import AuditLog
+from ..services import audit_archive
+from ..services.export import stream_export
+
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'timestamp': 'timestamp',
+    'username': 'username_snapshot',
+    'action': 'action',
+    'target_type': 'target_type',
+    'target_id': 'target_id',
+    'location_id': 'location_id',
+    'room_id': 'room_id',
+    'desk_id': 'desk_id',
+    'ip_address': 'ip_address',
+    'notes': 'notes',
+    'target_snapshot': 'target_snapshot',
+}
+
+
+def _parse_datetime(param, value):
+    try:
+        return forms.DateTimeField().clean(value)
+    except forms.ValidationError:
+        raise serializers.ValidationError({param: 'Expected a date or ISO 8601 datetime.'})
 
 
 class AuditLogSerializer(serializers.ModelSerializer):
@@ -10,50 +38,91 @@ class AuditLogSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'username_snapshot', 'action', 'action_display',
             'target_type', 'target_id', 'target_snapshot',
+            'location_id', 'room_id', 'desk_id',
             'ip_address', 'timestamp', 'notes',
         ]
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(ReplicaReadsMixin, viewsets.ReadOnlyModelViewSet):
     """
     Read-only audit log.
     Regular users see only their own logs.
-    Staff/superusers can filter by location_id and room_id (stored in snapshot JSON).
+    Staff/superusers can filter by location_id, room_id and desk_id (indexed columns),
+    and add ?archived=true with a start..end range (at most
+    AUDIT_ARCHIVE_MAX_MONTHS months) to include months already moved to the audit archive.
+    GET /api/audit/export/csv/ and /export/ndjson/ stream the filtered log as a file.
     """
     serializer_class = AuditLogSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
+    def _is_staff(self):
+        user = self.request.user
+        return user.is_staff or user.is_superuser
+
+    def get_filters(self):
+        """
+        ORM lookups for the request, shared by the database query and the
+        archive reader. Returns None when the filters cannot match anything.
+        """
         user = self.request.user
         p = self.request.query_params
-        qs = AuditLog.objects.select_related('user')
+        lookups = {}
 
         # Ownership gate
-        if not user.is_staff and not user.is_superuser:
-            qs = qs.filter(user=user)
+        if not self._is_staff():
+            lookups['user_id'] = user.id
 
         # Standard filters (available to all)
         if action := p.get('action'):
-            qs = qs.filter(action=action)
+            lookups['action'] = action
 
         if target_type := p.get('target_type'):
-            qs = qs.filter(target_type=target_type)
+            lookups['target_type'] = target_type
 
         if start := p.get('start'):
-            qs = qs.filter(timestamp__gte=start)
+            lookups['timestamp__gte'] = _parse_datetime('start', start)
 
         if end := p.get('end'):
-            qs = qs.filter(timestamp__lte=end)
+            lookups['timestamp__lte'] = _parse_datetime('end', end)
 
         # Staff-only filters
-        if user.is_staff or user.is_superuser:
+        if self._is_staff():
             if username := p.get('username'):
-                qs = qs.filter(username_snapshot__icontains=username)
+                lookups['username_snapshot__icontains'] = username
+
+            for column in ('location_id', 'room_id', 'desk_id'):
+                if value := p.get(column):
+                    if not value.isdigit():
+                        return None
+                    lookups[column] = int(value)
+
+        return lookups
+
+    def get_queryset(self):
+        lookups = self.get_filters()
+        if lookups is None:
+            return AuditLog.objects.none()
+        return AuditLog.objects.select_related('user').filter(**lookups)
 
-            if location_id := p.get('location_id'):
-                qs = qs.filter(target_snapshot__location_id=location_id)
+    def list(self, request, *args, **kwargs):
+        if not (self._is_staff() and request.query_params.get('archived') in ('1', 'true')):
+            return super().list(request, *args, **kwargs)
 
-            if room_id := p.get('room_id'):
-                qs = qs.filter(target_snapshot__room_id=room_id)
+        lookups = self.get_filters()
+        rows = []
+        if lookups is not None:
+            try:
+                rows = audit_archive.search(lookups, lookups.get('timestamp__gte'), lookups.get('timestamp__lte'))
+            except ValueError as exc:
+                raise serializers.ValidationError({'archived': str(exc)})
+        response = super().list(request, *args, **kwargs)
+        archived = self.get_serializer([AuditLog(**row) for row in rows], many=True).data
+        return Response(list(response.data) + list(archived))
 
-        return qs
\ No newline at end of file
+    @action(detail=False, methods=['get'], url_path=r'export/(?P<fmt>csv|ndjson)')
+    def export(self, request, fmt=None):
+        """
+        Stream the audit log as CSV or NDJSON, with the same filters as the list.
+        Endpoint: GET /api/audit/export/csv/?action=...&start=...&location_id=...
+        """
+        return stream_export(request, self.get_queryset(), EXPORT_COLUMNS, fmt, 'audit-log')
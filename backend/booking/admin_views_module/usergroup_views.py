@@ -99,7 +99,7 @@ class UserGroupViewSet(viewsets.ModelViewSet):
                 
                 # Verify user is a room manager in this location
                 managed_rooms = request.user.managed_rooms.filter(
-                    floor__location=instance.location
+                    location=instance.location
                 )
                 if not managed_rooms.exists():
                     return Response(
@@ -146,7 +146,7 @@ class UserGroupViewSet(viewsets.ModelViewSet):
             # Check if room manager and allowed
             if group.location.allow_room_managers_to_add_group_members:
                 managed_rooms = request.user.managed_rooms.filter(
-                    floor__location=group.location
+                    location=group.location
                 )
                 can_manage = managed_rooms.exists()
         
@@ -186,7 +186,7 @@ class UserGroupViewSet(viewsets.ModelViewSet):
         if not can_manage:
             if group.location.allow_room_managers_to_add_group_members:
                 managed_rooms = request.user.managed_rooms.filter(
-                    floor__location=group.location
+                    location=group.location
                 )
                 can_manage = managed_rooms.exists()
         
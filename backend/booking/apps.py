@@ -1,9 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class BookingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'booking'
 
-def ready(self):
-    import booking.signals
+    def ready(self):
+        from .db_extensions import (
+            backfill_location_columns, create_extensions, create_postgres_indexes, create_token_indexes,
+        )
+        pre_migrate.connect(create_extensions, sender=self)
+        post_migrate.connect(create_postgres_indexes, sender=self)
+        post_migrate.connect(create_token_indexes, sender=self)
+        post_migrate.connect(backfill_location_columns, sender=self)
+
+        # Register the model-change event subscribers (booking.events)
+        from . import subscribers  # noqa: F401
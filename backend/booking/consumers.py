@@ -4,8 +4,18 @@ import redis.asyncio as aioredis
 import json
 import os
 
+from booking_project.renderers import dumps_str, loads
 
-class GlobalUpdatesConsumer(AsyncWebsocketConsumer):
+
+class OutboxBatchMixin:
+    """Unpack the per-group batches sent by services.outbox into their events."""
+
+    async def outbox_batch(self, event):
+        for message in event["events"]:
+            await self.dispatch(message)
+
+
+class GlobalUpdatesConsumer(OutboxBatchMixin, AsyncWebsocketConsumer):
     async def connect(self):
         if self.scope["user"].is_anonymous:  # type: ignore
             await self.close(code=4001)
@@ -31,20 +41,20 @@ class GlobalUpdatesConsumer(AsyncWebsocketConsumer):
 
     async def receive(self, text_data):  # type: ignore
         try:
-            data = json.loads(text_data)
+            data = loads(text_data)
             if data.get("type") == "ping":
-                await self.send(text_data=json.dumps({"type": "pong"}))
+                await self.send(text_data=dumps_str({"type": "pong"}))
         except json.JSONDecodeError:
             pass
 
     async def global_event(self, event):
-        await self.send(text_data=json.dumps(event["data"]))
+        await self.send(text_data=dumps_str(event["data"]))
 
     async def disconnect(self, close_code: int) -> None:  # type: ignore
         await self.channel_layer.group_discard("global_updates", self.channel_name)
 
 
-class LocationConsumer(AsyncWebsocketConsumer):
+class LocationConsumer(OutboxBatchMixin, AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.location_id = None
@@ -62,14 +72,14 @@ class LocationConsumer(AsyncWebsocketConsumer):
 
     async def receive(self, text_data):  # type: ignore
         try:
-            data = json.loads(text_data)
+            data = loads(text_data)
             if data.get("type") == "ping":
-                await self.send(text_data=json.dumps({"type": "pong"}))
+                await self.send(text_data=dumps_str({"type": "pong"}))
         except json.JSONDecodeError:
             pass
 
     async def room_maintenance(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_str({
             "type": "room_maintenance",
             "room_id": event.get("room_id"),
             "enabled": event.get("enabled"),
@@ -77,7 +87,7 @@ class LocationConsumer(AsyncWebsocketConsumer):
         }))
 
     async def room_availability(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_str({
             "type": "room_availability",
             "room_id": event.get("room_id"),
             "available_desk_count": event.get("available_desk_count"),
@@ -88,7 +98,7 @@ class LocationConsumer(AsyncWebsocketConsumer):
             await self.channel_layer.group_discard(self.location_group_name, self.channel_name)
 
 
-class RoomConsumer(AsyncWebsocketConsumer):
+class RoomConsumer(OutboxBatchMixin, AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.user = None
@@ -111,14 +121,14 @@ class RoomConsumer(AsyncWebsocketConsumer):
 
     async def receive(self, text_data):  # type: ignore
         try:
-            data = json.loads(text_data)
+            data = loads(text_data)
         except json.JSONDecodeError:
             return
         if data.get("type") == "ping":
-            await self.send(text_data=json.dumps({"type": "pong"}))
+            await self.send(text_data=dumps_str({"type": "pong"}))
 
     async def desk_status(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_str({
             "type": "desk_status",
             "desk_id": event.get("desk_id"),
             "is_booked": event.get("is_booked"),
@@ -126,7 +136,7 @@ class RoomConsumer(AsyncWebsocketConsumer):
         }))
 
     async def update_bookings(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_str({
             "type": "update_bookings",
             "desk_id": event.get("desk_id"),
             "action": event.get("action"),
@@ -135,7 +145,7 @@ class RoomConsumer(AsyncWebsocketConsumer):
         }))
 
     async def desk_lock(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_str({
             "type": "desk_lock",
             "desk_id": event.get("desk_id"),
             "locked": event.get("locked"),
@@ -143,15 +153,25 @@ class RoomConsumer(AsyncWebsocketConsumer):
         }))
 
     async def room_maintenance(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps_str({
             "type": "room_maintenance",
             "room_id": event.get("room_id"),
             "enabled": event.get("enabled"),
             "by": event.get("by"),
         }))
 
+    async def layout_changed(self, event):
+        await self.send(text_data=dumps_str({
+            "type": "layout_changed",
+            "room_id": event.get("room_id"),
+            "desks": event.get("desks", []),
+            "created_ids": event.get("created_ids", []),
+            "deleted_ids": event.get("deleted_ids", []),
+            "by": event.get("by"),
+        }))
+
     async def room_message(self, event):
-        await self.send(text_data=json.dumps(event.get("data", {})))
+        await self.send(text_data=dumps_str(event.get("data", {})))
 
     async def disconnect(self, close_code):  # type: ignore
         if self.is_connected and self.room_group_name:
@@ -0,0 +1,83 @@
+import sys
+
+from django.db import connections
+
+
+def create_extensions(using='default', **kwargs):
+    """
+    pre_migrate hook: make sure the Postgres extensions our indexes rely on
+    (pg_trgm for the audit username search) exist before tables are built.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+
+def create_postgres_indexes(using='default', verbosity=1, stdout=None, **kwargs):
+    """
+    post_migrate hook: the Postgres-only indexes. They are created here
+    rather than declared in Meta.indexes so the schema still builds on
+    SQLite for local development.
+      - booking_time_brin: cross-desk time-window scans (tasks, rollups);
+        bookings arrive roughly in time order
+      - auditlog_username_trgm: serves username_snapshot__icontains, which
+        compiles to UPPER(col) LIKE ... (needs pg_trgm, see create_extensions)
+    """
+    from .models import Booking
+    from .models_audit import AuditLog
+
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS booking_time_brin ON {qn(Booking._meta.db_table)} '
+            f'USING brin (start_time, end_time) WITH (autosummarize = on)'
+        )
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            if verbosity >= 1:
+                (stdout or sys.stdout).write("pg_trgm is not installed; skipping the audit username index\n")
+            return
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS auditlog_username_trgm ON {qn(AuditLog._meta.db_table)} '
+            f'USING gin (UPPER(username_snapshot) gin_trgm_ops)'
+        )
+
+
+def create_token_indexes(using='default', **kwargs):
+    """
+    post_migrate hook: index simplejwt's OutstandingToken.expires_at, which
+    the package leaves unindexed, for the chunked expired-token cleanup.
+    """
+    connection = connections[using]
+    if 'token_blacklist_outstandingtoken' not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS token_outstanding_expires_idx '
+            'ON token_blacklist_outstandingtoken (expires_at, id)'
+        )
+
+
+def backfill_location_columns(using='default', verbosity=1, stdout=None, **kwargs):
+    """
+    post_migrate hook: fill the denormalized location / room columns on rows
+    written before they existed, so deploying is just `migrate`. A couple of
+    indexed NULL probes once every row has them.
+    """
+    from django.core.management import call_command
+    from django.db.models import Q
+    from .models import Booking, Desk, Room
+
+    missing = (
+        Room.objects.using(using).filter(location__isnull=True).exists()
+        or Desk.objects.using(using).filter(location__isnull=True).exists()
+        or Booking.objects.using(using).filter(Q(room__isnull=True) | Q(location__isnull=True)).exists()
+    )
+    if missing:
+        call_command('backfill_location_columns', missing_only=True, database=using, verbosity=verbosity,
+                     **({'stdout': stdout} if stdout else {}))
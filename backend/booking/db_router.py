@@ -0,0 +1,92 @@
+"""
+Primary / replica routing.
+
+Reads go to a replica only while a request has opted in through
+ReplicaReadsMixin (safe-method requests on read-heavy viewsets). Everything
+else stays on the primary: writes, reads outside such a request (Celery,
+admin, consumers), reads inside transaction.atomic, and the reads of a user
+who wrote within the last REPLICA_PIN_SECONDS, so users see their own
+changes despite replication lag.
+
+With no replicas configured (settings.DATABASE_REPLICAS empty) the router
+sends everything to the primary.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def _pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Send this user's reads to the primary for the next REPLICA_PIN_SECONDS."""
+    cache.set(_pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id) -> bool:
+    return bool(cache.get(_pin_key(user_id)))
+
+
+@contextmanager
+def replica_reads():
+    """Allow reads in this block to use a replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def choose_replica() -> str:
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (
+            settings.DATABASE_REPLICAS
+            and _replica_reads.get()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return choose_replica()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadsMixin:
+    """
+    ViewSet mixin: serve safe-method requests from a replica unless the
+    user wrote recently. Writes made through any view pin the user via
+    middleware.ReadYourWritesMiddleware.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and settings.DATABASE_REPLICAS and not is_pinned(request.user.id):
+            self._replica_token = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -2,15 +2,21 @@
 Email notification service for FlexSpace.
 All emails are sent via Celery tasks to avoid blocking requests.
 
-Setup — add to settings.py:
-    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-    EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.office365.com')
-    EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
-    EMAIL_USE_TLS = True
-    EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
-    EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
-    DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'flexspace@yourcompany.com')
-    FLEXSPACE_BASE_URL = os.getenv('FLEXSPACE_BASE_URL', 'http://localhost:5173')
+Booking writes queue one send_booking_notifications task per operation
+(queue_confirmations / queue_cancellations); it sends every message over one
+SMTP session, collapses a bulk operation into a digest per user and, after a
+partial failure, retries only the messages that were not sent.
+Reminders are claimed in bulk by the sweep_booking_reminders beat task
+(services/reminders.py) and sent by send_booking_reminders.
+
+Settings (booking_project/settings.py, read from the environment):
+    EMAIL_BACKEND, EMAIL_HOST, EMAIL_PORT, EMAIL_USE_TLS, EMAIL_HOST_USER,
+    EMAIL_HOST_PASSWORD, DEFAULT_FROM_EMAIL, FLEXSPACE_BASE_URL
+    BOOKING_EMAILS_ENABLED   — queue booking emails at all
+    EMAIL_DIGEST_THRESHOLD   — bookings per user in one operation that become a digest
+    REMINDER_LEAD_MINUTES    — how long before the start a reminder is sent
+
+Without EMAIL_HOST, emails go to the console backend.
 
 Add to .env:
     EMAIL_HOST=smtp.office365.com
@@ -21,33 +27,146 @@ Add to .env:
     FLEXSPACE_BASE_URL=https://flexspace.yourcompany.com
 """
 
+from itertools import groupby
+
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
 from django.template.loader import render_to_string
 
+from .services import outbox
+
+
+# ─── Queueing ─────────────────────────────────────────────────────────────────
+# Called from the booking write paths. The task is queued through the outbox,
+# so it is only sent once the write commits (and never for a rollback).
+
+def queue_confirmations(bookings):
+    """Email the owners of newly created bookings, one task per write operation."""
+    if settings.BOOKING_EMAILS_ENABLED and bookings:
+        outbox.enqueue_task(
+            "booking.email_notifications.send_booking_notifications",
+            created=[b.id for b in bookings],
+        )
+
+
+def queue_cancellations(bookings, cancelled_by=None):
+    """Email the owners of cancelled bookings. Details are captured now: the rows will be gone."""
+    if settings.BOOKING_EMAILS_ENABLED and bookings:
+        outbox.enqueue_task(
+            "booking.email_notifications.send_booking_notifications",
+            cancelled=[_cancellation_snapshot(b) for b in bookings],
+            cancelled_by=cancelled_by,
+        )
+
+
+class EmailBatchError(Exception):
+    """Some messages of a batch were not sent; failed holds the retry keys given to EmailBatch.add."""
+
+    def __init__(self, failed, total):
+        super().__init__(f"{len(failed)} of {total} emails failed")
+        self.failed = failed
+
+
+class EmailBatch:
+    """
+    Collects messages and sends them over one reused SMTP session on exit,
+    instead of one connection per send_mail. Messages go out one at a time so
+    a failure part-way through is known per message: the rest are still
+    attempted, then EmailBatchError lists the retry keys of the ones that failed.
+    """
+
+    def __init__(self, connection=None):
+        self.connection = connection
+        self.messages = []
+
+    def add(self, message, retry=None):
+        """retry: what to hand back in EmailBatchError.failed if this message is not sent."""
+        if message.to:
+            self.messages.append((message, retry))
+
+    def send(self) -> int:
+        if not self.messages:
+            return 0
+        messages, self.messages = self.messages, []
+        connection = self.connection or get_connection(fail_silently=False)
+        sent, failed, error = 0, [], None
+        with connection:
+            for message, retry in messages:
+                try:
+                    sent += connection.send_messages([message]) or 0
+                except Exception as exc:
+                    failed.append(retry)
+                    error = exc
+        if failed:
+            raise EmailBatchError(failed, len(messages)) from error
+        return sent
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.send()
+
+
+def _retry_kwargs(failed, **kwargs):
+    """Merge the retry keys of failed messages ({"created": [...]}, ...) into task kwargs."""
+    for retry in failed:
+        for name, items in retry.items():
+            kwargs.setdefault(name, []).extend(items)
+    return kwargs
+
 
 # ─── Celery Tasks ─────────────────────────────────────────────────────────────
 
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_booking_notifications(self, created=(), cancelled=(), cancelled_by=None):
+    """
+    Send the emails for one booking write over a single SMTP session. A user
+    with EMAIL_DIGEST_THRESHOLD or more bookings in the operation (a bulk
+    create of many intervals) gets one digest instead of one email each.
+    A retry resends only the messages that failed, so nobody gets a duplicate.
+    """
+    try:
+        from booking.models import Booking
+        threshold = settings.EMAIL_DIGEST_THRESHOLD
+        with EmailBatch() as batch:
+            bookings = (
+                Booking.objects.filter(pk__in=created)
+                .select_related('user', 'desk__room__floor__location')
+                .order_by('user_id', 'start_time')
+            )
+            for _, group in groupby(bookings, key=lambda b: b.user_id):
+                group = list(group)
+                if len(group) >= threshold:
+                    batch.add(_confirmation_digest(group), retry={'created': [b.id for b in group]})
+                else:
+                    for booking in group:
+                        batch.add(_confirmation_message(booking), retry={'created': [booking.id]})
+
+            for _, group in groupby(sorted(cancelled, key=lambda c: c['user_email']), key=lambda c: c['user_email']):
+                group = list(group)
+                if len(group) >= threshold:
+                    batch.add(_cancellation_digest(group, cancelled_by), retry={'cancelled': group})
+                else:
+                    for snapshot in group:
+                        batch.add(_cancellation_message(**snapshot, cancelled_by=cancelled_by),
+                                  retry={'cancelled': [snapshot]})
+    except EmailBatchError as exc:
+        raise self.retry(exc=exc, kwargs=_retry_kwargs(exc.failed, cancelled_by=cancelled_by))
+    except Exception as exc:
+        raise self.retry(exc=exc)
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def send_booking_confirmation(self, booking_id):
     """Send confirmation email when a booking is created."""
     try:
         from booking.models import Booking
         booking = Booking.objects.select_related('user', 'desk__room__floor__location').get(pk=booking_id)
-
-        subject = f"Booking Confirmed — {booking.desk.name} on {booking.start_time:%d %b %Y}"
-        message = _booking_confirmation_text(booking)
-        html_message = _booking_confirmation_html(booking)
-
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[booking.user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        with EmailBatch() as batch:
+            batch.add(_confirmation_message(booking))
     except Exception as exc:
         raise self.retry(exc=exc)
 
@@ -56,34 +175,38 @@ def send_booking_confirmation(self, booking_id):
 def send_booking_cancellation(self, user_email, username, desk_name, room_name, start_time, end_time, cancelled_by=None):
     """Send cancellation email when a booking is cancelled."""
     try:
-        cancelled_by_text = f" by {cancelled_by}" if cancelled_by and cancelled_by != username else ""
-        subject = f"Booking Cancelled — {desk_name} on {start_time}"
-        message = (
-            f"Hi {username},\n\n"
-            f"Your booking has been cancelled{cancelled_by_text}.\n\n"
-            f"Desk: {desk_name}\n"
-            f"Room: {room_name}\n"
-            f"Was: {start_time} → {end_time}\n\n"
-            f"You can make a new booking at {getattr(settings, 'FLEXSPACE_BASE_URL', '')}.\n\n"
-            f"FlexSpace"
-        )
-        html_message = _cancellation_html(
-            username=username,
-            desk_name=desk_name,
-            room_name=room_name,
-            start_time=start_time,
-            end_time=end_time,
-            cancelled_by_text=cancelled_by_text,
-        )
+        with EmailBatch() as batch:
+            batch.add(_cancellation_message(
+                user_email=user_email,
+                username=username,
+                desk_name=desk_name,
+                room_name=room_name,
+                start_time=start_time,
+                end_time=end_time,
+                cancelled_by=cancelled_by,
+            ))
+    except Exception as exc:
+        raise self.retry(exc=exc)
 
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_booking_reminders(self, booking_ids):
+    """
+    Send the reminders claimed by one reminder sweep (services/reminders.py)
+    over a single SMTP session. Bookings cancelled, already started or moved
+    out of the window since the sweep are skipped.
+    """
+    try:
+        from django.utils import timezone
+        from booking.models import Booking
+        bookings = Booking.objects.filter(
+            pk__in=booking_ids, reminded_at__isnull=False, start_time__gt=timezone.now(),
+        ).select_related('user', 'desk__room__floor__location')
+        with EmailBatch() as batch:
+            for booking in bookings:
+                batch.add(_reminder_message(booking), retry={'booking_ids': [booking.id]})
+    except EmailBatchError as exc:
+        raise self.retry(exc=exc, kwargs=_retry_kwargs(exc.failed))
     except Exception as exc:
         raise self.retry(exc=exc)
 
@@ -91,36 +214,134 @@ def send_booking_cancellation(self, user_email, username, desk_name, room_name,
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def send_booking_reminder(self, booking_id):
     """
-    Send a reminder email 1 hour before a booking starts.
-    Schedule this from Celery Beat or call it after booking creation with eta.
+    Send one booking's reminder now. Scheduled reminders come from the
+    sweep_booking_reminders beat task rather than per-booking ETA tasks.
     """
     try:
         from booking.models import Booking
         booking = Booking.objects.select_related('user', 'desk__room__floor__location').get(pk=booking_id)
-
-        subject = f"Reminder — Your desk booking starts in 1 hour"
-        message = (
-            f"Hi {booking.user.username},\n\n"
-            f"This is a reminder that your desk booking starts in 1 hour.\n\n"
-            f"Desk: {booking.desk.name}\n"
-            f"Room: {booking.desk.room.name}\n"
-            f"Location: {booking.desk.room.floor.location.name}\n"
-            f"Start: {booking.start_time:%d %b %Y %H:%M}\n"
-            f"End: {booking.end_time:%d %b %Y %H:%M}\n\n"
-            f"FlexSpace"
-        )
-
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[booking.user.email],
-            fail_silently=False,
-        )
+        with EmailBatch() as batch:
+            batch.add(_reminder_message(booking))
     except Exception as exc:
         raise self.retry(exc=exc)
 
 
+# ─── Messages ─────────────────────────────────────────────────────────────────
+
+def _message(to, subject, text, html=None):
+    message = EmailMultiAlternatives(
+        subject=subject, body=text, from_email=settings.DEFAULT_FROM_EMAIL, to=[to] if to else [],
+    )
+    if html:
+        message.attach_alternative(html, "text/html")
+    return message
+
+
+def _confirmation_message(booking):
+    return _message(
+        booking.user.email,
+        f"Booking Confirmed — {booking.desk.name} on {booking.start_time:%d %b %Y}",
+        _booking_confirmation_text(booking),
+        _booking_confirmation_html(booking),
+    )
+
+
+def _reminder_message(booking):
+    from django.utils import timezone
+    minutes = max(1, round((booking.start_time - timezone.now()).total_seconds() / 60))
+    starts_in = f"{minutes} minutes" if minutes < 90 else f"{round(minutes / 60)} hours"
+    return _message(
+        booking.user.email,
+        f"Reminder — Your desk booking starts in {starts_in}",
+        f"Hi {booking.user.username},\n\n"
+        f"This is a reminder that your desk booking starts in {starts_in}.\n\n"
+        f"Desk: {booking.desk.name}\n"
+        f"Room: {booking.desk.room.name}\n"
+        f"Location: {booking.desk.room.floor.location.name}\n"
+        f"Start: {booking.start_time:%d %b %Y %H:%M}\n"
+        f"End: {booking.end_time:%d %b %Y %H:%M}\n\n"
+        f"FlexSpace",
+    )
+
+
+def _cancellation_snapshot(booking):
+    return {
+        'user_email': booking.user.email,
+        'username': booking.user.username,
+        'desk_name': booking.desk.name,
+        'room_name': booking.desk.room.name,
+        'start_time': f"{booking.start_time:%d %b %Y %H:%M}",
+        'end_time': f"{booking.end_time:%d %b %Y %H:%M}",
+    }
+
+
+def _cancelled_by_text(cancelled_by, username):
+    return f" by {cancelled_by}" if cancelled_by and cancelled_by != username else ""
+
+
+def _cancellation_message(user_email, username, desk_name, room_name, start_time, end_time, cancelled_by=None):
+    cancelled_by_text = _cancelled_by_text(cancelled_by, username)
+    text = (
+        f"Hi {username},\n\n"
+        f"Your booking has been cancelled{cancelled_by_text}.\n\n"
+        f"Desk: {desk_name}\n"
+        f"Room: {room_name}\n"
+        f"Was: {start_time} → {end_time}\n\n"
+        f"You can make a new booking at {getattr(settings, 'FLEXSPACE_BASE_URL', '')}.\n\n"
+        f"FlexSpace"
+    )
+    html = _cancellation_html(
+        username=username,
+        desk_name=desk_name,
+        room_name=room_name,
+        start_time=start_time,
+        end_time=end_time,
+        cancelled_by_text=cancelled_by_text,
+    )
+    return _message(user_email, f"Booking Cancelled — {desk_name} on {start_time}", text, html)
+
+
+def _confirmation_digest(bookings):
+    first = bookings[0]
+    rows = [
+        (b.desk.name, b.desk.room.name, f"{b.start_time:%d %b %Y %H:%M} → {b.end_time:%d %b %Y %H:%M}")
+        for b in bookings
+    ]
+    return _digest_message(
+        first.user.email, first.user.username,
+        subject=f"{len(bookings)} Bookings Confirmed — {first.desk.name}",
+        heading="Bookings Confirmed ✓",
+        intro=f"{len(bookings)} desk bookings are confirmed.",
+        rows=rows,
+        color="#2563eb",
+        link_text="View My Bookings",
+    )
+
+
+def _cancellation_digest(snapshots, cancelled_by=None):
+    first = snapshots[0]
+    rows = [(s['desk_name'], s['room_name'], f"{s['start_time']} → {s['end_time']}") for s in snapshots]
+    return _digest_message(
+        first['user_email'], first['username'],
+        subject=f"{len(snapshots)} Bookings Cancelled — {first['desk_name']}",
+        heading="Bookings Cancelled",
+        intro=f"{len(snapshots)} of your bookings have been cancelled{_cancelled_by_text(cancelled_by, first['username'])}.",
+        rows=rows,
+        color="#dc2626",
+        link_text="Make a New Booking",
+    )
+
+
+def _digest_message(to, username, *, subject, heading, intro, rows, color, link_text):
+    base_url = getattr(settings, 'FLEXSPACE_BASE_URL', '')
+    text = (
+        f"Hi {username},\n\n{intro}\n\n"
+        + "".join(f"{desk} ({room}): {when}\n" for desk, room, when in rows)
+        + f"\n{base_url}\n\nFlexSpace"
+    )
+    return _message(to, subject, text, _digest_html(username, heading, intro, rows, color, link_text))
+
+
 # ─── HTML Templates ───────────────────────────────────────────────────────────
 
 def _booking_confirmation_text(booking):
@@ -207,4 +428,31 @@ def _cancellation_html(username, desk_name, room_name, start_time, end_time, can
         </a>
         <p style="color: #6b7280; margin-top: 30px; font-size: 12px;">FlexSpace</p>
     </div>
-    """
\ No newline at end of file
+    """
+
+
+def _digest_html(username, heading, intro, rows, color, link_text):
+    base_url = getattr(settings, 'FLEXSPACE_BASE_URL', '')
+    table_rows = "".join(
+        f"""
+            <tr{' style="background: #f3f4f6;"' if i % 2 == 0 else ''}>
+                <td style="padding: 10px; font-weight: bold;">{desk}</td>
+                <td style="padding: 10px;">{room}</td>
+                <td style="padding: 10px;">{when}</td>
+            </tr>"""
+        for i, (desk, room, when) in enumerate(rows)
+    )
+    return f"""
+    <div style="font-family: Arial, sans-serif; max-width: 500px; margin: 0 auto;">
+        <h2 style="color: {color};">{heading}</h2>
+        <p>Hi <strong>{username}</strong>,</p>
+        <p>{intro}</p>
+        <table style="border-collapse: collapse; width: 100%; margin: 20px 0;">{table_rows}
+        </table>
+        <a href="{base_url}" style="background: {color}; color: white; padding: 10px 20px;
+           text-decoration: none; border-radius: 5px; display: inline-block;">
+            {link_text}
+        </a>
+        <p style="color: #6b7280; margin-top: 30px; font-size: 12px;">FlexSpace</p>
+    </div>
+    """
@@ -0,0 +1,125 @@
+"""
+Model-change event bus.
+
+Write paths describe what changed with one typed event per operation
+(a booking batch on a desk, a desk state flip, a lock, a maintenance
+toggle) and emit() it; they no longer call each side effect themselves.
+Subscribers are registered with @subscribe and run either
+
+  - inside the emitting transaction (default), for effects that must
+    commit or roll back with the change: the booking change feed, outbox
+    broadcasts, occupancy dirty marks
+  - after commit (on_commit=True), for effects outside the database such
+    as cache invalidation
+
+The subscribers themselves live in booking/subscribers.py, imported by
+BookingConfig.ready().
+"""
+import datetime
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import partial
+
+from django.db import transaction
+
+_subscribers = defaultdict(list)
+
+
+def subscribe(event_type, *, on_commit=False):
+    def register(fn):
+        _subscribers[event_type].append((fn, on_commit))
+        return fn
+    return register
+
+
+def emit(event):
+    for fn, on_commit in _subscribers[type(event)]:
+        if on_commit:
+            transaction.on_commit(partial(fn, event))
+        else:
+            fn(event)
+
+
+@dataclass(frozen=True)
+class BookingsChanged:
+    """
+    Bookings on one desk were created, updated or deleted by one operation
+    (a bulk create or an interval edit is still one event).
+    upserted / deleted are (booking_id, user_id) pairs; intervals are the
+    (start, end) spans whose occupancy may have changed.
+    """
+    desk_id: int
+    room_id: int
+    upserted: tuple[tuple[int, int], ...] = ()
+    deleted: tuple[tuple[int, int], ...] = ()
+    intervals: tuple[tuple[datetime.datetime, datetime.datetime], ...] = ()
+    actor_id: int | None = None
+
+    @property
+    def user_ids(self) -> set[int]:
+        ids = {user_id for _, user_id in (*self.upserted, *self.deleted)}
+        if self.actor_id is not None:
+            ids.add(self.actor_id)
+        return ids
+
+
+@dataclass(frozen=True)
+class DeskStateChanged:
+    """
+    A desk's booked / permanent state was (re)computed. was_available is
+    Desk.is_available before the write, or None when unknown.
+    """
+    desk_id: int
+    room_id: int
+    location_id: int | None
+    is_booked: bool
+    booked_by: str | None
+    is_permanent: bool = False
+    was_available: bool | None = None
+
+    @property
+    def available(self) -> bool:
+        return not self.is_booked and not self.is_permanent
+
+    @classmethod
+    def of(cls, desk, was_available=None):
+        return cls(
+            desk_id=desk.id,
+            room_id=desk.room_id,
+            location_id=desk.location_id,
+            is_booked=desk.is_booked,
+            booked_by=desk.booked_by.username if desk.booked_by else None,
+            is_permanent=desk.is_permanent,
+            was_available=was_available,
+        )
+
+
+@dataclass(frozen=True)
+class DeskLockChanged:
+    desk_id: int
+    room_id: int
+    locked: bool
+    by: str | None = None
+
+
+@dataclass(frozen=True)
+class RoomMaintenanceChanged:
+    room_id: int
+    location_id: int | None
+    enabled: bool
+    by: str
+
+
+@dataclass(frozen=True)
+class RoomLayoutChanged:
+    """
+    A room editor save created, moved / renamed / reoriented and deleted
+    desks in one transaction. desks holds the created and updated desks as
+    compact dicts (id, name, pos_x, pos_y, orientation).
+    """
+    room_id: int
+    location_id: int | None
+    desks: tuple[dict, ...] = ()
+    created_ids: tuple[int, ...] = ()
+    deleted_ids: tuple[int, ...] = ()
+    by: str | None = None
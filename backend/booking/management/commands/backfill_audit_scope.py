@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import IntegerField, Max, Min
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast
+
+from booking.models_audit import AuditLog
+
+SCOPE_COLUMNS = ('location_id', 'room_id', 'desk_id')
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy location_id / room_id / desk_id out of AuditLog.target_snapshot into "
+        "their indexed columns, in short id-range batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, batch_size, **options):
+        bounds = AuditLog.objects.aggregate(lo=Min('id'), hi=Max('id'))
+        if bounds['lo'] is None:
+            self.stdout.write("No audit entries to backfill.")
+            return
+
+        updated = 0
+        for start in range(bounds['lo'], bounds['hi'] + 1, batch_size):
+            with transaction.atomic():
+                for column in SCOPE_COLUMNS:
+                    updated += AuditLog.objects.filter(
+                        id__gte=start,
+                        id__lt=start + batch_size,
+                        **{f'{column}__isnull': True, f'target_snapshot__has_key': column},
+                    ).update(**{
+                        column: Cast(KeyTextTransform(column, 'target_snapshot'), IntegerField())
+                    })
+            self.stdout.write(f"Backfilled ids {start}–{start + batch_size - 1}")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {updated} column values written."))
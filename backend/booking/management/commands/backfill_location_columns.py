@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max, Min, OuterRef, Q, Subquery
+
+from booking.models import Booking, Desk, Floor, Room
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the denormalized Room.location, Desk.location and Booking.room / "
+        "Booking.location columns from the desk -> room -> floor chain. "
+        "Bookings are updated in short id-range batches; re-running is safe. "
+        "Runs with --missing-only after every migrate (db_extensions.backfill_location_columns)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--missing-only', action='store_true', help="Only rows whose columns are still NULL.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, batch_size, missing_only, database, **options):
+        rooms = Room.objects.using(database)
+        desks = Desk.objects.using(database)
+        bookings = Booking.objects.using(database)
+        if missing_only:
+            rooms = rooms.filter(location__isnull=True)
+            desks = desks.filter(location__isnull=True)
+            bookings = bookings.filter(Q(room__isnull=True) | Q(location__isnull=True))
+
+        floor_location = Floor.objects.filter(pk=OuterRef('floor_id')).values('location_id')[:1]
+        updated_rooms = rooms.update(location_id=Subquery(floor_location))
+        room_location = Room.objects.filter(pk=OuterRef('room_id')).values('location_id')[:1]
+        updated_desks = desks.update(location_id=Subquery(room_location))
+        self.stdout.write(f"Updated {updated_rooms} rooms and {updated_desks} desks.")
+
+        bounds = bookings.aggregate(lo=Min('id'), hi=Max('id'))
+        if bounds['lo'] is None:
+            self.stdout.write(self.style.SUCCESS("No bookings to backfill."))
+            return
+
+        desk = Desk.objects.filter(pk=OuterRef('desk_id'))
+        updated = 0
+        for start in range(bounds['lo'], bounds['hi'] + 1, batch_size):
+            with transaction.atomic(using=database):
+                updated += bookings.filter(id__gte=start, id__lt=start + batch_size).update(
+                    room_id=Subquery(desk.values('room_id')[:1]),
+                    location_id=Subquery(desk.values('location_id')[:1]),
+                )
+            self.stdout.write(f"Backfilled bookings {start}–{start + batch_size - 1}")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {updated} bookings updated."))
@@ -0,0 +1,39 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from booking.models import Booking
+from booking.services import occupancy
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the desk-day / room-day occupancy rollups for a date range "
+        "(default: every day that has bookings), one month at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=datetime.date.fromisoformat, help='YYYY-MM-DD')
+        parser.add_argument('--end', type=datetime.date.fromisoformat, help='YYYY-MM-DD')
+
+    def handle(self, *args, start=None, end=None, **options):
+        bounds = Booking.objects.aggregate(lo=Min('start_time'), hi=Max('end_time'))
+        if bounds['lo'] is None and not (start and end):
+            self.stdout.write("No bookings to roll up.")
+            return
+        start = start or bounds['lo'].date()
+        end = end or max(bounds['hi'].date(), timezone.now().date())
+        if start > end:
+            raise CommandError("--start must not be after --end")
+
+        total = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + datetime.timedelta(days=30), end)
+            total += occupancy.repair(chunk_start, chunk_end)
+            self.stdout.write(f"Rolled up {chunk_start} – {chunk_end}")
+            chunk_start = chunk_end + datetime.timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} desk-day cells recomputed."))
@@ -0,0 +1,83 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.utils import ConnectionHandler
+
+MODES = ('direct', 'persistent', 'pool')
+
+
+def _mode_settings(base, mode, pool_size):
+    options = {k: v for k, v in base.get('OPTIONS', {}).items() if k != 'pool'}
+    conf = {**base, 'OPTIONS': options, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}
+    if mode == 'persistent':
+        conf.update(CONN_MAX_AGE=300, CONN_HEALTH_CHECKS=True)
+    elif mode == 'pool':
+        options['pool'] = {'min_size': 1, 'max_size': pool_size, 'timeout': 10}
+        conf['CONN_HEALTH_CHECKS'] = True
+    return conf
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request database connection cost without and with "
+        "connection reuse. Each simulated request runs the request_started / "
+        "request_finished connection housekeeping around one query, either on "
+        "a fresh thread (as Daphne runs sync views) or on one long-lived "
+        "thread (as a Celery prefork child runs tasks)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--mode', choices=MODES, action='append', help="Repeatable; default: all modes.")
+        parser.add_argument('--same-thread', action='store_true', help="Run every request on one thread (Celery).")
+        parser.add_argument('--pool-size', type=int, default=4)
+
+    def handle(self, *args, requests, mode, same_thread, pool_size, **options):
+        base = settings.DATABASES['default']
+        if base['ENGINE'] != 'django.db.backends.postgresql':
+            raise CommandError("Connection benchmarks need the PostgreSQL backend.")
+
+        self.stdout.write(f"{requests} requests, {'one thread' if same_thread else 'thread per request'}")
+        self.stdout.write(f"{'mode':<12}{'mean ms':>10}{'p95 ms':>10}{'backends':>10}")
+        for name in mode or MODES:
+            alias = f'bench_{name}'
+            handler = ConnectionHandler({'default': base, alias: _mode_settings(base, name, pool_size)})
+            timings, backends = self._run(handler, alias, requests, same_thread)
+            self.stdout.write(
+                f"{name:<12}{statistics.fmean(timings):>10.2f}"
+                f"{statistics.quantiles(timings, n=20)[-1]:>10.2f}{len(backends):>10}"
+            )
+
+    def _run(self, handler, alias, requests, same_thread):
+        timings, backends = [], set()
+
+        def request():
+            conn = handler[alias]
+            started = time.perf_counter()
+            conn.close_if_unusable_or_obsolete()
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_backend_pid()")
+                backends.add(cursor.fetchone()[0])
+            conn.close_if_unusable_or_obsolete()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        def run(count):
+            for _ in range(count):
+                request()
+            # Stands in for the thread's connection being garbage collected
+            handler[alias].close()
+
+        if same_thread:
+            threads = [threading.Thread(target=run, args=(requests,))]
+        else:
+            threads = [threading.Thread(target=run, args=(1,)) for _ in range(requests)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+
+        if handler[alias].pool is not None:
+            handler[alias].close_pool()
+        return timings, backends
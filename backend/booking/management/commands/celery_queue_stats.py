@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from booking.services.queue_metrics import snapshot
+from booking_project.celery import app
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Show each Celery queue's broker depth and how long its recent tasks "
+        "waited between publish and start (p50 / p95 / max over the last "
+        "samples recorded by the workers)."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'queue':<16}{'depth':>8}{'samples':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        for queue, stats in snapshot(app).items():
+            depth = "-" if stats['depth'] is None else stats['depth']
+            self.stdout.write(
+                f"{queue:<16}{depth:>8}{stats['samples']:>10}"
+                f"{_ms(stats['p50_ms']):>10}{_ms(stats['p95_ms']):>10}{_ms(stats['max_ms']):>10}"
+            )
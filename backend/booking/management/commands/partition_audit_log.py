@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.services import audit_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the AuditLog table into monthly range partitions on \"timestamp\". "
+        "Safe to re-run; does nothing once the table is partitioned."
+    )
+
+    def handle(self, *args, **options):
+        try:
+            converted = audit_partitions.convert()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        if not converted:
+            self.stdout.write("AuditLog is already partitioned.")
+            return
+        partitions = sorted(audit_partitions.existing_partitions())
+        self.stdout.write(self.style.SUCCESS(
+            f"AuditLog partitioned: {len(partitions)} partitions ({partitions[0]} … {partitions[-1]})."
+        ))
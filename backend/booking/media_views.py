@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.views.static import serve
+
+# Stored under content-hashed (or never-reused) names: a URL always means the same bytes
+IMMUTABLE_PREFIXES = ('room_maps/',)
+
+
+def serve_media(request, path, document_root=None):
+    """django.views.static.serve plus Cache-Control for uploaded media."""
+    response = serve(request, path, document_root=document_root)
+    if path.startswith(IMMUTABLE_PREFIXES):
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=3600'
+    return response
@@ -5,6 +5,9 @@ from rest_framework_simplejwt.exceptions import TokenError
 from django.contrib.auth import get_user_model
 
 from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .db_router import pin_to_primary
 
 User = get_user_model()
 
@@ -50,4 +53,28 @@ def JwtAuthMiddleware(inner):
         
         return await inner(scope,receive,send)
     
-    return middleware
\ No newline at end of file
+    return middleware
+
+class ReadYourWritesMiddleware:
+    """
+    Pin a user's reads to the primary database after a successful write,
+    so replica lag never hides their own changes (see booking.db_router).
+    DRF copies the authenticated user onto the Django request, so
+    request.user is the JWT user by the time the response comes back.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user.id)
+        return response
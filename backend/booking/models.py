@@ -9,6 +9,15 @@ from .models_preferences import UserPreferences
 # Import SocialAccount model
 from .models_social import SocialAccount
 
+# Import occupancy rollup models
+from .models_occupancy import DeskDayOccupancy, RoomDayOccupancy
+
+# Import booking change feed model
+from .models_changes import BookingChange
+
+# Import transactional outbox model
+from .models_outbox import OutboxEvent
+
 class Country(models.Model):
     name = models.CharField(max_length=100, unique=True)
     country_code = models.CharField(max_length=2, null=True, blank=True)
@@ -103,13 +112,33 @@ class Floor(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.location.name})"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        moved = (
+            self.pk is not None
+            and (update_fields is None or 'location' in update_fields)
+            and Floor.objects.filter(pk=self.pk).exclude(location_id=self.location_id).exists()
+        )
+        super().save(*args, **kwargs)
+        if moved:
+            # Keep the denormalized location_id below this floor in step
+            Room.objects.filter(floor=self).update(location_id=self.location_id)
+            Desk.objects.filter(room__floor=self).update(location_id=self.location_id)
+            Booking.objects.filter(room__floor=self).update(location_id=self.location_id)
     
 
 class Room(models.Model):
     name = models.CharField(max_length=100)
     floor = models.ForeignKey(Floor, on_delete=models.CASCADE, related_name="rooms")
+    # Denormalized floor.location; kept in sync by Room.save() and Floor.save()
+    location = models.ForeignKey(
+        Location, on_delete=models.CASCADE, related_name="rooms", null=True, blank=True, editable=False
+    )
     description = models.TextField(blank=True, help_text='Room description and details')
     map_image = models.ImageField(upload_to='room_maps/', blank=True, null=True)
+    # Resized / WebP / tiled renditions of map_image (services/room_maps.py); {} until rendered
+    map_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     # Management fields
     room_managers = models.ManyToManyField(
@@ -144,7 +173,28 @@ class Room(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.floor.name}"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'floor' not in update_fields:
+            return super().save(*args, **kwargs)
+
+        self.location_id = self.floor.location_id
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'location'}
+        moved = self.pk is not None and Room.objects.filter(pk=self.pk).exclude(location_id=self.location_id).exists()
+        super().save(*args, **kwargs)
+        if moved:
+            Desk.objects.filter(room=self).update(location_id=self.location_id)
+            Booking.objects.filter(room=self).update(location_id=self.location_id)
     
+    def get_location(self):
+        """
+        The room's location; read through the floor for a row that
+        backfill_location_columns (run after every migrate) has not reached.
+        """
+        return self.location if self.location_id is not None else self.floor.location
+
     def is_room_manager(self, user):
         """Check if user is a room manager or location manager"""
         if user.is_superuser:
@@ -152,7 +202,7 @@ class Room(models.Model):
         if self.room_managers.filter(id=user.id).exists():
             return True
         # Location managers have room manager privileges
-        return self.floor.location.is_location_manager(user)
+        return self.get_location().is_location_manager(user)
     
     def can_user_book(self, user):
         """
@@ -168,7 +218,7 @@ class Room(models.Model):
             return True
 
         # Layer 1: location-level gate
-        location = self.floor.location
+        location = self.get_location()
         if not location.can_user_access(user):
             return False
 
@@ -176,9 +226,27 @@ class Room(models.Model):
         user_groups = user.location_groups.filter(location=location)
         return self.allowed_groups.filter(id__in=user_groups.values_list('id', flat=True)).exists()
     
+class DeskQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Fill the denormalized location column that save() would set."""
+        objs = list(objs)
+        missing = {obj.room_id for obj in objs if obj.location_id is None}
+        if missing:
+            rooms = dict(Room.objects.filter(pk__in=missing).values_list('id', 'location_id'))
+            for obj in objs:
+                if obj.location_id is None:
+                    obj.location_id = rooms.get(obj.room_id)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Desk(models.Model):
     name = models.CharField(max_length=100)
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="desks")
+    # Denormalized room.location; kept in sync by Desk.save() and Room/Floor moves
+    location = models.ForeignKey(
+        Location, on_delete=models.CASCADE, related_name="desks", null=True, blank=True, editable=False
+    )
 
     # Occupancy flags
     is_booked = models.BooleanField(default=False)
@@ -216,6 +284,8 @@ class Desk(models.Model):
         help_text='User permanently assigned to this desk'
     )
 
+    objects = DeskQuerySet.as_manager()
+
     def clean(self):
         """Validate desk data"""
         super().clean()
@@ -230,6 +300,11 @@ class Desk(models.Model):
                 'permanent_assignee': 'Only permanent desks can have an assignee.'
             })
         
+    @property
+    def is_available(self):
+        """Free to book now: not booked and not permanently assigned."""
+        return not self.is_booked and not self.is_permanent
+
     def refresh_booking_state(self):
         """
         Set is_booked/booked_by based on bookings active at moment 'now'
@@ -244,6 +319,19 @@ class Desk(models.Model):
         self.save(update_fields=['is_booked','booked_by'])
         return self.is_booked
     
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'room' not in update_fields:
+            return super().save(*args, **kwargs)
+
+        self.location_id = self.room.location_id
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'location'}
+        moved = self.pk is not None and Desk.objects.filter(pk=self.pk).exclude(room_id=self.room_id).exists()
+        super().save(*args, **kwargs)
+        if moved:
+            Booking.objects.filter(desk=self).update(room_id=self.room_id, location_id=self.location_id)
+
     class Meta:
         ordering = ['room','name']
         constraints = [
@@ -258,14 +346,59 @@ class Desk(models.Model):
             return f"{self.name} (Permanent - {self.permanent_assignee.username})"
         return f"{self.name} ({self.room.name})"
     
+class BookingQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Fill the denormalized room / location columns that save() would set."""
+        objs = list(objs)
+        missing = {obj.desk_id for obj in objs if obj.room_id is None or obj.location_id is None}
+        if missing:
+            desks = {d[0]: d[1:] for d in Desk.objects.filter(pk__in=missing).values_list('id', 'room_id', 'location_id')}
+            for obj in objs:
+                if obj.desk_id in desks:
+                    obj.room_id, obj.location_id = desks[obj.desk_id]
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Booking(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bookings")
     desk = models.ForeignKey(Desk, on_delete=models.CASCADE, related_name="bookings")
+    # Denormalized desk.room / desk.location so room- and location-wide queries
+    # stay on this table; kept in sync by save(), bulk_create() and Desk/Room/Floor moves
+    room = models.ForeignKey(
+        Room, on_delete=models.CASCADE, related_name="bookings",
+        null=True, blank=True, editable=False, db_index=False,
+    )
+    location = models.ForeignKey(
+        Location, on_delete=models.CASCADE, related_name="bookings",
+        null=True, blank=True, editable=False, db_index=False,
+    )
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
+    # Set when the reminder sweep claims the booking; cleared when its start moves
+    reminded_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = BookingQuerySet.as_manager()
 
     class Meta:
+        # unique_together's index already covers (desk, start_time, end_time)
         unique_together = ('desk', 'start_time', 'end_time')
+        indexes = [
+            # Overlap checks and "current booking" lookups: desk = ? AND end_time > ?
+            # only walks bookings that haven't ended, however long the history
+            models.Index(fields=['desk', 'end_time'], include=['start_time'], name='booking_desk_end_idx'),
+            # A user's history / upcoming bookings in time order
+            models.Index(fields=['user', 'start_time'], name='booking_user_start_idx'),
+            # Room- / location-wide windows without joining desk, room and floor
+            models.Index(fields=['room', 'end_time'], include=['start_time'], name='booking_room_end_idx'),
+            models.Index(fields=['location', 'end_time'], include=['start_time'], name='booking_location_end_idx'),
+            # booking_time_brin (start_time, end_time) is Postgres-only: db_extensions.create_postgres_indexes
+            # Reminder sweep: only bookings not reminded yet, in start order
+            models.Index(
+                fields=['start_time'], condition=models.Q(reminded_at__isnull=True),
+                name='booking_unreminded_start_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.desk.name} booked by {self.user.username}"
@@ -311,5 +444,10 @@ class Booking(models.Model):
             })
     
     def save(self,*args, **kwargs):
+        self.room_id = self.desk.room_id
+        self.location_id = self.desk.location_id
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'desk' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'room', 'location'}
         self.full_clean()
         super().save(*args, **kwargs)
\ No newline at end of file
@@ -1,5 +1,9 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from booking_project.renderers import to_jsonable
 
 
 class AuditLog(models.Model):
@@ -17,6 +21,7 @@ class AuditLog(models.Model):
         DESK_ASSIGNED     = 'desk_assigned',      'Desk Permanently Assigned'
         DESK_UNASSIGNED   = 'desk_unassigned',    'Desk Assignment Cleared'
         ROOM_MAINTENANCE  = 'room_maintenance',   'Room Maintenance Toggled'
+        ROOM_LAYOUT_CHANGED = 'room_layout_changed', 'Room Layout Changed'
         USER_LOGIN        = 'user_login',         'User Logged In'
         USER_LOGOUT       = 'user_logout',        'User Logged Out'
 
@@ -49,9 +54,16 @@ class AuditLog(models.Model):
         help_text='Snapshot of the object at time of action'
     )
 
+    # Scope copied out of target_snapshot so staff filters hit an index.
+    # Plain integers, not FKs: entries must outlive the objects they describe.
+    location_id = models.IntegerField(null=True, blank=True)
+    room_id = models.IntegerField(null=True, blank=True)
+    desk_id = models.IntegerField(null=True, blank=True)
+
     # Context
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set when the action happens, not when a buffered entry is flushed
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     notes = models.TextField(blank=True)
 
     class Meta:
@@ -60,6 +72,10 @@ class AuditLog(models.Model):
             models.Index(fields=['user', 'timestamp']),
             models.Index(fields=['action', 'timestamp']),
             models.Index(fields=['target_type', 'target_id']),
+            models.Index(fields=['location_id', 'timestamp']),
+            models.Index(fields=['room_id', 'timestamp']),
+            models.Index(fields=['desk_id', 'timestamp']),
+            # auditlog_username_trgm (username search) is Postgres-only: db_extensions.create_postgres_indexes
         ]
 
     def __str__(self):
@@ -69,7 +85,12 @@ class AuditLog(models.Model):
     def log(cls, *, user, action, target_type, target_id=None,
             target_snapshot=None, ip_address=None, notes=''):
         """
-        Convenience method to create an audit log entry.
+        Convenience method to record an audit log entry.
+
+        With settings.AUDIT_LOG_ASYNC the entry is pushed to the Redis audit
+        buffer after the current transaction commits and written in batches
+        by the flush_audit_log task; None is returned. Otherwise (and as a
+        fallback when Redis is unreachable) the row is inserted immediately.
 
         Usage:
             AuditLog.log(
@@ -81,13 +102,30 @@ class AuditLog(models.Model):
                 ip_address=request.META.get('REMOTE_ADDR'),
             )
         """
-        return cls.objects.create(
-            user=user,
-            username_snapshot=user.username if user else 'system',
-            action=action,
-            target_type=target_type,
-            target_id=target_id,
-            target_snapshot=target_snapshot or {},
-            ip_address=ip_address,
-            notes=notes,
-        )
\ No newline at end of file
+        target_snapshot = to_jsonable(target_snapshot or {})
+        entry = {
+            'user_id': user.id if user else None,
+            'username_snapshot': user.username if user else 'system',
+            'action': str(action),
+            'target_type': target_type,
+            'target_id': target_id,
+            'target_snapshot': target_snapshot,
+            'location_id': target_snapshot.get('location_id'),
+            'room_id': target_snapshot.get('room_id'),
+            'desk_id': target_snapshot.get('desk_id'),
+            'ip_address': ip_address,
+            'notes': notes,
+            'timestamp': timezone.now(),
+        }
+
+        if not getattr(settings, 'AUDIT_LOG_ASYNC', False):
+            return cls.objects.create(**entry)
+
+        from .services.audit_buffer import enqueue
+
+        def _enqueue():
+            if not enqueue(entry):
+                cls.objects.create(**entry)
+
+        transaction.on_commit(_enqueue)
+        return None
\ No newline at end of file
@@ -0,0 +1,33 @@
+from django.db import models
+from django.utils.timezone import now
+
+
+class BookingChange(models.Model):
+    """
+    Append-only change feed for bookings, one row per insert/update/delete.
+    seq is the sync token handed to clients; ids are plain integers so
+    tombstones outlive the booking (and its desk).
+    Written by services.booking_changes in the same transaction as the booking write.
+    """
+    class Op(models.TextChoices):
+        UPSERT = 'upsert', 'Upsert'
+        DELETE = 'delete', 'Delete'
+
+    seq = models.BigAutoField(primary_key=True)
+    booking_id = models.BigIntegerField()
+    op = models.CharField(max_length=6, choices=Op.choices)
+    desk_id = models.BigIntegerField()
+    room_id = models.BigIntegerField()
+    user_id = models.BigIntegerField()
+    changed_at = models.DateTimeField(default=now, db_index=True)
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['room_id', 'seq']),
+            models.Index(fields=['desk_id', 'seq']),
+            models.Index(fields=['user_id', 'seq']),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.op} booking {self.booking_id}"
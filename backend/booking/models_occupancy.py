@@ -0,0 +1,50 @@
+from django.db import models
+
+
+class DeskDayOccupancy(models.Model):
+    """
+    Booked time per desk per (UTC) day.
+    Derived from Booking by services.occupancy; never edit by hand.
+    """
+    desk = models.ForeignKey('booking.Desk', on_delete=models.CASCADE, related_name='day_occupancy')
+    room = models.ForeignKey('booking.Room', on_delete=models.CASCADE, related_name='desk_day_occupancy')
+    date = models.DateField()
+    booked_minutes = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['desk', 'date'], name='uniq_desk_day_occupancy'),
+        ]
+        indexes = [
+            models.Index(fields=['room', 'date']),
+        ]
+
+    def __str__(self):
+        return f"Desk {self.desk_id} {self.date}: {self.booked_minutes} min"
+
+
+class RoomDayOccupancy(models.Model):
+    """
+    Booked time and peak concurrent occupancy per room per (UTC) day.
+    Derived from DeskDayOccupancy and Booking by services.occupancy.
+    """
+    room = models.ForeignKey('booking.Room', on_delete=models.CASCADE, related_name='day_occupancy')
+    location = models.ForeignKey('booking.Location', on_delete=models.CASCADE, related_name='room_day_occupancy')
+    date = models.DateField()
+    booked_minutes = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+    peak_concurrent = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'date'], name='uniq_room_day_occupancy'),
+        ]
+        indexes = [
+            models.Index(fields=['location', 'date']),
+        ]
+
+    def __str__(self):
+        return f"Room {self.room_id} {self.date}: {self.booked_minutes} min, peak {self.peak_concurrent}"
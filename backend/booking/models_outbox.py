@@ -0,0 +1,26 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils.timezone import now
+
+
+class OutboxEvent(models.Model):
+    """
+    Side effect (channel-layer broadcast or Celery task) written in the same
+    transaction as the change that causes it, so it goes out only if that
+    transaction commits. Relayed and then deleted by services.outbox.
+    """
+    class Kind(models.TextChoices):
+        BROADCAST = 'broadcast', 'Broadcast'
+        TASK = 'task', 'Task'
+
+    kind = models.CharField(max_length=9, choices=Kind.choices)
+    target = models.CharField(max_length=200)  # group name or task name
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=now, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.target}"
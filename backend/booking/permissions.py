@@ -31,7 +31,7 @@ class IsLocationManager(permissions.BasePermission):
         if isinstance(obj, Location):
             return obj.is_location_manager(user)
         elif isinstance(obj, Room):
-            return obj.floor.location.is_location_manager(user)
+            return obj.get_location().is_location_manager(user)
         elif isinstance(obj, UserGroup):
             return obj.location.is_location_manager(user)
         
@@ -97,7 +97,7 @@ class CanManageUserGroups(permissions.BasePermission):
                 # Check if they're only modifying members
                 if 'members' in request.data and location.allow_room_managers_to_add_group_members:
                     # Check if user is a room manager in this location
-                    managed_rooms = user.managed_rooms.filter(floor__location=location)
+                    managed_rooms = user.managed_rooms.filter(location=location)
                     return managed_rooms.exists()
         
         return False
@@ -151,7 +151,7 @@ class IsLocationManagerOrReadOnly(permissions.BasePermission):
         if isinstance(obj, Location):
             return obj.is_location_manager(user)
         elif isinstance(obj, Room):
-            return obj.floor.location.is_location_manager(user)
+            return obj.get_location().is_location_manager(user)
         
         return False
 
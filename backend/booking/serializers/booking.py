@@ -1,18 +1,68 @@
 from rest_framework import serializers
 from .desk import DeskSerializer
+from .dynamic_fields import DynamicFieldsMixin
 from ..models import Booking, Desk
 
-class BookingSerializer(serializers.ModelSerializer):
+# Relations walked by BookingSerializer (nested desk + denormalized room / location).
+BOOKING_RELATED = (
+    'user',
+    'desk__room',
+    'room__floor',
+    'location',
+    'desk__locked_by',
+    'desk__booked_by',
+    'desk__permanent_assignee',
+)
+
+# Relations walked by BookingCompactSerializer.
+BOOKING_COMPACT_RELATED = ('user', 'desk', 'room__floor', 'location')
+BOOKING_COMPACT_COLUMNS = (
+    'id', 'start_time', 'end_time', 'user_id', 'desk_id', 'room_id', 'location_id',
+    'user__username',
+    'desk__name',
+    'room__name', 'room__floor_id',
+    'room__floor__name',
+    'location__name',
+)
+
+# Export column name -> values_list() path; same shape as BookingCompactSerializer.
+BOOKING_EXPORT_COLUMNS = {
+    'id': 'id',
+    'desk_id': 'desk_id',
+    'desk_name': 'desk__name',
+    'room_id': 'room_id',
+    'room_name': 'room__name',
+    'floor_id': 'room__floor_id',
+    'floor_name': 'room__floor__name',
+    'location_id': 'location_id',
+    'location_name': 'location__name',
+    'user_id': 'user_id',
+    'username': 'user__username',
+    'start_time': 'start_time',
+    'end_time': 'end_time',
+}
+
+
+def compact_queryset(qs):
+    """Narrow a Booking queryset to the single join BookingCompactSerializer needs."""
+    return (
+        qs.select_related(None)
+        .select_related(*BOOKING_COMPACT_RELATED)
+        .only(*BOOKING_COMPACT_COLUMNS)
+    )
+
+
+class BookingSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
 
     desk = DeskSerializer(read_only=True)
 
     username = serializers.CharField(source='user.username', read_only=True)
 
-    room_name = serializers.CharField(source='desk.room.name', read_only=True)
-    floor_name = serializers.CharField(source='desk.room.floor.name', read_only=True)
-    floor_id = serializers.CharField(source='desk.room.floor.id', read_only=True)
-    location_name = serializers.CharField(source='desk.room.floor.location.name', read_only=True)
-    location_id = serializers.CharField(source='desk.room.floor.location.id', read_only=True)
+    room_name = serializers.CharField(source='room.name', read_only=True)
+    floor_name = serializers.CharField(source='room.floor.name', read_only=True)
+    floor_id = serializers.CharField(source='room.floor_id', read_only=True)
+    location_name = serializers.CharField(source='location.name', read_only=True)
+    location_id = serializers.CharField(read_only=True)
 
     # Desk id needed for creating a booking
     desk_id = serializers.PrimaryKeyRelatedField(
@@ -53,8 +103,46 @@ class BookingSerializer(serializers.ModelSerializer):
             'location_name',
             'location_id'
         ]
+        expandable_fields = ['desk']
     
     def create(self, validated_data):
         # During creation, the user is injected from request prop
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class BookingCompactSerializer(serializers.ModelSerializer):
+    """
+    Flat, read-only booking representation: ids plus denormalized names.
+    Feed it a queryset prepared with compact_queryset() so every row is
+    resolved from a single joined query.
+    """
+    desk_id = serializers.IntegerField(read_only=True)
+    desk_name = serializers.CharField(source='desk.name', read_only=True)
+    room_id = serializers.IntegerField(read_only=True)
+    room_name = serializers.CharField(source='room.name', read_only=True)
+    floor_id = serializers.IntegerField(source='room.floor_id', read_only=True)
+    floor_name = serializers.CharField(source='room.floor.name', read_only=True)
+    location_id = serializers.IntegerField(read_only=True)
+    location_name = serializers.CharField(source='location.name', read_only=True)
+    user_id = serializers.IntegerField(read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Booking
+        fields = [
+            'id',
+            'desk_id',
+            'desk_name',
+            'room_id',
+            'room_name',
+            'floor_id',
+            'floor_name',
+            'location_id',
+            'location_name',
+            'user_id',
+            'username',
+            'start_time',
+            'end_time',
+        ]
+        read_only_fields = fields
@@ -1,10 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from ..models import Desk
+from .dynamic_fields import DynamicFieldsMixin
 
 User = get_user_model()
 
-class DeskSerializer(serializers.ModelSerializer):
+class DeskSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     room_name = serializers.CharField(source='room.name', read_only=True)
     locked_by = serializers.CharField(source='locked_by.username', read_only=True)
     booked_by = serializers.CharField(source='booked_by.username', read_only=True)
@@ -45,6 +46,7 @@ class DeskSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'is_booked', 'is_locked', 'locked_by', 'room_name',
         ]
+        expandable_fields = []
 
     def get_permanent_assignee_full_name(self, obj):
         if obj.permanent_assignee:
@@ -65,4 +67,63 @@ class DeskSerializer(serializers.ModelSerializer):
                 'permanent_assignee': 'Only permanent desks can have an assignee.'
             })
 
-        return data
\ No newline at end of file
+        return data
+
+ORIENTATIONS = [choice for choice, _ in Desk._meta.get_field('orientation').choices]
+
+
+class DeskLayoutCreateSerializer(serializers.Serializer):
+    # Client-chosen handle for a new desk, echoed back with its id
+    key = serializers.CharField(max_length=64, required=False)
+    name = serializers.CharField(max_length=100)
+    pos_x = serializers.FloatField(min_value=0, max_value=1, default=0.5)
+    pos_y = serializers.FloatField(min_value=0, max_value=1, default=0.5)
+    orientation = serializers.ChoiceField(choices=ORIENTATIONS, default='bottom')
+
+
+class DeskLayoutUpdateSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField(max_length=100, required=False)
+    pos_x = serializers.FloatField(min_value=0, max_value=1, required=False)
+    pos_y = serializers.FloatField(min_value=0, max_value=1, required=False)
+    orientation = serializers.ChoiceField(choices=ORIENTATIONS, required=False)
+
+
+class DeskLayoutSerializer(serializers.Serializer):
+    """
+    One room editor save: desks to create, to update (name / position /
+    orientation) and to delete. The room is passed in the context; every
+    id must be one of its desks.
+    """
+    MAX_OPERATIONS = 1000
+
+    create = DeskLayoutCreateSerializer(many=True, required=False, default=list)
+    update = DeskLayoutUpdateSerializer(many=True, required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, data):
+        creates, updates, deletes = data['create'], data['update'], data['delete']
+        if not (creates or updates or deletes):
+            raise serializers.ValidationError('No desk changes given.')
+        if len(creates) + len(updates) + len(deletes) > self.MAX_OPERATIONS:
+            raise serializers.ValidationError(f'At most {self.MAX_OPERATIONS} desk changes per request.')
+
+        update_ids = [item['id'] for item in updates]
+        if len(set(update_ids)) != len(update_ids):
+            raise serializers.ValidationError({'update': 'Each desk may appear only once.'})
+        if len(set(deletes)) != len(deletes):
+            raise serializers.ValidationError({'delete': 'Each desk may appear only once.'})
+        both = set(update_ids) & set(deletes)
+        if both:
+            raise serializers.ValidationError({'update': f'Desks both updated and deleted: {sorted(both)}'})
+
+        keys = [item['key'] for item in creates if 'key' in item]
+        if len(set(keys)) != len(keys):
+            raise serializers.ValidationError({'create': 'Keys must be unique.'})
+
+        room = self.context['room']
+        ids = set(update_ids) | set(deletes)
+        foreign = ids - set(room.desks.filter(pk__in=ids).values_list('id', flat=True))
+        if foreign:
+            raise serializers.ValidationError({'detail': f'Desks not in this room: {sorted(foreign)}'})
+        return data
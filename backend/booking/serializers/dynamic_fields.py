@@ -0,0 +1,62 @@
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _split(raw):
+    if raw is None:
+        return None
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+
+def requested_fields(serializer_class, request):
+    """
+    Resolve the sparse fieldset a read request asked for.
+
+    Returns None when every field should be rendered (no ?fields= / ?expand=,
+    or a write request), otherwise the set of field names to keep.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+
+    params = request.query_params
+    fields = _split(params.get('fields'))
+    expand = _split(params.get('expand'))
+    if fields is None and expand is None:
+        return None
+
+    meta = serializer_class.Meta
+    declared = set(meta.fields)
+    expandable = set(getattr(meta, 'expandable_fields', ()))
+
+    base = fields if fields is not None else declared - expandable
+    return (base | (expand or set())) & declared
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for read requests.
+
+        ?fields=id,name,desk_count   render only these fields
+        ?expand=room_managers        add expensive fields (Meta.expandable_fields)
+
+    Without either parameter every field is rendered, as before. A bare
+    ?expand= renders the cheap fields plus the expanded ones.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(type(self), self.context.get('request'))
+        if wanted is None:
+            return
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+
+class DynamicFieldsViewSetMixin:
+    """
+    Lets a viewset shape its queryset around the fields the client asked for,
+    so joins, prefetches and annotations for skipped fields are never run.
+    """
+
+    def field_requested(self, *names):
+        wanted = requested_fields(self.get_serializer_class(), self.request)
+        return wanted is None or any(name in wanted for name in names)
@@ -1,5 +1,6 @@
 from .floor import FloorSerializer
 from .country import CountrySerializer
+from .dynamic_fields import DynamicFieldsMixin
 from ..models import Location, Country, UserGroup
 from rest_framework import serializers
 from django.contrib.auth.models import User
@@ -26,7 +27,7 @@ class AllowedLocationGroupSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'name', 'description']
 
 
-class LocationSerializer(serializers.ModelSerializer):
+class LocationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     country = CountrySerializer(read_only=True)
     country_id = serializers.PrimaryKeyRelatedField(
         queryset=Country.objects.all(),
@@ -68,6 +69,10 @@ class LocationSerializer(serializers.ModelSerializer):
             'is_manager', 'can_access', 'user_group_count', 'floor_count', 'room_count'
         ]
         read_only_fields = ['id']
+        expandable_fields = [
+            'floors', 'location_managers', 'allowed_groups',
+            'is_manager', 'can_access', 'user_group_count', 'floor_count', 'room_count',
+        ]
     
     def get_is_manager(self, obj):
         """Check if current user is a location manager"""
@@ -85,19 +90,25 @@ class LocationSerializer(serializers.ModelSerializer):
     
     def get_user_group_count(self, obj):
         """Get count of user groups in this location"""
+        if hasattr(obj, 'num_user_groups'):
+            return obj.num_user_groups
         return obj.user_groups.count()
     
     def get_floor_count(self, obj):
         """Get count of floors in this location"""
+        if hasattr(obj, 'num_floors'):
+            return obj.num_floors
         return obj.floors.count()
     
     def get_room_count(self, obj):
         """Get count of rooms across all floors in this location"""
+        if hasattr(obj, 'num_rooms'):
+            return obj.num_rooms
         from ..models import Room
-        return Room.objects.filter(floor__location=obj).count()
+        return Room.objects.filter(location=obj).count()
 
 
-class LocationListSerializer(serializers.ModelSerializer):
+class LocationListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Simplified serializer for listing locations"""
     country_name = serializers.CharField(source='country.name', read_only=True)
     floor_count = serializers.SerializerMethodField()
@@ -112,13 +123,18 @@ class LocationListSerializer(serializers.ModelSerializer):
             'floor_count', 'room_count', 'is_manager', 'can_access'
         ]
         read_only_fields = ['id']
+        expandable_fields = ['floor_count', 'room_count', 'is_manager', 'can_access']
     
     def get_floor_count(self, obj):
+        if hasattr(obj, 'num_floors'):
+            return obj.num_floors
         return obj.floors.count()
     
     def get_room_count(self, obj):
+        if hasattr(obj, 'num_rooms'):
+            return obj.num_rooms
         from ..models import Room
-        return Room.objects.filter(floor__location=obj).count()
+        return Room.objects.filter(location=obj).count()
     
     def get_is_manager(self, obj):
         request = self.context.get('request')
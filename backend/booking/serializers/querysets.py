@@ -0,0 +1,55 @@
+"""
+Queryset shaping for the location and room serializers: select / prefetch
+only what the requested fields render, and annotate the *_count fields.
+
+Counts are correlated subqueries, one per relation. Counting several
+one-to-many relations through joins in one query would multiply the rows
+(floors x rooms x groups) before the DISTINCT.
+"""
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from ..models import Desk, Floor, Room, UserGroup
+
+
+def count_of(model, fk):
+    """COUNT(*) of model rows whose fk points at the outer row."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{fk: OuterRef('pk')}).order_by()
+        .values(fk).annotate(n=Count('pk')).values('n')
+    ), 0)
+
+
+def annotate_location_counts(view, qs):
+    """Prefetch / annotate only what the requested location fields need."""
+    if view.field_requested('country', 'country_name'):
+        qs = qs.select_related('country')
+    if view.field_requested('floors'):
+        qs = qs.prefetch_related('floors__rooms')
+    if view.field_requested('location_managers'):
+        qs = qs.prefetch_related('location_managers')
+    if view.field_requested('allowed_groups'):
+        qs = qs.prefetch_related('allowed_groups')
+    if view.field_requested('floor_count'):
+        qs = qs.annotate(num_floors=count_of(Floor, 'location'))
+    if view.field_requested('room_count'):
+        qs = qs.annotate(num_rooms=count_of(Room, 'location'))
+    if view.field_requested('user_group_count'):
+        qs = qs.annotate(num_user_groups=count_of(UserGroup, 'location'))
+    return qs
+
+
+def annotate_room_counts(view, qs):
+    """Prefetch / annotate only what the requested room fields need."""
+    if view.field_requested('floor', 'floor_name', 'location_name'):
+        qs = qs.select_related('floor__location')
+    if view.field_requested('room_managers'):
+        qs = qs.prefetch_related('room_managers')
+    if view.field_requested('allowed_groups'):
+        qs = qs.prefetch_related('allowed_groups')
+    if view.field_requested('desks'):
+        qs = qs.prefetch_related('desks__locked_by', 'desks__booked_by', 'desks__permanent_assignee')
+    if view.field_requested('desk_count'):
+        qs = qs.annotate(num_desks=count_of(Desk, 'room'))
+    # available_desk_count is read from the Redis counters (services.room_availability)
+    return qs
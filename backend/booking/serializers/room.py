@@ -1,8 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import models
 
 from .desk import DeskSerializer
+from .dynamic_fields import DynamicFieldsMixin
 from ..models import Floor, Room, UserGroup
+from ..services import room_availability, room_maps
 
 class BasicFloorSerializer(serializers.ModelSerializer):
     location_id = serializers.IntegerField(source='location.id', read_only=True)
@@ -36,7 +39,7 @@ class AllowedGroupSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'name', 'description']
 
 
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     floor = BasicFloorSerializer(read_only=True)
     floor_id = serializers.PrimaryKeyRelatedField(
         queryset=Floor.objects.all(),
@@ -62,17 +65,19 @@ class RoomSerializer(serializers.ModelSerializer):
     is_manager = serializers.SerializerMethodField()
     can_book = serializers.SerializerMethodField()
     desk_count = serializers.SerializerMethodField()
+    map_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Room
         fields = [
-            'id', 'name', 'description', 'floor', 'floor_id', 'map_image',
+            'id', 'name', 'description', 'floor', 'floor_id', 'map_image', 'map_variants',
             'room_managers', 'room_manager_ids',
             'allowed_groups', 'allowed_group_ids',
             'is_manager', 'can_book', 'desk_count',
             'is_under_maintenance', 'maintenance_by_name'
         ]
         read_only_fields = ['id']
+        expandable_fields = ['room_managers', 'allowed_groups', 'is_manager', 'can_book', 'desk_count']
     
     def get_is_manager(self, obj):
         """Check if current user is a room manager"""
@@ -89,10 +94,31 @@ class RoomSerializer(serializers.ModelSerializer):
         return False
     
     def get_desk_count(self, obj):
+        if hasattr(obj, 'num_desks'):
+            return obj.num_desks
         return obj.desks.count()
 
+    def get_map_variants(self, obj):
+        return _map_variant_urls(self, obj)
 
-class RoomListSerializer(serializers.ModelSerializer):
+
+def _map_variant_urls(serializer, obj):
+    """Rendered map variants as absolute URLs (like ImageField's), or None until rendered."""
+    request = serializer.context.get('request')
+    return room_maps.urls(obj.map_variants, request.build_absolute_uri if request else (lambda url: url))
+
+
+class RoomAvailabilityListSerializer(serializers.ListSerializer):
+    """Fetch available desk counts for the whole page in one Redis call."""
+
+    def to_representation(self, data):
+        rooms = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if 'available_desk_count' in self.child.fields:
+            self.child.available_counts = room_availability.counts(room.id for room in rooms)
+        return super().to_representation(rooms)
+
+
+class RoomListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Simplified serializer for listing rooms"""
     floor_name = serializers.CharField(source='floor.name', read_only=True)
     location_name = serializers.CharField(source='floor.location.name', read_only=True)
@@ -100,22 +126,30 @@ class RoomListSerializer(serializers.ModelSerializer):
     available_desk_count = serializers.SerializerMethodField()
     is_manager = serializers.SerializerMethodField()
     can_book = serializers.SerializerMethodField()
+    map_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = Room
         fields = [
             'id', 'name', 'description', 'floor', 'floor_name',
-            'location_name', 'map_image', 'desk_count',
+            'location_name', 'map_image', 'map_variants', 'desk_count',
             'available_desk_count', 'is_manager', 'can_book',
             'is_under_maintenance', 'maintenance_by_name'
         ]
         read_only_fields = ['id']
+        expandable_fields = ['desk_count', 'available_desk_count', 'is_manager', 'can_book']
+        list_serializer_class = RoomAvailabilityListSerializer
     
     def get_desk_count(self, obj):
+        if hasattr(obj, 'num_desks'):
+            return obj.num_desks
         return obj.desks.count()
     
     def get_available_desk_count(self, obj):
-        return obj.desks.filter(is_booked=False, is_permanent=False).count()
+        counts = getattr(self, 'available_counts', None)
+        if counts is None or obj.id not in counts:
+            counts = room_availability.counts([obj.id])
+        return counts.get(obj.id, 0)
     
     def get_is_manager(self, obj):
         request = self.context.get('request')
@@ -129,9 +163,13 @@ class RoomListSerializer(serializers.ModelSerializer):
             return obj.can_user_book(request.user)
         return False
 
+    def get_map_variants(self, obj):
+        return _map_variant_urls(self, obj)
+
 
 class RoomWithDesksSerializer(RoomSerializer):
     desks = DeskSerializer(many=True, read_only=True)
 
     class Meta(RoomSerializer.Meta):
-        fields = RoomSerializer.Meta.fields + ['desks']
\ No newline at end of file
+        fields = RoomSerializer.Meta.fields + ['desks']
+        expandable_fields = RoomSerializer.Meta.expandable_fields + ['desks']
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Cold storage for AuditLog.
+
+Months that fall outside settings.AUDIT_LOG_HOT_MONTHS are streamed out of
+the database into one gzip-compressed NDJSON file per month under
+settings.AUDIT_ARCHIVE_DIR and then dropped (see audit_partitions). Staff
+can still read them back through the audit API with ?archived=true and a
+start..end range of at most settings.AUDIT_ARCHIVE_MAX_MONTHS months.
+"""
+import datetime
+import gzip
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from booking_project.renderers import dumps, loads
+
+FILE_PREFIX = "auditlog-"
+FILE_SUFFIX = ".ndjson.gz"
+
+
+def month_start(value: datetime.datetime) -> datetime.datetime:
+    return value.astimezone(datetime.timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def add_months(month: datetime.datetime, n: int) -> datetime.datetime:
+    index = month.year * 12 + month.month - 1 + n
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def hot_cutoff(now: datetime.datetime) -> datetime.datetime:
+    """Start of the oldest month that is kept in the database."""
+    return add_months(month_start(now), -(settings.AUDIT_LOG_HOT_MONTHS - 1))
+
+
+def archive_path(month: datetime.datetime) -> Path:
+    return Path(settings.AUDIT_ARCHIVE_DIR) / f"{FILE_PREFIX}{month:%Y-%m}{FILE_SUFFIX}"
+
+
+def archived_months() -> list[datetime.datetime]:
+    root = Path(settings.AUDIT_ARCHIVE_DIR)
+    if not root.is_dir():
+        return []
+    months = []
+    for path in root.glob(f"{FILE_PREFIX}*{FILE_SUFFIX}"):
+        stamp = path.name[len(FILE_PREFIX):-len(FILE_SUFFIX)]
+        try:
+            months.append(datetime.datetime.strptime(stamp, "%Y-%m").replace(tzinfo=datetime.timezone.utc))
+        except ValueError:
+            continue
+    return sorted(months)
+
+
+def read_month(month: datetime.datetime):
+    """Yield the archived rows of one month as dicts, timestamps parsed."""
+    with gzip.open(archive_path(month), "rb") as fh:
+        for line in fh:
+            row = loads(line)
+            row["timestamp"] = parse_datetime(row["timestamp"])
+            yield row
+
+
+def write_month(month: datetime.datetime, rows) -> int:
+    """
+    Write rows (dicts from AuditLog.objects.values()) to the month's archive
+    file and return how many were written. Rows already archived for that
+    month are kept, so late-flushed entries can be appended by a second run.
+    The file is replaced atomically only once it is complete.
+    """
+    path = archive_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+
+    seen = set()
+    sources = [read_month(month), rows] if path.exists() else [rows]
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as fh:
+            for source in sources:
+                for row in source:
+                    if row["id"] in seen:
+                        continue
+                    seen.add(row["id"])
+                    fh.write(dumps(row) + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return len(seen)
+
+
+# ─── Read path ────────────────────────────────────────────────────────────────
+
+def _match(value, lookup, expected):
+    if lookup == "exact":
+        return value == expected
+    if lookup == "gte":
+        return value is not None and value >= expected
+    if lookup == "lte":
+        return value is not None and value <= expected
+    if lookup == "icontains":
+        return expected.upper() in (value or "").upper()
+    raise ValueError(f"Unsupported archive lookup: {lookup}")
+
+
+def matches(row: dict, lookups: dict) -> bool:
+    """Evaluate the ORM-style lookups AuditLogViewSet builds against an archived row."""
+    for key, expected in lookups.items():
+        column, _, lookup = key.partition("__")
+        if not _match(row.get(column), lookup or "exact", expected):
+            return False
+    return True
+
+
+def check_range(start, end):
+    """
+    Raise ValueError unless start..end is bounded and touches at most
+    settings.AUDIT_ARCHIVE_MAX_MONTHS archive files.
+    """
+    if start is None or end is None:
+        raise ValueError("start and end are required to read archived months.")
+    limit = settings.AUDIT_ARCHIVE_MAX_MONTHS
+    if end >= add_months(month_start(start), limit):
+        raise ValueError(f"Archived reads may span at most {limit} calendar months.")
+
+
+def search(lookups: dict, start, end) -> list[dict]:
+    """Archived rows matching lookups, newest first, reading only the months in start..end."""
+    check_range(start, end)
+    results = []
+    for month in archived_months():
+        if add_months(month, 1) <= start or month > end:
+            continue
+        results.extend(row for row in read_month(month) if matches(row, lookups))
+    results.sort(key=lambda row: row["timestamp"], reverse=True)
+    return results
@@ -0,0 +1,156 @@
+"""
+Redis-backed buffer that moves AuditLog inserts off the request path.
+
+AuditLog.log() pushes each entry onto a Redis list once the surrounding
+transaction commits; the flush_audit_log Celery task drains the list in
+batches with bulk_create. Entries are only trimmed from the list after
+their batch is written, so delivery is at-least-once.
+
+One flusher runs at a time under a token lock. Each batch's trim renews
+the lock in the same MULTI/EXEC, and only commits while the lock is still
+ours (WATCH): a flusher whose lock expired mid-batch leaves the entries for
+the flusher that took over instead of trimming entries it never read. A
+run stops after AUDIT_LOG_FLUSH_BUDGET_S; the next one carries on.
+
+Entries that cannot be built or inserted on their own (malformed JSON,
+unknown fields, values the column rejects) are moved to DEAD_KEY instead of
+blocking the head of the list on every flush.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.utils.dateparse import parse_datetime
+from django_redis import get_redis_connection
+from redis.exceptions import WatchError
+
+from booking_project.renderers import dumps_str, loads
+
+PENDING_KEY = "audit:pending"
+DEAD_KEY = "audit:dead"
+FLUSH_LOCK_KEY = "audit:flush_lock"
+FLUSH_LOCK_TTL_S = 60
+
+
+def enqueue(entry: dict) -> bool:
+    """Append an entry to the pending list. Returns False if Redis is unavailable."""
+    try:
+        conn = get_redis_connection("default")
+        conn.rpush(PENDING_KEY, dumps_str(entry))
+        return True
+    except Exception as e:
+        print(f"Audit enqueue failed, writing synchronously: {e}")
+        return False
+
+
+def pending_count() -> int:
+    conn = get_redis_connection("default")
+    return conn.llen(PENDING_KEY)
+
+
+def dead_count() -> int:
+    conn = get_redis_connection("default")
+    return conn.llen(DEAD_KEY)
+
+
+def _build(raw):
+    from ..models_audit import AuditLog
+    data = loads(raw)
+    data['timestamp'] = parse_datetime(data['timestamp'])
+    return AuditLog(**data)
+
+
+def _parse(batch):
+    """(raw, AuditLog) pairs for the entries that build, plus the raw ones that do not."""
+    rows, dead = [], []
+    for raw in batch:
+        try:
+            rows.append((raw, _build(raw)))
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"Audit entry dead-lettered, not buildable: {e}")
+            dead.append(raw)
+    return rows, dead
+
+
+def _write(rows) -> list:
+    """Insert the rows; returns the raw entries that could not be written."""
+    from ..models_audit import AuditLog
+    try:
+        with transaction.atomic():
+            AuditLog.objects.bulk_create([row for _, row in rows])
+        return []
+    except (IntegrityError, DataError):
+        pass
+
+    # One bad row (e.g. the user was deleted meanwhile) must not block the batch
+    failed = []
+    for raw, row in rows:
+        try:
+            with transaction.atomic():
+                row.save()
+            continue
+        except IntegrityError:
+            row.user_id = None
+        except DataError:
+            pass
+        try:
+            with transaction.atomic():
+                row.save()
+        except (IntegrityError, DataError) as e:
+            print(f"Audit entry dead-lettered, not insertable: {e}")
+            failed.append(raw)
+    return failed
+
+
+def _while_locked(conn, token, apply) -> bool:
+    """Queue apply(pipe)'s commands in one MULTI/EXEC that only runs while token holds the lock."""
+    with conn.pipeline() as pipe:
+        try:
+            pipe.watch(FLUSH_LOCK_KEY)
+            if (pipe.get(FLUSH_LOCK_KEY) or b"").decode() != token:
+                return False
+            pipe.multi()
+            apply(pipe)
+            pipe.execute()
+            return True
+        except WatchError:
+            return False
+
+
+def flush(batch_size: int = 500, budget_s: float | None = None) -> int:
+    """
+    Drain the pending list into the database for up to budget_s seconds.
+    Only one flusher runs at a time; returns the number of entries written
+    (0 if another flusher holds the lock).
+    """
+    budget_s = settings.AUDIT_LOG_FLUSH_BUDGET_S if budget_s is None else budget_s
+    conn = get_redis_connection("default")
+    token = uuid.uuid4().hex
+    if not conn.set(FLUSH_LOCK_KEY, token, nx=True, ex=FLUSH_LOCK_TTL_S):
+        return 0
+
+    started = time.monotonic()
+    written = 0
+    try:
+        while time.monotonic() - started < budget_s:
+            batch = conn.lrange(PENDING_KEY, 0, batch_size - 1)
+            if not batch:
+                break
+            rows, dead = _parse(batch)
+            dead += _write(rows)
+
+            def commit(pipe):
+                pipe.ltrim(PENDING_KEY, len(batch), -1)
+                if dead:
+                    pipe.rpush(DEAD_KEY, *dead)
+                pipe.expire(FLUSH_LOCK_KEY, FLUSH_LOCK_TTL_S)
+
+            if not _while_locked(conn, token, commit):
+                # The batch is written but another flusher may already own these entries
+                print("Audit flush lock lost; leaving the batch to the current holder")
+                break
+            written += len(batch) - len(dead)
+    finally:
+        _while_locked(conn, token, lambda pipe: pipe.delete(FLUSH_LOCK_KEY))
+    return written
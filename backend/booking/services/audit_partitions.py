@@ -0,0 +1,256 @@
+"""
+Monthly range partitioning and retention for the AuditLog table (Postgres).
+
+Layout after `manage.py partition_audit_log`:
+
+    booking_auditlog                 PARTITION BY RANGE ("timestamp"), PK (id, timestamp)
+      booking_auditlog_p2026_01      one partition per calendar month (UTC)
+      ...
+      booking_auditlog_default       safety net for months nobody created yet
+
+ensure_partitions() keeps a few months ahead created; archive_expired()
+detaches months older than the hot window, streams them to disk and drops
+them, which is metadata-only instead of a large DELETE. On a table that has
+not been converted (or on SQLite) archival falls back to deleting the rows
+it exported.
+"""
+import datetime
+
+from django.db import connection, transaction
+
+from ..db_extensions import create_postgres_indexes
+from ..models_audit import AuditLog
+from . import audit_archive
+
+TABLE = AuditLog._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+MONTHS_AHEAD = 3
+ARCHIVE_CHUNK_SIZE = 2000
+
+
+def partition_name(month: datetime.datetime) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def existing_partitions() -> set[str]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)", [TABLE]
+        )
+        return {name for (name,) in cursor.fetchall()}
+
+
+def _create_partition(cursor, month):
+    """
+    Create and attach one month. Rows that already landed in the default
+    partition for that month are moved first, otherwise ATTACH would fail.
+    """
+    name = partition_name(month)
+    bounds = [month, audit_archive.add_months(month, 1)]
+    qn = connection.ops.quote_name
+    cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {qn(DEFAULT_PARTITION)} '
+        f'WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+        f'INSERT INTO {qn(name)} SELECT * FROM moved', bounds
+    )
+    cursor.execute(
+        f"ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)", bounds
+    )
+
+
+def ensure_partitions(now=None) -> list[str]:
+    """
+    Create partitions for the current month, MONTHS_AHEAD months after it and
+    any month that has spilled into the default partition. Returns the names
+    of the partitions created.
+    """
+    if not is_partitioned():
+        return []
+
+    current = audit_archive.month_start(now or datetime.datetime.now(datetime.timezone.utc))
+    months = {audit_archive.add_months(current, n) for n in range(MONTHS_AHEAD + 1)}
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT date_trunc('month', \"timestamp\") FROM {qn(DEFAULT_PARTITION)}")
+        months.update(audit_archive.month_start(m) for (m,) in cursor.fetchall())
+
+    existing = existing_partitions()
+    created = []
+    for month in sorted(months):
+        if partition_name(month) in existing:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            _create_partition(cursor, month)
+        created.append(partition_name(month))
+    return created
+
+
+def _partition_month(name):
+    return datetime.datetime.strptime(name[len(TABLE) + 2:], "%Y_%m").replace(tzinfo=datetime.timezone.utc)
+
+
+def detached_partitions() -> set[str]:
+    """Month tables detached by an archive run that stopped before dropping them."""
+    pattern = TABLE.replace("_", r"\_") + r"\_p____\___"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname FROM pg_class WHERE relname LIKE %s AND relkind = 'r' AND NOT relispartition",
+            [pattern],
+        )
+        return {name for (name,) in cursor.fetchall()}
+
+
+def _months_before(cutoff):
+    if is_partitioned():
+        months = {
+            _partition_month(name) for name in existing_partitions() - {DEFAULT_PARTITION}
+            if _partition_month(name) < cutoff
+        }
+        return sorted(months | {_partition_month(name) for name in detached_partitions()})
+    return [
+        audit_archive.month_start(m)
+        for m in AuditLog.objects.filter(timestamp__lt=cutoff).datetimes('timestamp', 'month')
+    ]
+
+
+def _table_rows(table):
+    """AuditLog.objects.values()-shaped rows of table, read in id order one chunk at a time."""
+    qn = connection.ops.quote_name
+    fields = [f.attname for f in AuditLog._meta.concrete_fields]
+    last = 0
+    while chunk := list(AuditLog.objects.raw(
+        f"SELECT * FROM {qn(table)} WHERE id > %s ORDER BY id LIMIT %s", [last, ARCHIVE_CHUNK_SIZE]
+    )):
+        for entry in chunk:
+            yield {f: getattr(entry, f) for f in fields}
+        last = chunk[-1].id
+
+
+def _archive_partition(month) -> int:
+    """
+    Detach the month first so nothing can still write to it, then export the
+    detached table and drop it. An entry flushed late for that month lands in
+    the default partition and is archived by a later run.
+    """
+    name = partition_name(month)
+    qn = connection.ops.quote_name
+    if name in existing_partitions():
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(name)}")
+    count = audit_archive.write_month(month, _table_rows(name))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {qn(name)}")
+    return count
+
+
+def _archive_rows(month) -> int:
+    """Export the month, then delete exactly the rows that were exported."""
+    in_month = AuditLog.objects.filter(
+        timestamp__gte=month, timestamp__lt=audit_archive.add_months(month, 1)
+    )
+    exported = []
+
+    def rows():
+        for row in in_month.order_by('id').values().iterator(chunk_size=ARCHIVE_CHUNK_SIZE):
+            exported.append(row['id'])
+            yield row
+
+    count = audit_archive.write_month(month, rows())
+    with transaction.atomic():
+        for n in range(0, len(exported), ARCHIVE_CHUNK_SIZE):
+            AuditLog.objects.filter(pk__in=exported[n:n + ARCHIVE_CHUNK_SIZE]).delete()
+    return count
+
+
+def archive_expired(now=None) -> dict:
+    """
+    Move every month older than the hot window to the archive directory.
+    Each month is written and fsynced before its rows leave the database.
+    Returns {"YYYY-MM": rows_archived}.
+    """
+    cutoff = audit_archive.hot_cutoff(now or datetime.datetime.now(datetime.timezone.utc))
+    archive = _archive_partition if is_partitioned() else _archive_rows
+    return {f"{month:%Y-%m}": archive(month) for month in _months_before(cutoff)}
+
+
+def convert():
+    """
+    One-time conversion of the plain AuditLog table into a partitioned one.
+    Existing rows are copied into their monthly partitions inside a single
+    transaction, so run it in a maintenance window on large tables.
+    """
+    if connection.vendor != 'postgresql':
+        raise RuntimeError("AuditLog partitioning requires PostgreSQL.")
+    if is_partitioned():
+        return False
+
+    qn = connection.ops.quote_name
+    legacy = f"{TABLE}_legacy"
+    sequence = f"{TABLE}_id_seq"
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Deferred FK checks still queued on the table would block ALTER TABLE
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            # Free the names of the old table's PK, indexes and id sequence
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} RENAME TO {qn(legacy)}")
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+                [legacy],
+            )
+            (pkey,) = cursor.fetchone()
+            cursor.execute(f"ALTER TABLE {qn(legacy)} RENAME CONSTRAINT {qn(pkey)} TO {qn(legacy + '_pkey')}")
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+                [legacy, legacy + '_pkey'],
+            )
+            for (index,) in cursor.fetchall():
+                cursor.execute(f"DROP INDEX {qn(index)}")
+            cursor.execute(f"ALTER TABLE {qn(legacy)} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+            cursor.execute(f"ALTER TABLE {qn(legacy)} ALTER COLUMN id DROP DEFAULT")
+            cursor.execute(f"DROP SEQUENCE IF EXISTS {qn(sequence)}")
+
+            # Partitioned parent; the partition key has to be part of the PK
+            cursor.execute(
+                f'CREATE TABLE {qn(TABLE)} (LIKE {qn(legacy)} INCLUDING DEFAULTS) '
+                f'PARTITION BY RANGE ("timestamp")'
+            )
+            cursor.execute(f'ALTER TABLE {qn(TABLE)} ADD PRIMARY KEY (id, "timestamp")')
+            cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(TABLE)}.id")
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} ALTER COLUMN id SET DEFAULT nextval(%s)", [sequence])
+            cursor.execute(
+                f"SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {qn(legacy)}), 0) + 1, false)", [sequence]
+            )
+
+        # Indexes and the user FK exactly as the model declares them, plus the Postgres-only ones
+        with connection.schema_editor(atomic=False) as editor:
+            for sql in editor._model_indexes_sql(AuditLog):
+                editor.execute(sql)
+            user_field = AuditLog._meta.get_field('user')
+            editor.execute(editor._create_fk_sql(AuditLog, user_field, "_fk_%(to_table)s_%(to_column)s"))
+        create_postgres_indexes(connection.alias)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(TABLE)} DEFAULT")
+            cursor.execute(f"SELECT DISTINCT date_trunc('month', \"timestamp\") FROM {qn(legacy)}")
+            months = {audit_archive.month_start(m) for (m,) in cursor.fetchall()}
+            current = audit_archive.month_start(datetime.datetime.now(datetime.timezone.utc))
+            months.update(audit_archive.add_months(current, n) for n in range(MONTHS_AHEAD + 1))
+            for month in sorted(months):
+                _create_partition(cursor, month)
+
+            cursor.execute(f"INSERT INTO {qn(TABLE)} SELECT * FROM {qn(legacy)}")
+            cursor.execute(f"DROP TABLE {qn(legacy)}")
+    return True
@@ -0,0 +1,111 @@
+"""
+Booking change feed for delta sync.
+
+Every booking write appends BookingChange rows (upserts and delete
+tombstones) inside the same transaction, so a change is visible exactly
+when the booking write is. Clients hold the last seq they have seen as an
+opaque token and pull only the changes after it.
+
+Sequence values are assigned at insert time but become visible at commit,
+so a slow transaction can commit a lower seq after a higher one was read.
+The returned token therefore never moves past a change younger than
+SETTLE_S; those changes are sent again on the next pull, which is harmless
+because clients apply them idempotently.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import Booking
+from ..models_changes import BookingChange
+from ..serializers.booking import BookingCompactSerializer, compact_queryset
+
+PAGE_SIZE = 1000
+SETTLE_S = 10
+PRUNED_KEY = "booking_changes:pruned_through"
+
+
+class TokenExpired(Exception):
+    """The token is older than the retained history; the client must refetch."""
+
+
+def record(desk_id, room_id, upserts=(), deletes=()):
+    """
+    Append changes for bookings on a desk. upserts and deletes are
+    (booking_id, user_id) pairs. Call inside the writing transaction
+    (subscribers.record_booking_changes does, for every BookingsChanged).
+    """
+    rows = [
+        BookingChange(booking_id=booking_id, op=op, desk_id=desk_id, room_id=room_id, user_id=user_id)
+        for op, pairs in ((BookingChange.Op.UPSERT, upserts), (BookingChange.Op.DELETE, deletes))
+        for booking_id, user_id in pairs
+    ]
+    BookingChange.objects.bulk_create(rows)
+
+
+def current_token() -> str:
+    latest = BookingChange.objects.aggregate(seq=Max('seq'))['seq'] or 0
+    return str(max(latest, cache.get(PRUNED_KEY) or 0))
+
+
+def parse_token(token: str) -> int:
+    if not token.isdigit():
+        raise ValueError("Invalid sync token")
+    since = int(token)
+    if since < (cache.get(PRUNED_KEY) or 0):
+        raise TokenExpired()
+    return since
+
+
+def changes_since(since: int, filters: dict, limit: int = PAGE_SIZE) -> dict:
+    """
+    Changes after seq `since` matching filters (room_id / desk_id / user_id),
+    collapsed to the latest state per booking.
+    """
+    rows = list(
+        BookingChange.objects.filter(seq__gt=since, **filters)
+        .order_by('seq').values_list('seq', 'booking_id', 'op', 'changed_at')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    token = since
+    settled = timezone.now() - datetime.timedelta(seconds=SETTLE_S)
+    settling = False
+    for seq, booking_id, op, changed_at in rows:
+        latest[booking_id] = op
+        settling = settling or changed_at > settled
+        if not settling:
+            token = seq
+
+    upsert_ids = [booking_id for booking_id, op in latest.items() if op == BookingChange.Op.UPSERT]
+    bookings = BookingCompactSerializer(
+        compact_queryset(Booking.objects.filter(pk__in=upsert_ids).order_by('start_time', 'id')), many=True
+    ).data
+    found = {row['id'] for row in bookings}
+    deleted = sorted(
+        booking_id for booking_id, op in latest.items()
+        if op == BookingChange.Op.DELETE or booking_id not in found
+    )
+    return {
+        'token': str(token),
+        'upserts': bookings,
+        'deleted_ids': deleted,
+        'has_more': has_more,
+    }
+
+
+def prune() -> int:
+    """Drop changes older than BOOKING_CHANGES_RETENTION_DAYS; older tokens then expire."""
+    cutoff = timezone.now() - datetime.timedelta(days=settings.BOOKING_CHANGES_RETENTION_DAYS)
+    old = BookingChange.objects.filter(changed_at__lt=cutoff)
+    through = old.aggregate(seq=Max('seq'))['seq']
+    if through is None:
+        return 0
+    cache.set(PRUNED_KEY, max(through, cache.get(PRUNED_KEY) or 0), None)
+    deleted, _ = BookingChange.objects.filter(seq__lte=through).delete()
+    return deleted
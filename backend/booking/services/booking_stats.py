@@ -0,0 +1,124 @@
+"""
+Per-user booking statistics for the dashboard panel.
+
+Every figure is a SQL aggregate over the user's bookings, so the response
+size no longer depends on how many bookings the user has ever made. Results
+are cached per user and timezone; any booking write for the user bumps a
+version key, which orphans every cached variant at once.
+"""
+import datetime
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractWeekDay
+from django.utils import timezone
+
+from ..models import Booking
+from ..serializers.booking import BookingCompactSerializer, compact_queryset
+from .intervals import clipped_duration, duration, overlaps
+
+CACHE_TTL_S = 60
+RECENT_DAYS = 30
+
+
+def _version_key(user_id):
+    return f"booking_stats:{user_id}:version"
+
+
+def invalidate(*user_ids):
+    for user_id in set(user_ids):
+        cache.set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def version(user_id) -> str:
+    """Current booking-data version for the user; changes on every booking write for them."""
+    return cache.get_or_set(_version_key(user_id), lambda: uuid.uuid4().hex, None)
+
+
+def _hours(value):
+    return round(value.total_seconds() / 3600, 2) if value else 0.0
+
+
+def _first_compact(qs):
+    booking = compact_queryset(qs.order_by('start_time')).first()
+    return BookingCompactSerializer(booking).data if booking else None
+
+
+def compute(user, tz, now=None) -> dict:
+    now = now or timezone.now()
+    local_now = now.astimezone(tz)
+    today = local_now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today - datetime.timedelta(days=today.weekday())
+    week_end = week_start + datetime.timedelta(days=7)
+    month_start = today.replace(day=1)
+    month_end = (month_start + datetime.timedelta(days=32)).replace(day=1)
+    recent_start = now - datetime.timedelta(days=RECENT_DAYS)
+
+    mine = Booking.objects.filter(user=user)
+    totals = mine.aggregate(
+        week_hours=Sum(clipped_duration(week_start, week_end), filter=overlaps(week_start, week_end)),
+        week_bookings=Count('id', filter=overlaps(week_start, week_end) & Q(end_time__gt=now)),
+        month_hours=Sum(clipped_duration(month_start, month_end), filter=overlaps(month_start, month_end)),
+        upcoming=Count('id', filter=Q(end_time__gt=now)),
+        recent_bookings=Count('id', filter=Q(start_time__gte=recent_start, end_time__lte=now)),
+        recent_hours=Sum(
+            duration(),
+            filter=Q(start_time__gte=recent_start, end_time__lte=now),
+        ),
+    )
+
+    # Finished bookings of the last 30 days drive the "favourite" figures
+    recent = mine.filter(start_time__gte=recent_start, end_time__lte=now).order_by()
+    location = (
+        recent.values('location__name')
+        .annotate(n=Count('id'))
+        .order_by('-n', 'location__name')
+        .first()
+    )
+    desk = (
+        recent.values('desk_id', 'desk__name', 'room__name')
+        .annotate(total=Sum(duration()))
+        .order_by('-total', 'desk_id')
+        .first()
+    )
+    weekday = (
+        recent.annotate(weekday=ExtractWeekDay('start_time', tzinfo=tz))
+        .values('weekday')
+        .annotate(n=Count('id'))
+        .order_by('-n', 'weekday')
+        .first()
+    )
+
+    return {
+        'ongoing': _first_compact(mine.filter(start_time__lte=now, end_time__gt=now)),
+        'next': _first_compact(mine.filter(start_time__gt=now)),
+        'hours_this_week': _hours(totals['week_hours']),
+        'week_bookings': totals['week_bookings'],
+        'hours_this_month': _hours(totals['month_hours']),
+        'upcoming_count': totals['upcoming'],
+        'last_30_days': {
+            'bookings': totals['recent_bookings'],
+            'hours': _hours(totals['recent_hours']),
+        },
+        'favourite_location': location['location__name'] if location else None,
+        'favourite_desk': {
+            'id': desk['desk_id'],
+            'name': desk['desk__name'],
+            'room_name': desk['room__name'],
+            'hours': _hours(desk['total']),
+        } if desk else None,
+        # 0 = Sunday … 6 = Saturday, like Date.getDay()
+        'busiest_weekday': weekday['weekday'] - 1 if weekday else None,
+        'timezone': str(tz),
+        'generated_at': now,
+    }
+
+
+def get(user, tz) -> dict:
+    key = f"booking_stats:{user.id}:{version(user.id)}:{tz}"
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute(user, tz)
+        cache.set(key, stats, CACHE_TTL_S)
+    return stats
@@ -0,0 +1,129 @@
+"""
+Everything the SPA needs after login, in one response.
+
+Sections are independent, so build() runs them on a shared thread pool.
+Each worker uses its own database connection and closes it when done.
+Inside a transaction (tests, ATOMIC_REQUESTS) the sections run inline,
+because other connections would not see the transaction's rows.
+"""
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.utils import timezone
+
+from ..models import Booking, Country, Desk, Floor, Location, Room
+from ..models_preferences import UserPreferences
+from ..serializers.booking import BookingCompactSerializer, compact_queryset
+from ..serializers.preferences import UserPreferencesSerializer
+from ..serializers.querysets import count_of
+from . import booking_stats
+
+TOPOLOGY_KEY = "bootstrap:topology"
+TOPOLOGY_TTL_S = 60
+BOOKINGS_TTL_S = 60
+BOOKING_DAYS = 8  # today plus the next 7 days
+
+_executor = None
+
+
+def me(user) -> dict:
+    """Basic profile and role flags, as served by /auth/me/."""
+    is_location_manager = user.managed_locations.exists()
+    is_room_manager = user.managed_rooms.exists()
+    return {
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+        "is_staff": user.is_staff,
+        "is_superuser": user.is_superuser,
+        "is_location_manager": is_location_manager,
+        "is_room_manager": is_room_manager,
+        "is_any_manager": is_location_manager or is_room_manager,
+        "role": "Superuser" if user.is_superuser else ("Staff" if user.is_staff else "User"),
+        "groups": [group.name for group in user.groups.all()],
+    }
+
+
+def preferences(user) -> dict:
+    prefs, _ = UserPreferences.objects.select_related('default_location').get_or_create(user=user)
+    return UserPreferencesSerializer(prefs).data
+
+
+def _compute_topology() -> list:
+    locations = {}
+    for loc in (
+        Location.objects.annotate(
+            num_floors=count_of(Floor, 'location'),
+            num_rooms=count_of(Room, 'location'),
+            num_desks=count_of(Desk, 'location'),
+        ).order_by('name').values('id', 'name', 'country_id', 'lat', 'lng', 'num_floors', 'num_rooms', 'num_desks')
+    ):
+        locations.setdefault(loc.pop('country_id'), []).append(loc)
+    return [
+        {**country, 'locations': locations.get(country['id'], [])}
+        for country in Country.objects.order_by('name').values('id', 'name', 'country_code', 'lat', 'lng')
+    ]
+
+
+def topology() -> list:
+    """Countries with their locations and floor / room / desk counts; shared by all users."""
+    return cache.get_or_set(TOPOLOGY_KEY, _compute_topology, TOPOLOGY_TTL_S)
+
+
+def upcoming_bookings(user, tz) -> list:
+    """The user's bookings overlapping today and the next 7 days in tz."""
+    today = timezone.localdate(timezone.now(), tz)
+    key = f"bootstrap:bookings:{user.id}:{booking_stats.version(user.id)}:{tz}:{today}"
+    data = cache.get(key)
+    if data is None:
+        start = datetime.datetime.combine(today, datetime.time.min, tzinfo=tz)
+        end = start + datetime.timedelta(days=BOOKING_DAYS)
+        qs = Booking.objects.filter(user=user, start_time__lt=end, end_time__gt=start).order_by('start_time')
+        data = BookingCompactSerializer(compact_queryset(qs), many=True).data
+        cache.set(key, data, BOOKINGS_TTL_S)
+    return data
+
+
+def manager_scope(user) -> dict:
+    return {
+        'locations': list(user.managed_locations.order_by('name').values('id', 'name')),
+        'rooms': list(user.managed_rooms.order_by('name').values('id', 'name', 'location_id')),
+    }
+
+
+def _in_worker(fn, *args):
+    try:
+        return fn(*args)
+    finally:
+        connections.close_all()
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BOOTSTRAP_WORKERS, thread_name_prefix="bootstrap"
+        )
+    return _executor
+
+
+def build(user, tz) -> dict:
+    sections = {
+        'me': (me, user),
+        'preferences': (preferences, user),
+        'topology': (topology,),
+        'bookings': (upcoming_bookings, user, tz),
+        'manager_scope': (manager_scope, user),
+    }
+    if connection.in_atomic_block or settings.BOOTSTRAP_WORKERS < 2:
+        data = {name: fn(*args) for name, (fn, *args) in sections.items()}
+    else:
+        futures = {name: _pool().submit(_in_worker, fn, *args) for name, (fn, *args) in sections.items()}
+        data = {name: future.result() for name, future in futures.items()}
+    data['timezone'] = str(tz)
+    data['generated_at'] = timezone.now()
+    return data
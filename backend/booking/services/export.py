@@ -0,0 +1,89 @@
+"""
+Streaming CSV / NDJSON exports.
+
+Rows are read from a server-side cursor as values_list() tuples and encoded
+one at a time, so memory stays flat however many rows are exported.
+
+Under ASGI (Daphne) Django reads a sync iterator with sync_to_async(list),
+buffering the whole export before the first byte goes out, so there the
+response gets an async iterator that pulls LINES_PER_CHUNK lines at a time
+on the request's sync thread (the one holding the cursor's connection).
+WSGI requests keep the plain generator.
+"""
+import csv
+import datetime
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from booking_project.renderers import dumps, dumps_str
+
+CHUNK_SIZE = 2000
+LINES_PER_CHUNK = 500
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the encoded line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return dumps_str(value)
+    return value
+
+
+def _csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def _ndjson_lines(header, rows):
+    for row in rows:
+        yield dumps(dict(zip(header, row))) + b'\n'
+
+
+def _next_chunk(lines) -> bytes:
+    return b''.join(line if isinstance(line, bytes) else line.encode() for line in islice(lines, LINES_PER_CHUNK))
+
+
+async def _async_chunks(lines):
+    next_chunk = sync_to_async(_next_chunk, thread_sensitive=True)
+    while chunk := await next_chunk(lines):
+        yield chunk
+
+
+def stream_export(request, queryset, columns: dict, fmt: str, filename: str) -> StreamingHttpResponse:
+    """
+    Stream queryset as an attachment.
+
+    columns maps the output column name to the ORM path to read, e.g.
+    {'room': 'desk__room__name'}; fmt is 'csv' or 'ndjson'.
+    """
+    header = list(columns)
+    rows = queryset.values_list(*columns.values()).iterator(chunk_size=CHUNK_SIZE)
+    lines = _csv_lines(header, rows) if fmt == 'csv' else _ndjson_lines(header, rows)
+
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        lines = _async_chunks(lines)
+
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}-{timezone.now():%Y%m%d-%H%M%S}.{fmt}"'
+    )
+    return response
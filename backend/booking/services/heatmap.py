@@ -0,0 +1,140 @@
+"""
+Desk utilization heatmap for a room map.
+
+Bookings in the range are loaded once as (desk, start, end) arrays and all
+further work is NumPy array arithmetic:
+
+  - booked minutes per desk: interval lengths clipped to each day's working
+    window (occupancy.work_window, as in the rollups) and summed with np.add.at
+  - occupancy per time slot: +1 at each booking's first slot and -1 after
+    its last (np.add.at on a difference array), then a cumulative sum
+  - density grid: each desk's utilization splatted onto a grid over the
+    map as a Gaussian at its (pos_x, pos_y), which are fractions of the map
+
+Days are UTC calendar days, as in services.occupancy.
+"""
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import Booking
+from .intervals import overlaps
+from .occupancy import available_minutes, day_bounds, work_window
+
+CACHE_TTL_S = 300
+DENSITY_SIGMA = 0.06  # kernel width, as a fraction of the map
+
+
+def _desk_minutes(desk_idx, start_s, end_s, window_lo_s, window_hi_s, n_desks):
+    """Booked minutes per desk inside the daily working windows (one [lo, hi) pair per day)."""
+    overlap = (
+        np.minimum(end_s[:, None], window_hi_s[None, :]) - np.maximum(start_s[:, None], window_lo_s[None, :])
+    )
+    minutes = np.clip(overlap, 0, None).sum(axis=1) / 60
+    booked = np.zeros(n_desks)
+    np.add.at(booked, desk_idx, minutes)
+    return booked
+
+
+def _slot_occupancy(start_s, end_s, lo_s, n_slots, slot_s):
+    """Bookings active during any part of each slot (at most one per desk unless back-to-back)."""
+    first = np.clip((start_s - lo_s) // slot_s, 0, n_slots)
+    last = np.clip(-((lo_s - end_s) // slot_s), 0, n_slots)  # ceil division
+    diff = np.zeros(n_slots + 1, dtype=np.int32)
+    np.add.at(diff, first, 1)
+    np.add.at(diff, last, -1)
+    return np.cumsum(diff[:-1])
+
+
+def _weekday_hour_profile(occupancy, start, days, slots_per_day, n_desks):
+    """Mean share of desks booked per (weekday, hour), Monday first."""
+    slots_per_hour = slots_per_day // 24
+    by_hour = occupancy.reshape(days, 24, slots_per_hour).max(axis=2)
+    weekdays = (start.weekday() + np.arange(days)) % 7
+    totals = np.zeros((7, 24))
+    counts = np.zeros(7)
+    np.add.at(totals, weekdays, by_hour)
+    np.add.at(counts, weekdays, 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        profile = totals / counts[:, None] / max(n_desks, 1)
+    return np.minimum(np.nan_to_num(profile), 1)
+
+
+def _density_grid(xs, ys, weights, size):
+    centers = (np.arange(size) + 0.5) / size
+    gx = np.exp(-((centers[None, :] - xs[:, None]) ** 2) / (2 * DENSITY_SIGMA ** 2))
+    gy = np.exp(-((centers[None, :] - ys[:, None]) ** 2) / (2 * DENSITY_SIGMA ** 2))
+    grid = np.einsum('k,ky,kx->yx', weights, gy, gx)
+    peak = grid.max() if grid.size else 0
+    return grid / peak if peak > 0 else grid
+
+
+def compute(room, start: datetime.date, end: datetime.date, grid_size: int) -> dict:
+    lo, _ = day_bounds(start)
+    _, hi = day_bounds(end)
+    lo_s = int(lo.timestamp())
+    days = (end - start).days + 1
+    slot_s = settings.HEATMAP_SLOT_MINUTES * 60
+    slots_per_day = 86400 // slot_s
+
+    desks = list(room.desks.order_by('id').values_list('id', 'name', 'pos_x', 'pos_y'))
+    desk_ids = np.array([d[0] for d in desks], dtype=np.int64)
+    rows = list(
+        Booking.objects.filter(overlaps(lo, hi), room=room)
+        .values_list('desk_id', 'start_time', 'end_time')
+    )
+    desk_idx = np.searchsorted(desk_ids, np.fromiter((r[0] for r in rows), np.int64, len(rows)))
+    start_s = np.fromiter((int(r[1].timestamp()) for r in rows), np.int64, len(rows))
+    end_s = np.fromiter((int(r[2].timestamp()) for r in rows), np.int64, len(rows))
+
+    windows = [work_window(start + datetime.timedelta(days=n)) for n in range(days)]
+    window_lo_s = np.array([int(w_lo.timestamp()) for w_lo, _ in windows], dtype=np.int64)
+    window_hi_s = np.array([int(w_hi.timestamp()) for _, w_hi in windows], dtype=np.int64)
+    booked = _desk_minutes(desk_idx, start_s, end_s, window_lo_s, window_hi_s, len(desks))
+    available = available_minutes(start, end, 1)
+    utilization = booked / available if available else np.zeros(len(desks))
+    occupancy = _slot_occupancy(start_s, end_s, lo_s, days * slots_per_day, slot_s)
+
+    return {
+        'room_id': room.id,
+        'start': start,
+        'end': end,
+        'slot_minutes': settings.HEATMAP_SLOT_MINUTES,
+        'desks': [
+            {
+                'desk_id': desk_id,
+                'desk_name': name,
+                'pos_x': pos_x,
+                'pos_y': pos_y,
+                'booked_hours': round(float(booked[i]) / 60, 2),
+                'utilization': round(float(utilization[i]), 4) if available else None,
+            }
+            for i, (desk_id, name, pos_x, pos_y) in enumerate(desks)
+        ],
+        'peak_concurrent': int(occupancy.max()) if occupancy.size else 0,
+        'weekday_hour': np.round(
+            _weekday_hour_profile(occupancy, start, days, slots_per_day, len(desks)), 3
+        ).tolist(),
+        'grid_size': grid_size,
+        'density': np.round(
+            _density_grid(
+                np.array([d[2] for d in desks], dtype=float),
+                np.array([d[3] for d in desks], dtype=float),
+                utilization, grid_size,
+            ), 3
+        ).tolist(),
+    }
+
+
+def get(room, start: datetime.date, end: datetime.date, grid_size: int) -> dict:
+    key = (
+        f"room_heatmap:{room.id}:{start}:{end}:{grid_size}:{settings.HEATMAP_SLOT_MINUTES}:"
+        f"{settings.OCCUPANCY_DAY_START}:{settings.OCCUPANCY_HOURS_PER_DAY}"
+    )
+    data = cache.get(key)
+    if data is None:
+        data = compute(room, start, end, grid_size)
+        cache.set(key, data, CACHE_TTL_S)
+    return data
@@ -0,0 +1,51 @@
+"""
+Query expressions and date helpers for booking intervals, shared by stats,
+occupancy rollups and the availability endpoints.
+"""
+import datetime
+
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+
+def duration(start=None, end=None):
+    """end - start as a DurationField; defaults to the booking's own length."""
+    start = F('start_time') if start is None else start
+    end = F('end_time') if end is None else end
+    return ExpressionWrapper(end - start, output_field=DurationField())
+
+
+def clipped_duration(lo, hi):
+    """Length of each booking's overlap with [lo, hi)."""
+    return duration(
+        Greatest(F('start_time'), Value(lo, output_field=DateTimeField())),
+        Least(F('end_time'), Value(hi, output_field=DateTimeField())),
+    )
+
+
+def overlaps(lo, hi):
+    return Q(start_time__lt=hi, end_time__gt=lo)
+
+
+def day_start(day: datetime.date) -> datetime.datetime:
+    """Midnight starting day in the current timezone."""
+    return datetime.datetime.combine(day, datetime.time.min, tzinfo=timezone.get_current_timezone())
+
+
+def touches_days(first: datetime.date, last: datetime.date):
+    """
+    Sargable form of Q(start_time__date__lte=last, end_time__date__gte=first):
+    plain range predicates the (desk, end_time) index can serve.
+    """
+    return Q(start_time__lt=day_start(last + datetime.timedelta(days=1)), end_time__gte=day_start(first))
+
+
+def days_touched(start, end, first: datetime.date, last: datetime.date):
+    """Calendar days (current timezone) from start's to end's, clipped to [first, last]."""
+    tz = timezone.get_current_timezone()
+    day = max(start.astimezone(tz).date(), first)
+    stop = min(end.astimezone(tz).date(), last)
+    while day <= stop:
+        yield day
+        day += datetime.timedelta(days=1)
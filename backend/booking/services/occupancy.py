@@ -0,0 +1,358 @@
+"""
+Desk-day and room-day occupancy rollups.
+
+Booking writes mark the (desk, day) cells they touch as dirty in a Redis
+set once the transaction commits; the refresh_occupancy_rollups task pops
+them and recomputes only those cells plus the room-days they belong to.
+The nightly repair_occupancy_rollups task recomputes a whole date window,
+which also backfills an empty table and fixes writes that bypassed the API.
+
+Days are UTC calendar days. booked_minutes counts only the part of each
+booking inside the day's working window (work_window), the same window
+available_minutes is measured in, so utilization never exceeds 1; booking
+counts and peaks cover the whole day.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django_redis import get_redis_connection
+
+from ..models import Booking, Desk, Room
+from ..models_occupancy import DeskDayOccupancy, RoomDayOccupancy
+from .intervals import clipped_duration, overlaps
+
+DIRTY_KEY = "occupancy:dirty"
+
+
+def day_bounds(day: datetime.date):
+    lo = datetime.datetime.combine(day, datetime.time.min, tzinfo=datetime.timezone.utc)
+    return lo, lo + datetime.timedelta(days=1)
+
+
+def work_window(day: datetime.date):
+    """
+    [lo, hi) of the day's bookable hours: OCCUPANCY_HOURS_PER_DAY from
+    OCCUPANCY_DAY_START, cut at midnight. Empty (lo == hi) on non-workdays.
+    """
+    lo, hi = day_bounds(day)
+    if day.weekday() not in settings.OCCUPANCY_WORKDAYS:
+        return lo, lo
+    start = datetime.datetime.combine(
+        day, datetime.time.fromisoformat(settings.OCCUPANCY_DAY_START), tzinfo=datetime.timezone.utc
+    )
+    return start, min(start + datetime.timedelta(hours=settings.OCCUPANCY_HOURS_PER_DAY), hi)
+
+
+def days_between(start: datetime.datetime, end: datetime.datetime) -> list[datetime.date]:
+    """UTC days overlapped by [start, end)."""
+    first = start.astimezone(datetime.timezone.utc).date()
+    last = (end.astimezone(datetime.timezone.utc) - datetime.timedelta(microseconds=1)).date()
+    return [first + datetime.timedelta(days=n) for n in range((last - first).days + 1)]
+
+
+# ─── Dirty cells ──────────────────────────────────────────────────────────────
+
+def _queue(members):
+    def _push():
+        try:
+            get_redis_connection("default").sadd(DIRTY_KEY, *members)
+        except Exception as e:
+            # The nightly repair picks these cells up
+            print(f"Occupancy enqueue failed: {e}")
+
+    if members:
+        transaction.on_commit(_push)
+
+
+def mark_dirty(desk_id: int, room_id: int, *intervals):
+    """
+    Queue the desk's days covered by intervals ((start, end) pairs) for
+    recomputation after the current transaction commits. room_id is the room
+    the bookings were in, so its room-days are refreshed even if the desk has
+    moved or been deleted by the time the cells are popped.
+    """
+    _queue({
+        f"{desk_id}:{room_id}:{day.isoformat()}"
+        for start, end in intervals
+        for day in days_between(start, end)
+    })
+
+
+def mark_desk_dirty(desk_id: int):
+    """
+    Queue every rolled-up day of the desk under the room it was rolled up in.
+    Call before deleting a desk (its rows cascade away) or when moving it.
+    """
+    _queue({
+        f"{desk_id}:{room_id}:{day.isoformat()}"
+        for room_id, day in DeskDayOccupancy.objects.filter(desk_id=desk_id).values_list('room_id', 'date')
+    })
+
+
+def pop_dirty(limit: int):
+    """Pop up to limit members. Returns ({(desk_id, day)}, {(room_id, day)})."""
+    conn = get_redis_connection("default")
+    cells, room_days = set(), set()
+    for raw in conn.spop(DIRTY_KEY, limit) or []:
+        desk_id, *room_id, day = (raw.decode() if isinstance(raw, bytes) else raw).split(":")
+        day = datetime.date.fromisoformat(day)
+        cells.add((int(desk_id), day))
+        if room_id:  # members queued before room ids were recorded carry none
+            room_days.add((int(room_id[0]), day))
+    return cells, room_days
+
+
+# ─── Recompute ────────────────────────────────────────────────────────────────
+
+def _peak_concurrent(intervals):
+    """Maximum number of overlapping [start, end) intervals."""
+    events = sorted(
+        [(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals],
+        key=lambda e: (e[0], e[1]),  # ends sort before starts at the same instant
+    )
+    peak = current = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def _recompute_desk_days(day, desk_ids):
+    lo, hi = day_bounds(day)
+    work_lo, work_hi = work_window(day)
+    rows = (
+        Booking.objects.filter(overlaps(lo, hi), desk_id__in=desk_ids)
+        .values('desk_id', 'room_id')
+        .annotate(
+            booked=Sum(clipped_duration(work_lo, work_hi), filter=overlaps(work_lo, work_hi)),
+            n=Count('id'),
+        )
+        .order_by()
+    )
+    cells = [
+        DeskDayOccupancy(
+            desk_id=row['desk_id'], room_id=row['room_id'], date=day,
+            booked_minutes=int(row['booked'].total_seconds() // 60) if row['booked'] else 0,
+            bookings=row['n'],
+        )
+        for row in rows
+    ]
+    DeskDayOccupancy.objects.bulk_create(
+        cells,
+        update_conflicts=True,
+        unique_fields=['desk', 'date'],
+        update_fields=['room', 'booked_minutes', 'bookings', 'updated_at'],
+    )
+    booked = {cell.desk_id for cell in cells}
+    DeskDayOccupancy.objects.filter(date=day, desk_id__in=set(desk_ids) - booked).delete()
+
+
+def _recompute_room_day(room, day):
+    lo, hi = day_bounds(day)
+    totals = DeskDayOccupancy.objects.filter(room=room, date=day).aggregate(
+        booked=Sum('booked_minutes'), n=Sum('bookings')
+    )
+    if not totals['n']:
+        RoomDayOccupancy.objects.filter(room=room, date=day).delete()
+        return
+
+    intervals = [
+        (max(start, lo), min(end, hi))
+        for start, end in Booking.objects.filter(overlaps(lo, hi), room=room)
+        .values_list('start_time', 'end_time')
+    ]
+    RoomDayOccupancy.objects.update_or_create(
+        room=room, date=day,
+        defaults={
+            'location_id': room.get_location().id,
+            'booked_minutes': totals['booked'],
+            'bookings': totals['n'],
+            'peak_concurrent': _peak_concurrent(intervals),
+        },
+    )
+
+
+def recompute(cells, room_days=()) -> int:
+    """
+    Recompute the given (desk_id, day) cells, the room-days they belong to
+    and any extra (room_id, day) pairs. Returns the number of room-days touched.
+    """
+    by_day = defaultdict(set)
+    for desk_id, day in cells:
+        by_day[day].add(desk_id)
+
+    desk_rooms = dict(
+        Desk.objects.filter(id__in={desk_id for desk_id, _ in cells}).values_list('id', 'room_id')
+    )
+    room_days = set(room_days)
+    for day, desk_ids in by_day.items():
+        desk_ids = {d for d in desk_ids if d in desk_rooms}  # deleted desks' rows cascade away
+        if not desk_ids:
+            continue
+        with transaction.atomic():
+            _recompute_desk_days(day, desk_ids)
+        room_days.update((desk_rooms[d], day) for d in desk_ids)
+
+    rooms = Room.objects.in_bulk({room_id for room_id, _ in room_days})
+    for room_id, day in sorted(room_days):
+        if room_id not in rooms:
+            continue
+        with transaction.atomic():
+            _recompute_room_day(rooms[room_id], day)
+    return len(room_days)
+
+
+def refresh_dirty() -> int:
+    """Drain the dirty set in batches. Returns the number of desk-day cells recomputed."""
+    done = 0
+    while True:
+        cells, room_days = pop_dirty(settings.OCCUPANCY_REFRESH_BATCH)
+        if not cells:
+            return done
+        recompute(cells, room_days)
+        done += len(cells)
+
+
+def repair(start: datetime.date, end: datetime.date) -> int:
+    """
+    Recompute every cell in [start, end]: cells with bookings plus any
+    existing rollup rows (so rows for deleted bookings are cleared).
+    """
+    lo, _ = day_bounds(start)
+    _, hi = day_bounds(end)
+    cells = set(
+        DeskDayOccupancy.objects.filter(date__range=(start, end)).values_list('desk_id', 'date')
+    )
+    room_days = set(
+        RoomDayOccupancy.objects.filter(date__range=(start, end)).values_list('room_id', 'date')
+    )
+    for desk_id, s, e in (
+        Booking.objects.filter(overlaps(lo, hi)).values_list('desk_id', 'start_time', 'end_time')
+        .iterator(chunk_size=2000)
+    ):
+        cells.update((desk_id, day) for day in days_between(max(s, lo), min(e, hi)))
+    recompute(cells, room_days)
+    return len(cells)
+
+
+# ─── Analytics (rollups only) ─────────────────────────────────────────────────
+
+def _period_start(day, granularity):
+    return day - datetime.timedelta(days=day.weekday()) if granularity == 'week' else day
+
+
+def available_minutes(start, end, desk_count):
+    """Bookable minutes in [start, end] for desk_count desks: the work_window of each day."""
+    window = datetime.timedelta()
+    for n in range((end - start).days + 1):
+        lo, hi = work_window(start + datetime.timedelta(days=n))
+        window += hi - lo
+    return int(window.total_seconds() // 60) * desk_count
+
+
+def _figures(booked_minutes, available_minutes, **extra):
+    return {
+        'booked_hours': round(booked_minutes / 60, 2),
+        'available_hours': round(available_minutes / 60, 2),
+        'utilization': round(booked_minutes / available_minutes, 4) if available_minutes else None,
+        **extra,
+    }
+
+
+def _series(room_days, start, end, granularity, desk_count):
+    """
+    Bucket room-day rows ({date, booked_minutes, bookings, peak_concurrent})
+    into days or ISO weeks. Peak is the highest single-room peak in the bucket.
+    """
+    buckets = defaultdict(lambda: {'booked': 0, 'bookings': 0, 'peak': 0})
+    for row in room_days:
+        bucket = buckets[_period_start(row['date'], granularity)]
+        bucket['booked'] += row['booked_minutes']
+        bucket['bookings'] += row['bookings']
+        bucket['peak'] = max(bucket['peak'], row['peak_concurrent'])
+
+    series = []
+    period = _period_start(start, granularity)
+    step = datetime.timedelta(days=7 if granularity == 'week' else 1)
+    while period <= end:
+        bucket = buckets.get(period, {'booked': 0, 'bookings': 0, 'peak': 0})
+        lo, hi = max(period, start), min(period + step - datetime.timedelta(days=1), end)
+        series.append(_figures(
+            bucket['booked'], available_minutes(lo, hi, desk_count),
+            period=period, bookings=bucket['bookings'], peak_concurrent=bucket['peak'],
+        ))
+        period += step
+    return series
+
+
+def _report(room_days, start, end, granularity, desk_count):
+    series = _series(room_days, start, end, granularity, desk_count)
+    return {
+        'start': start,
+        'end': end,
+        'granularity': granularity,
+        'desk_count': desk_count,
+        'hours_per_day': settings.OCCUPANCY_HOURS_PER_DAY,
+        'totals': _figures(
+            sum(row['booked_minutes'] for row in room_days),
+            available_minutes(start, end, desk_count),
+            bookings=sum(row['bookings'] for row in room_days),
+            peak_concurrent=max((row['peak_concurrent'] for row in room_days), default=0),
+        ),
+        'series': series,
+    }
+
+
+def room_utilization(room, start, end, granularity='day') -> dict:
+    room_days = list(
+        RoomDayOccupancy.objects.filter(room=room, date__range=(start, end))
+        .values('date', 'booked_minutes', 'bookings', 'peak_concurrent')
+    )
+    desks = list(room.desks.order_by('name').values_list('id', 'name'))
+    report = _report(room_days, start, end, granularity, len(desks))
+
+    per_desk = {
+        row['desk_id']: row
+        for row in DeskDayOccupancy.objects.filter(room=room, date__range=(start, end))
+        .values('desk_id').annotate(booked=Sum('booked_minutes'), n=Sum('bookings')).order_by()
+    }
+    desk_available = available_minutes(start, end, 1)
+    report['desks'] = [
+        _figures(
+            per_desk.get(desk_id, {}).get('booked', 0), desk_available,
+            desk_id=desk_id, desk_name=name, bookings=per_desk.get(desk_id, {}).get('n', 0),
+        )
+        for desk_id, name in desks
+    ]
+    return report
+
+
+def location_utilization(location, start, end, granularity='day') -> dict:
+    room_days = list(
+        RoomDayOccupancy.objects.filter(location=location, date__range=(start, end))
+        .values('room_id', 'date', 'booked_minutes', 'bookings', 'peak_concurrent')
+    )
+    rooms = list(
+        Room.objects.filter(location=location)
+        .annotate(num_desks=Count('desks')).order_by('name').values('id', 'name', 'num_desks')
+    )
+    report = _report(room_days, start, end, granularity, sum(r['num_desks'] for r in rooms))
+
+    per_room = defaultdict(lambda: {'booked': 0, 'bookings': 0, 'peak': 0})
+    for row in room_days:
+        totals = per_room[row['room_id']]
+        totals['booked'] += row['booked_minutes']
+        totals['bookings'] += row['bookings']
+        totals['peak'] = max(totals['peak'], row['peak_concurrent'])
+    report['rooms'] = [
+        _figures(
+            per_room[r['id']]['booked'], available_minutes(start, end, r['num_desks']),
+            room_id=r['id'], room_name=r['name'], desk_count=r['num_desks'],
+            bookings=per_room[r['id']]['bookings'], peak_concurrent=per_room[r['id']]['peak'],
+        )
+        for r in rooms
+    ]
+    return report
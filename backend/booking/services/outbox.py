@@ -0,0 +1,162 @@
+"""
+Transactional outbox for channel-layer broadcasts and Celery tasks.
+
+broadcast() / enqueue_task() insert an OutboxEvent in the caller's
+transaction instead of talking to Redis, so nothing is published for a
+transaction that rolls back and desk row locks are never held across a
+Redis round trip.
+
+Events are relayed twice over:
+  - fast path: on commit, the ids written in each atomic block are handed to
+    a single background relay thread, so the request does not wait on Redis
+  - sweeper: the relay_outbox beat task drains anything the fast path
+    missed (publish errors, process exit) once it is RELAY_GRACE_S old
+
+Each relay pass locks its rows with SKIP LOCKED and deletes them after
+publishing, so the two paths never send an event twice. Broadcasts for the
+same group in one pass go out as a single "outbox.batch" message, which
+the consumers unpack (consumers.OutboxBatchMixin).
+"""
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+
+from asgiref.sync import async_to_sync
+from celery import current_app
+from channels.layers import get_channel_layer
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models_outbox import OutboxEvent
+
+BATCH_SIZE = 500
+RELAY_GRACE_S = 5
+MAX_ATTEMPTS = 10
+
+_executor = None
+
+
+def broadcast(group: str, message: dict):
+    """Send message to a channel-layer group once the current transaction commits."""
+    _write(OutboxEvent.Kind.BROADCAST, group, message)
+
+
+def enqueue_task(name: str, **kwargs):
+    """Queue the Celery task `name` with kwargs once the current transaction commits."""
+    _write(OutboxEvent.Kind.TASK, name, kwargs)
+
+
+class _Batch(list):
+    """
+    Ids written in one atomic block, relayed by calling it as that block's
+    on_commit callback. A rollback discards the callback and the ids with it.
+    """
+
+    def __call__(self):
+        if connection.in_atomic_block:
+            # Callbacks run inside an outer transaction (tests): a relay thread
+            # would not see these rows
+            relay(self)
+        else:
+            _pool().submit(_in_worker, self)
+
+
+def _current_batch():
+    conn = transaction.get_connection()
+    if not conn.in_atomic_block:
+        return None
+    sids = set(conn.savepoint_ids)
+    return next(
+        (func for func_sids, func, _ in conn.run_on_commit if isinstance(func, _Batch) and func_sids == sids),
+        None,
+    )
+
+
+def _write(kind, target, payload):
+    event = OutboxEvent.objects.create(kind=kind, target=target, payload=payload)
+    batch = _current_batch()
+    if batch is not None:
+        batch.append(event.id)
+    else:
+        transaction.on_commit(_Batch([event.id]))
+
+
+def _in_worker(ids):
+    try:
+        relay(ids)
+    except Exception as e:
+        print(f"Outbox fast path failed, left for relay_outbox: {e}")
+    finally:
+        connections.close_all()
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+    return _executor
+
+
+def _publish_broadcasts(events) -> list[int]:
+    channel_layer = get_channel_layer()
+    sent = []
+    for group, batch in groupby(sorted(events, key=lambda e: (e.target, e.id)), key=lambda e: e.target):
+        batch = list(batch)
+        message = batch[0].payload if len(batch) == 1 else {
+            "type": "outbox.batch",
+            "events": [event.payload for event in batch],
+        }
+        try:
+            async_to_sync(channel_layer.group_send)(group, message)
+        except Exception as e:
+            print(f"Outbox broadcast to {group} failed: {e}")
+            continue
+        sent.extend(event.id for event in batch)
+    return sent
+
+
+def _publish_tasks(events) -> list[int]:
+    sent = []
+    for event in events:
+        try:
+            current_app.send_task(event.target, kwargs=event.payload)
+        except Exception as e:
+            print(f"Outbox task {event.target} failed: {e}")
+            continue
+        sent.append(event.id)
+    return sent
+
+
+def relay(ids=None, limit: int = BATCH_SIZE) -> int:
+    """
+    Publish and delete pending events: the given ids, or else every event
+    older than RELAY_GRACE_S. Returns the number of events published.
+    """
+    with transaction.atomic():
+        qs = OutboxEvent.objects.select_for_update(skip_locked=True).order_by('id')
+        if ids is not None:
+            qs = qs.filter(id__in=ids)
+        else:
+            dropped, _ = OutboxEvent.objects.filter(attempts__gte=MAX_ATTEMPTS).delete()
+            if dropped:
+                print(f"Outbox dropped {dropped} events after {MAX_ATTEMPTS} failed attempts")
+            qs = qs.filter(created_at__lte=timezone.now() - datetime.timedelta(seconds=RELAY_GRACE_S))
+        events = list(qs[:limit])
+        if not events:
+            return 0
+        sent = _publish_broadcasts([e for e in events if e.kind == OutboxEvent.Kind.BROADCAST])
+        sent += _publish_tasks([e for e in events if e.kind == OutboxEvent.Kind.TASK])
+        OutboxEvent.objects.filter(id__in=sent).delete()
+        failed = set(e.id for e in events) - set(sent)
+        if failed:
+            OutboxEvent.objects.filter(id__in=failed).update(attempts=F('attempts') + 1)
+    return len(sent)
+
+
+def drain() -> int:
+    """Relay everything past the grace period, batch by batch."""
+    total = 0
+    while (sent := relay()):
+        total += sent
+    return total
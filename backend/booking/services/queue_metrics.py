@@ -0,0 +1,63 @@
+"""
+Per-queue Celery latency metrics.
+
+The producer stamps each task message with a published_at header
+(before_task_publish); when a worker starts the task (task_prerun) the wait
+in the queue is pushed onto a capped Redis list for that queue. snapshot()
+turns the recent samples and the broker queue depth into the numbers
+reported by `manage.py celery_queue_stats`.
+"""
+import statistics
+import time
+
+from django_redis import get_redis_connection
+
+SAMPLES = 500
+KEY = "celery:latency:{queue}"
+
+
+def stamp(headers: dict):
+    headers.setdefault("published_at", time.time())
+
+
+def record(queue: str, published_at: float):
+    wait_ms = max(0.0, (time.time() - float(published_at)) * 1000)
+    try:
+        conn = get_redis_connection("default")
+        pipe = conn.pipeline()
+        pipe.lpush(KEY.format(queue=queue), round(wait_ms, 1))
+        pipe.ltrim(KEY.format(queue=queue), 0, SAMPLES - 1)
+        pipe.execute()
+    except Exception as e:
+        print(f"Queue latency record failed for {queue}: {e}")
+
+
+def latency(queue: str) -> dict:
+    """Wait-in-queue stats (ms) over the last SAMPLES tasks started from queue."""
+    conn = get_redis_connection("default")
+    samples = sorted(float(v) for v in conn.lrange(KEY.format(queue=queue), 0, -1))
+    if not samples:
+        return {"samples": 0, "p50_ms": None, "p95_ms": None, "max_ms": None}
+    p95 = statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+    return {
+        "samples": len(samples),
+        "p50_ms": round(statistics.median(samples), 1),
+        "p95_ms": round(p95, 1),
+        "max_ms": samples[-1],
+    }
+
+
+def depth(app, queue: str) -> int | None:
+    """Messages waiting in the broker for queue, or None if it cannot be read."""
+    try:
+        with app.connection_for_read() as conn:
+            return conn.default_channel.queue_declare(queue, passive=True).message_count
+    except Exception:
+        return None
+
+
+def snapshot(app) -> dict[str, dict]:
+    return {
+        queue.name: {"depth": depth(app, queue.name), **latency(queue.name)}
+        for queue in app.conf.task_queues
+    }
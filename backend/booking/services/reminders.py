@@ -0,0 +1,70 @@
+"""
+Booking reminder sweeper.
+
+Instead of one ETA task per booking (held in worker memory until it fires,
+and stale once the booking is moved or cancelled), the sweep_booking_reminders
+beat task claims every booking that starts within the next
+REMINDER_LEAD_MINUTES and has not been reminded yet, stamping reminded_at
+in the same statement (UPDATE ... RETURNING, SKIP LOCKED so overlapping
+sweeps never claim the same row). Each claimed chunk becomes one
+send_booking_reminders task, queued through the outbox in the claiming
+transaction. A partial index on start_time WHERE reminded_at IS NULL keeps
+the scan proportional to the reminders that are due.
+
+A booking whose start moves is reminded again (BookingViewSet.perform_update
+clears reminded_at); a cancelled booking is simply gone when the send runs.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import Booking
+from . import outbox
+
+TABLE = Booking._meta.db_table
+SEND_TASK = "booking.email_notifications.send_booking_reminders"
+
+
+def _claim(now, until, limit) -> list[int]:
+    if connection.vendor != 'postgresql':
+        ids = list(
+            Booking.objects.filter(reminded_at__isnull=True, start_time__gt=now, start_time__lte=until)
+            .order_by('start_time').values_list('id', flat=True)[:limit]
+        )
+        Booking.objects.filter(pk__in=ids).update(reminded_at=now)
+        return ids
+
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        # The locking SELECT lives in a CTE so it runs exactly once; as an
+        # IN (...) subquery the planner may rescan it and claim past LIMIT
+        cursor.execute(
+            f"WITH due AS ("
+            f"  SELECT id FROM {qn(TABLE)}"
+            f"  WHERE reminded_at IS NULL AND start_time > %s AND start_time <= %s"
+            f"  ORDER BY start_time LIMIT %s FOR UPDATE SKIP LOCKED"
+            f") UPDATE {qn(TABLE)} b SET reminded_at = %s FROM due WHERE b.id = due.id RETURNING b.id",
+            [now, until, limit, now],
+        )
+        return sorted(booking_id for (booking_id,) in cursor.fetchall())
+
+
+def sweep(now=None, batch_size=None) -> int:
+    """
+    Claim every due reminder, batch_size bookings per send task. Returns the
+    number of bookings claimed.
+    """
+    now = now or timezone.now()
+    until = now + datetime.timedelta(minutes=settings.REMINDER_LEAD_MINUTES)
+    batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+    claimed = 0
+    while True:
+        with transaction.atomic():
+            ids = _claim(now, until, batch_size)
+            if ids:
+                outbox.enqueue_task(SEND_TASK, booking_ids=ids)
+        claimed += len(ids)
+        if len(ids) < batch_size:
+            return claimed
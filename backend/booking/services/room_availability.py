@@ -0,0 +1,108 @@
+"""
+Live per-room available-desk counters (Desk.is_available) for location views.
+
+Counts live in one Redis hash, room id -> available desks. Desk state
+transitions adjust them with HINCRBY after commit (subscribers.
+update_room_availability) and push a room_availability message to the
+room's location group. Room lists read them with a single HMGET instead of
+a COUNT per room.
+
+Rooms missing from the hash (cold cache, desks added or removed) are
+counted from the database on first read. The reconcile_room_availability
+task recounts every room periodically, fixing drift from writes that
+bypassed the events and announcing any count that changed. If Redis is
+unavailable, reads fall back to the database.
+"""
+from django.db.models import Count, Q
+from django_redis import get_redis_connection
+
+from ..models import Room
+from . import outbox
+
+KEY = "room_availability"
+
+
+def _count_from_db(room_ids=None) -> dict[int, tuple[int | None, int]]:
+    """room id -> (location id, available desks)."""
+    rooms = Room.objects.all() if room_ids is None else Room.objects.filter(pk__in=room_ids)
+    rows = rooms.annotate(
+        available=Count('desks', filter=Q(desks__is_booked=False, desks__is_permanent=False))
+    ).values_list('id', 'location_id', 'available')
+    return {room_id: (location_id, available) for room_id, location_id, available in rows}
+
+
+def _announce(room_id, location_id, count):
+    if location_id is not None:
+        outbox.broadcast(f"location_{location_id}", {
+            "type": "room_availability",
+            "room_id": room_id,
+            "available_desk_count": count,
+        })
+
+
+def counts(room_ids) -> dict[int, int]:
+    """Available desks per room, from Redis where present."""
+    room_ids = list(room_ids)
+    if not room_ids:
+        return {}
+    try:
+        conn = get_redis_connection("default")
+        cached = conn.hmget(KEY, room_ids)
+    except Exception:
+        return {room_id: n for room_id, (_, n) in _count_from_db(room_ids).items()}
+
+    result = {room_id: int(value) for room_id, value in zip(room_ids, cached) if value is not None}
+    missing = [room_id for room_id in room_ids if room_id not in result]
+    if missing:
+        fresh = {room_id: n for room_id, (_, n) in _count_from_db(missing).items()}
+        if fresh:
+            try:
+                conn.hset(KEY, mapping=fresh)
+            except Exception:
+                pass
+        result.update(fresh)
+    return result
+
+
+def adjust(room_id: int, location_id: int | None, delta: int):
+    """Apply one desk's transition (+1 became available, -1 taken) and announce it."""
+    try:
+        conn = get_redis_connection("default")
+        if conn.hexists(KEY, room_id):
+            count = conn.hincrby(KEY, room_id, delta)
+        else:
+            # Not cached yet: count now, after the transition committed
+            count = _count_from_db([room_id]).get(room_id, (None, 0))[1]
+            conn.hset(KEY, room_id, count)
+    except Exception as e:
+        # reconcile_room_availability repairs the counter
+        print(f"Room availability update failed: {e}")
+        return
+    _announce(room_id, location_id, count)
+
+
+def forget(room_id: int):
+    """Drop a room's counter (desks added or removed); the next read recounts it."""
+    try:
+        get_redis_connection("default").hdel(KEY, room_id)
+    except Exception as e:
+        print(f"Room availability invalidation failed: {e}")
+
+
+def reconcile() -> int:
+    """Recount every room, store the counts and announce those that changed."""
+    fresh = _count_from_db()
+    conn = get_redis_connection("default")
+    cached = {int(room_id): int(n) for room_id, n in conn.hgetall(KEY).items()}
+    if fresh:
+        conn.hset(KEY, mapping={room_id: n for room_id, (_, n) in fresh.items()})
+    stale = set(cached) - set(fresh)
+    if stale:
+        conn.hdel(KEY, *stale)
+
+    changed = 0
+    for room_id, (location_id, n) in fresh.items():
+        if cached.get(room_id, n) != n:
+            _announce(room_id, location_id, n)
+            changed += 1
+    return changed
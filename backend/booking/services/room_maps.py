@@ -0,0 +1,182 @@
+"""
+Room map image pipeline.
+
+upload_map stores the original under a content-hashed name and queues the
+process_room_map task, which renders with Pillow:
+
+  - one PNG and one WebP per ROOM_MAP_WIDTHS entry narrower than the original
+    (plus the original width)
+  - for plans larger than ROOM_MAP_TILE_THRESHOLD px on either side, a
+    deep-zoom pyramid of ROOM_MAP_TILE_SIZE WebP tiles
+    (level L is the image scaled by 2^(L - max_level); tiles/{L}/{col}_{row}.webp)
+
+Every file name is derived from its content hash, so a URL never changes
+meaning and serve_media can send it with a far-future immutable
+Cache-Control. The result is recorded in Room.map_variants as storage
+names; RoomSerializer turns them into URLs.
+"""
+import hashlib
+import io
+import math
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from ..models import Room
+
+DIR = "room_maps"
+
+
+def content_hash(chunks) -> str:
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+def hashed_upload_name(upload) -> str:
+    """<content hash><ext> for an uploaded file (upload_to puts it under room_maps/)."""
+    digest = content_hash(upload.chunks())
+    upload.seek(0)
+    ext = os.path.splitext(upload.name)[1].lower() or ".png"
+    return f"{digest}{ext}"
+
+
+def _save(name: str, data: bytes) -> str:
+    # Same name means same content: an existing file is already right
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+    return name
+
+
+def _encode(image, fmt) -> bytes:
+    out = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(out, "WEBP", quality=settings.ROOM_MAP_WEBP_QUALITY, method=4)
+    else:
+        image.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+
+def _save_hashed(image, fmt, suffix) -> str:
+    data = _encode(image, fmt)
+    return _save(f"{DIR}/v/{content_hash([data])}{suffix}.{fmt.lower()}", data)
+
+
+def _normalized(image):
+    # PNG and WebP both keep alpha; palette / 16-bit / CMYK inputs are converted once
+    return image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+
+def _tiles(image, source_hash) -> dict:
+    size = settings.ROOM_MAP_TILE_SIZE
+    width, height = image.size
+    max_level = math.ceil(math.log2(max(width, height)))
+    base = f"{DIR}/tiles/{source_hash}"
+    for level in range(max_level, -1, -1):
+        scale = 2 ** (level - max_level)
+        level_image = image if level == max_level else image.resize(
+            (max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))), Image.Resampling.LANCZOS,
+        )
+        for col in range(math.ceil(level_image.width / size)):
+            for row in range(math.ceil(level_image.height / size)):
+                box = (col * size, row * size, min((col + 1) * size, level_image.width),
+                       min((row + 1) * size, level_image.height))
+                _save(f"{base}/{level}/{col}_{row}.webp", _encode(level_image.crop(box), "WEBP"))
+    return {"base": base, "tile_size": size, "max_level": max_level, "format": "webp"}
+
+
+def render(source_name: str) -> dict:
+    """Render every variant of a stored original; returns the map_variants record."""
+    with default_storage.open(source_name, "rb") as f:
+        data = f.read()
+    source_hash = content_hash([data])
+    with Image.open(io.BytesIO(data)) as opened:
+        image = _normalized(opened)
+
+    widths = sorted({w for w in settings.ROOM_MAP_WIDTHS if w < image.width} | {image.width})
+    variants = []
+    for width in widths:
+        resized = image if width == image.width else image.resize(
+            (width, max(1, round(image.height * width / image.width))), Image.Resampling.LANCZOS,
+        )
+        variants.append({
+            "width": width,
+            "height": resized.height,
+            "png": _save_hashed(resized, "PNG", f"-{width}"),
+            "webp": _save_hashed(resized, "WEBP", f"-{width}"),
+        })
+
+    record = {
+        "source": source_name,
+        "source_hash": source_hash,
+        "width": image.width,
+        "height": image.height,
+        "variants": variants,
+        "tiles": None,
+    }
+    if max(image.size) > settings.ROOM_MAP_TILE_THRESHOLD:
+        record["tiles"] = _tiles(image, source_hash)
+    return record
+
+
+def process(room_id: int) -> dict | None:
+    """Render the room's current map and record it, unless the map changed meanwhile."""
+    room = Room.objects.filter(pk=room_id).only('map_image', 'map_variants').first()
+    if room is None or not room.map_image:
+        return None
+    if room.map_variants.get("source") == room.map_image.name:
+        return room.map_variants
+
+    record = render(room.map_image.name)
+    # A newer upload replaced the map while we rendered: its own task will record it
+    updated = Room.objects.filter(pk=room_id, map_image=room.map_image.name).update(map_variants=record)
+    return record if updated else None
+
+
+def delete_files(record: dict, room_id: int):
+    """Remove a map_variants record's files (the original belongs to the ImageField)."""
+    if not record.get("source_hash"):
+        return
+    # Variant names follow from the source content: another room with the same map shares them
+    if Room.objects.exclude(pk=room_id).filter(map_variants__source_hash=record["source_hash"]).exists():
+        return
+    names = [name for v in record.get("variants", []) for name in (v["png"], v["webp"])]
+    tiles = record.get("tiles")
+    if tiles:
+        for level in range(tiles["max_level"] + 1):
+            directory = f"{tiles['base']}/{level}"
+            try:
+                _, files = default_storage.listdir(directory)
+            except FileNotFoundError:
+                continue
+            names += [f"{directory}/{name}" for name in files]
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except Exception as e:
+            print(f"Room map file {name} not deleted: {e}")
+
+
+def urls(record: dict, build_url) -> dict | None:
+    """The map_variants record with storage names turned into URLs via build_url."""
+    if not record or not record.get("variants"):
+        return None
+    tiles = record.get("tiles")
+    return {
+        "width": record["width"],
+        "height": record["height"],
+        "variants": [
+            {"width": v["width"], "height": v["height"],
+             "png": build_url(default_storage.url(v["png"])), "webp": build_url(default_storage.url(v["webp"]))}
+            for v in record["variants"]
+        ],
+        "tiles": {
+            "url_template": build_url(default_storage.url(tiles["base"])) + "/{level}/{col}_{row}.webp",
+            "tile_size": tiles["tile_size"],
+            "max_level": tiles["max_level"],
+        } if tiles else None,
+    }
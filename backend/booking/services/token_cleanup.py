@@ -0,0 +1,58 @@
+"""
+Chunked cleanup of expired simplejwt tokens.
+
+With ROTATE_REFRESH_TOKENS and BLACKLIST_AFTER_ROTATION every refresh
+writes an OutstandingToken and a BlacklistedToken row. Instead of one
+unbounded DELETE over each table, cleanup() walks the expired tokens in id
+order and deletes them in id ranges of batch_size rows, one short
+transaction per range, until nothing is left or the time budget is spent.
+The next run picks up where this one stopped.
+
+Progress of the last run is kept in the cache under LAST_RUN_KEY.
+The expires_at index it relies on is created by
+db_extensions.create_token_indexes (simplejwt does not define one).
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+LAST_RUN_KEY = "token_cleanup:last_run"
+
+
+def cleanup(threshold, batch_size: int, budget_s: float) -> dict:
+    """
+    Delete tokens that expired before threshold (and their blacklist
+    entries). Returns the run's progress metrics.
+    """
+    started = time.monotonic()
+    stats = {'outstanding': 0, 'blacklisted': 0, 'batches': 0, 'complete': False}
+    expired = OutstandingToken.objects.filter(expires_at__lt=threshold)
+    last_id = 0
+    while time.monotonic() - started < budget_s:
+        ids = list(expired.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            stats['complete'] = True
+            break
+        lo, last_id = ids[0], ids[-1]
+        with transaction.atomic():
+            blacklisted, _ = BlacklistedToken.objects.filter(
+                token_id__gte=lo, token_id__lte=last_id, token__expires_at__lt=threshold,
+            ).delete()
+            outstanding, _ = expired.filter(id__gte=lo, id__lte=last_id).delete()
+        stats['blacklisted'] += blacklisted
+        # Blacklist rows went first, so this total is outstanding rows only
+        stats['outstanding'] += outstanding
+        stats['batches'] += 1
+
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    # Only counted (on the expires_at index) when the budget ran out
+    stats['remaining'] = 0 if stats['complete'] else expired.count()
+    stats['finished_at'] = timezone.now().isoformat()
+    try:
+        cache.set(LAST_RUN_KEY, stats, None)
+    except Exception as e:
+        print(f"Token cleanup metrics not stored: {e}")
+    return stats
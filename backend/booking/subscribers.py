@@ -0,0 +1,99 @@
+"""
+Subscribers to the model-change events in booking.events.
+Imported once by BookingConfig.ready().
+"""
+from .events import (
+    BookingsChanged, DeskLockChanged, DeskStateChanged, RoomLayoutChanged, RoomMaintenanceChanged, subscribe,
+)
+from .models import Booking
+from .serializers.booking import BookingCompactSerializer, compact_queryset
+from .services import booking_changes, booking_stats, occupancy, outbox, room_availability
+
+
+# ─── Bookings ─────────────────────────────────────────────────────────────────
+
+@subscribe(BookingsChanged)
+def record_booking_changes(event):
+    booking_changes.record(event.desk_id, event.room_id, upserts=event.upserted, deletes=event.deleted)
+
+
+@subscribe(BookingsChanged)
+def mark_occupancy_dirty(event):
+    if event.intervals:
+        occupancy.mark_dirty(event.desk_id, event.room_id, *event.intervals)
+
+
+@subscribe(BookingsChanged)
+def broadcast_bookings(event):
+    if not event.upserted and not event.deleted:
+        return
+    payload = {"type": "update_bookings", "desk_id": event.desk_id}
+    if event.upserted and not event.deleted:
+        payload["action"] = "upsert"
+    elif event.deleted and not event.upserted:
+        payload["action"] = "delete"
+    else:
+        payload["action"] = "mixed"
+    if event.upserted:
+        upserts = Booking.objects.filter(pk__in=[booking_id for booking_id, _ in event.upserted])
+        payload["bookings"] = BookingCompactSerializer(compact_queryset(upserts), many=True).data
+    if event.deleted:
+        payload["deleted_ids"] = [booking_id for booking_id, _ in event.deleted]
+    outbox.broadcast(f"room_{event.room_id}", payload)
+
+
+@subscribe(BookingsChanged, on_commit=True)
+def invalidate_booking_stats(event):
+    booking_stats.invalidate(*event.user_ids)
+
+
+# ─── Desks and rooms ──────────────────────────────────────────────────────────
+
+@subscribe(DeskStateChanged)
+def broadcast_desk_status(event):
+    outbox.broadcast(f"room_{event.room_id}", {
+        "type": "desk_status",
+        "desk_id": event.desk_id,
+        "is_booked": event.is_booked,
+        "booked_by": event.booked_by,
+    })
+
+
+@subscribe(DeskStateChanged, on_commit=True)
+def update_room_availability(event):
+    if event.was_available is not None and event.was_available != event.available:
+        room_availability.adjust(event.room_id, event.location_id, 1 if event.available else -1)
+
+
+@subscribe(DeskLockChanged)
+def broadcast_desk_lock(event):
+    message = {"type": "desk_lock", "desk_id": event.desk_id, "locked": event.locked}
+    if event.locked:
+        message["by"] = event.by
+    outbox.broadcast(f"room_{event.room_id}", message)
+
+
+@subscribe(RoomMaintenanceChanged)
+def broadcast_room_maintenance(event):
+    message = {"type": "room_maintenance", "room_id": event.room_id, "enabled": event.enabled, "by": event.by}
+    outbox.broadcast(f"room_{event.room_id}", message)
+    outbox.broadcast(f"location_{event.location_id}", message)
+
+
+@subscribe(RoomLayoutChanged)
+def broadcast_room_layout(event):
+    outbox.broadcast(f"room_{event.room_id}", {
+        "type": "layout_changed",
+        "room_id": event.room_id,
+        "desks": list(event.desks),
+        "created_ids": list(event.created_ids),
+        "deleted_ids": list(event.deleted_ids),
+        "by": event.by,
+    })
+
+
+@subscribe(RoomLayoutChanged, on_commit=True)
+def forget_room_availability(event):
+    # Moves and renames leave the count alone; added or removed desks change it
+    if event.created_ids or event.deleted_ids:
+        room_availability.forget(event.room_id)
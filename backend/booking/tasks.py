@@ -1,19 +1,29 @@
 from celery import shared_task
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 from django.db import transaction
+from . import events
 from .services.desk_lock import read_lock
+from .services.task_guard import single_flight
+
+# Desk state tasks share one single-flight lock; a run holding it longer than
+# this is assumed dead
+DESK_STATE_LOCK_TTL_S = 300
+# expire_and_activate_bookings scans from its previous run, at most this far back
+# (startup_sync_desks covers longer outages)
+TRANSITIONS_WATERMARK_KEY = "expire_and_activate:last_run"
+TRANSITIONS_MAX_CATCHUP = timedelta(hours=1)
+
 
 @shared_task
+@single_flight("desk_state", DESK_STATE_LOCK_TTL_S)
 def startup_sync_desks():
     """
     Run at celery startup: recompute desk booking state and reconcile locks.
     """
     from .models import Desk, Booking
     now = timezone.now()
-    channel_layer = get_channel_layer()
 
     for desk in Desk.objects.all():
         with transaction.atomic():
@@ -29,19 +39,12 @@ def startup_sync_desks():
 
             state_changed = (desk.is_booked != is_booked or desk.booked_by_id != booked_user_id)
             if state_changed:
+                was_available = desk.is_available
                 desk.is_booked = is_booked
                 desk.booked_by = booked_user
                 desk.save(update_fields=['is_booked', 'booked_by'])
 
-                async_to_sync(channel_layer.group_send)(
-                    f"room_{desk.room_id}",
-                    {
-                        "type": "desk_status",
-                        "desk_id": desk.id,
-                        "is_booked": is_booked,
-                        "booked_by": booked_user.username if booked_user else None,
-                    }
-                )
+                events.emit(events.DeskStateChanged.of(desk, was_available))
 
         if desk.is_locked:
             lock = read_lock(desk.id)
@@ -51,34 +54,35 @@ def startup_sync_desks():
                     desk.is_locked = False
                     desk.locked_by = None
                     desk.save(update_fields=['is_locked', 'locked_by'])
-                async_to_sync(channel_layer.group_send)(
-                    f"room_{desk.room_id}",
-                    {"type": "desk_lock", "desk_id": desk.id, "locked": False}
-                )
+                    events.emit(events.DeskLockChanged(desk_id=desk.id, room_id=desk.room_id, locked=False))
 
 
 @shared_task
+@single_flight("desk_state", DESK_STATE_LOCK_TTL_S)
 def expire_and_activate_bookings():
     """
-    Update desk availability when bookings start or expire (within last minute window),
-    and reconcile desk lock flags with Redis TTL (clear DB lock if redis key expired)
+    Update desk availability when bookings start or expire (since the previous run,
+    by default the last minute), and reconcile desk lock flags with Redis TTL
+    (clear DB lock if redis key expired)
     """
     from .models import Desk, Booking
     now = timezone.now()
     one_minute_ago = now - timedelta(minutes=1)
+    # A tick skipped by the single-flight guard is covered by the next run
+    since = cache.get(TRANSITIONS_WATERMARK_KEY)
+    window_start = min(one_minute_ago, max(since, now - TRANSITIONS_MAX_CATCHUP)) if since else one_minute_ago
 
     ended_desk_ids = Desk.objects.filter(
-        bookings__end_time__gte=one_minute_ago,
+        bookings__end_time__gte=window_start,
         bookings__end_time__lte=now
     ).distinct().values_list('id', flat=True)
 
     started_desk_ids = Desk.objects.filter(
-        bookings__start_time__gte=one_minute_ago,
+        bookings__start_time__gte=window_start,
         bookings__start_time__lte=now
     ).distinct().values_list('id', flat=True)
 
     all_desk_ids = list(ended_desk_ids) + list(started_desk_ids)
-    channel_layer = get_channel_layer()
 
     for desk_id in all_desk_ids:
         with transaction.atomic():
@@ -94,19 +98,12 @@ def expire_and_activate_bookings():
             booked_user = current.user if current else None
 
             if desk.is_booked != is_booked or desk.booked_by_id != (booked_user.id if booked_user else None):
+                was_available = desk.is_available
                 desk.is_booked = is_booked
                 desk.booked_by = booked_user
                 desk.save(update_fields=['is_booked', 'booked_by'])
 
-                async_to_sync(channel_layer.group_send)(
-                    f"room_{desk.room_id}",
-                    {
-                        "type": "desk_status",
-                        "desk_id": desk.id,
-                        "is_booked": is_booked,
-                        "booked_by": booked_user.username if booked_user else None,
-                    }
-                )
+                events.emit(events.DeskStateChanged.of(desk, was_available))
 
     # Reconcile desk locks, clear db lock if redis ttl expired
     locked_desks = Desk.objects.filter(is_locked=True)
@@ -123,30 +120,146 @@ def expire_and_activate_bookings():
                 desk.is_locked = False
                 desk.locked_by = None
                 desk.save(update_fields=['is_locked', 'locked_by'])
-            try:
-                async_to_sync(channel_layer.group_send)(
-                    f"room_{desk.room_id}",
-                    {"type": "desk_lock", "desk_id": desk.id, "locked": False}
-                )
-            except Exception as e:
-                print(f"Failed to broadcast desk unlock: {e}")
+                events.emit(events.DeskLockChanged(desk_id=desk.id, room_id=desk.room_id, locked=False))
+
+    cache.set(TRANSITIONS_WATERMARK_KEY, now, None)
+
+
+@shared_task
+def relay_outbox():
+    """
+    Publish outbox events the on-commit fast path did not deliver.
+    """
+    from .services.outbox import drain
+    return f"Relayed {drain()} outbox events."
+
+
+@shared_task
+@single_flight("reconcile_room_availability", 600)
+def reconcile_room_availability():
+    """
+    Recount available desks per room into the Redis counters and announce
+    rooms whose count drifted.
+    """
+    from .services.room_availability import reconcile
+    return f"Corrected {reconcile()} room availability counters."
+
+
+@shared_task
+@single_flight("sweep_booking_reminders", 600)
+def sweep_booking_reminders():
+    """
+    Claim bookings starting within REMINDER_LEAD_MINUTES that have not been
+    reminded and queue their reminder emails in batches.
+    """
+    from django.conf import settings
+    from .services.reminders import sweep
+    if not settings.BOOKING_EMAILS_ENABLED:
+        return "Booking emails disabled."
+    return f"Queued reminders for {sweep()} bookings."
+
+
+@shared_task
+def process_room_map(room_id):
+    """
+    Render a room map's resized PNG / WebP variants (and deep-zoom tiles for
+    large plans) under content-hashed names.
+    """
+    from .services.room_maps import process
+    record = process(room_id)
+    if record is None:
+        return f"Room {room_id} map changed or removed; nothing recorded."
+    return f"Rendered {len(record['variants'])} map variants for room {room_id}."
+
+
+@shared_task
+def flush_audit_log():
+    """
+    Drain the Redis audit buffer into AuditLog with batched inserts.
+    """
+    from django.conf import settings
+    from .services.audit_buffer import flush
+    written = flush(batch_size=settings.AUDIT_LOG_BATCH_SIZE)
+    return f"Flushed {written} audit entries."
 
 
 @shared_task
+def maintain_audit_partitions():
+    """
+    Create the AuditLog partitions for the coming months (no-op until the
+    table has been converted with `manage.py partition_audit_log`).
+    """
+    from .services.audit_partitions import ensure_partitions
+    created = ensure_partitions()
+    return f"Created {len(created)} audit partitions."
+
+
+@shared_task
+def archive_audit_log():
+    """
+    Stream AuditLog months older than AUDIT_LOG_HOT_MONTHS to compressed
+    NDJSON under AUDIT_ARCHIVE_DIR, then drop them from the database.
+    """
+    from .services.audit_partitions import archive_expired
+    archived = archive_expired()
+    return f"Archived {sum(archived.values())} audit entries from {len(archived)} months."
+
+
+@shared_task
+@single_flight("refresh_occupancy_rollups", 600)
+def refresh_occupancy_rollups():
+    """
+    Recompute the desk-day / room-day occupancy cells marked dirty by booking writes.
+    """
+    from .services.occupancy import refresh_dirty
+    return f"Recomputed {refresh_dirty()} occupancy cells."
+
+
+@shared_task
+def repair_occupancy_rollups(days_back=None, days_ahead=None):
+    """
+    Nightly: recompute every occupancy cell from OCCUPANCY_REPAIR_DAYS ago
+    to OCCUPANCY_REPAIR_DAYS ahead, catching writes that bypassed the API.
+    """
+    from django.conf import settings
+    from .services.occupancy import repair
+    today = timezone.now().date()
+    days_back = settings.OCCUPANCY_REPAIR_DAYS if days_back is None else days_back
+    days_ahead = settings.OCCUPANCY_REPAIR_DAYS if days_ahead is None else days_ahead
+    cells = repair(today - timedelta(days=days_back), today + timedelta(days=days_ahead))
+    return f"Repaired {cells} occupancy cells."
+
+
+@shared_task
+def prune_booking_changes():
+    """
+    Drop booking change-feed rows older than BOOKING_CHANGES_RETENTION_DAYS.
+    """
+    from .services.booking_changes import prune
+    return f"Pruned {prune()} booking changes."
+
+
+@shared_task
+@single_flight("cleanup_expired_tokens", 900)
 def cleanup_expired_tokens():
     """
     Remove expired tokens from the database.
     Thus maintaining an adequate db size
+
+    Runs hourly in id-range batches with short transactions, stopping after
+    TOKEN_CLEANUP_BUDGET_S; whatever is left goes on the next run.
     """
-    from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+    from django.conf import settings
+    from .services.token_cleanup import cleanup
     expired_threshold = timezone.now() - timedelta(hours=24)
 
-    BlacklistedToken.objects.filter(
-        token__expires_at__lt=expired_threshold
-    ).delete()
-
-    deleted_count = OutstandingToken.objects.filter(
-        expires_at__lt=expired_threshold
-    ).delete()
-
-    return f"Cleaned up {deleted_count[0]} expired tokens."
\ No newline at end of file
+    stats = cleanup(
+        expired_threshold,
+        batch_size=settings.TOKEN_CLEANUP_BATCH_SIZE,
+        budget_s=settings.TOKEN_CLEANUP_BUDGET_S,
+    )
+    progress = "done" if stats['complete'] else f"{stats['remaining']} left for the next run"
+    return (
+        f"Cleaned up {stats['outstanding']} expired tokens "
+        f"({stats['blacklisted']} blacklisted) in {stats['batches']} batches, {stats['seconds']}s; {progress}."
+    )
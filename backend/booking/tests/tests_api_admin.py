@@ -6,6 +6,13 @@ What is tested:
   /api/admin/rooms/       RoomManagementViewSet     (CRUD + maintenance + groups)
   /api/desks/             DeskViewSet               (permanent assignment)
   /api/usergroups/        UserGroupViewSet           (create, members, delete)
+  ?fields= / ?expand=     sparse fieldsets on room / location / desk lists
+  .../utilization/        location / room analytics from occupancy rollups
+  rooms/{id}/heatmap/     per-desk utilization and density grid over the room map
+  rooms/{id}/upload-map/  content-hashed originals, rendered PNG / WebP variants and tiles, cache headers
+  rooms/{id}/layout/      batched desk creates / updates / deletes, one audit entry and broadcast
+                          deleted desks announce their cascaded bookings
+  /api/audit/             AuditLogViewSet           (indexed scope columns, backfill, archive reads, export)
 
 Key correctness notes applied:
   - RoomManagementViewSet.perform_create reads request.data['floor_id'], not 'floor'
@@ -15,10 +22,12 @@ Key correctness notes applied:
 """
 import pytest
 from unittest.mock import patch
+from django.core.management import call_command
 from django.utils import timezone
 from datetime import timedelta
 
 from booking.models import Location, Room, Floor, Desk, UserGroup, Booking
+from booking.models_audit import AuditLog
 
 
 def future(hours=1):
@@ -123,6 +132,56 @@ class TestLocationManagement:
         assert location.allow_room_managers_to_add_group_members is False
 
 
+# ─── Sparse fieldsets ─────────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestSparseFieldsets:
+
+    def test_fields_param_limits_room_list_keys(self, auth_client, room, desk, desk2):
+        resp = auth_client.get("/api/rooms/?fields=id,name,desk_count")
+        assert resp.status_code == 200
+        assert resp.data == [{"id": room.id, "name": room.name, "desk_count": 2}]
+
+    def test_expand_adds_expensive_fields_to_cheap_set(self, auth_client, room, desk):
+        resp = auth_client.get("/api/rooms/?expand=available_desk_count")
+        row = resp.data[0]
+        assert row["available_desk_count"] == 1
+        assert "floor_name" in row
+        assert "can_book" not in row
+        assert "desk_count" not in row
+
+    def test_no_params_renders_every_field(self, auth_client, room):
+        resp = auth_client.get("/api/rooms/")
+        assert {"desk_count", "available_desk_count", "is_manager", "can_book"} <= set(resp.data[0])
+
+    def test_location_counts_come_from_annotations(self, admin_client, location, floor, room):
+        Floor.objects.create(name="Floor 2", location=location)
+        resp = admin_client.get(
+            f"/api/admin/locations/{location.id}/?fields=id,floor_count,room_count"
+        )
+        assert resp.data == {"id": location.id, "floor_count": 2, "room_count": 1}
+
+    def test_location_list_counts_without_joins(self, auth_client, user, location, floor, room):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        second = Floor.objects.create(name="Floor 2", location=location)
+        Room.objects.create(name="Room 2", floor=second)
+        for name in ("G1", "G2"):
+            UserGroup.objects.create(name=name, location=location, created_by=user)
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = auth_client.get("/api/locations/")
+        row = next(r for r in resp.data if r["id"] == location.id)
+        assert (row["floor_count"], row["room_count"], row["user_group_count"]) == (2, 2, 2)
+        counted = next(q["sql"] for q in queries.captured_queries if "num_floors" in q["sql"])
+        assert "LEFT OUTER JOIN" not in counted.upper()  # only the country join; counts are subqueries
+
+    def test_sparse_desk_list_skips_user_joins(self, auth_client, desk, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            resp = auth_client.get("/api/desks/?fields=id,name,pos_x,pos_y")
+        assert resp.data == [{"id": desk.id, "name": desk.name, "pos_x": 0.0, "pos_y": 0.0}]
+
+
 # ─── Room management ──────────────────────────────────────────────────────────
 
 @pytest.mark.django_db
@@ -177,8 +236,8 @@ class TestRoomManagement:
         room.refresh_from_db()
         assert room.allowed_groups.filter(pk=g.id).exists()
 
-    @patch("booking.admin_views_module.admin_views.async_to_sync")
-    @patch("booking.admin_views_module.admin_views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_room_manager_can_enable_maintenance(self, _layer, _async, api_client, room, user):
         room.room_managers.add(user)
         api_client.force_authenticate(user=user)
@@ -190,8 +249,8 @@ class TestRoomManagement:
         # maintenance_by_name is get_full_name() or username
         assert user.username in room.maintenance_by_name or room.maintenance_by_name != ""
 
-    @patch("booking.admin_views_module.admin_views.async_to_sync")
-    @patch("booking.admin_views_module.admin_views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_room_manager_can_clear_maintenance(self, _layer, _async, api_client, room, user):
         room.room_managers.add(user)
         room.is_under_maintenance = True
@@ -204,8 +263,8 @@ class TestRoomManagement:
         assert room.is_under_maintenance is False
         assert room.maintenance_by_name == ""
 
-    @patch("booking.admin_views_module.admin_views.async_to_sync")
-    @patch("booking.admin_views_module.admin_views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_non_manager_cannot_enable_maintenance(self, _layer, _async, auth_client, room):
         """Non-manager hits the queryset scope → 403 or 404."""
         resp = auth_client.post(f"/api/admin/rooms/{room.id}/set-maintenance/")
@@ -386,4 +445,447 @@ class TestUserGroupManagement:
     def test_regular_user_cannot_delete_group(self, auth_client, location, user):
         g = UserGroup.objects.create(name="TempGroup", location=location, created_by=user)
         resp = auth_client.delete(f"/api/usergroups/{g.id}/")
-        assert resp.status_code in (403, 404)
\ No newline at end of file
+        assert resp.status_code in (403, 404)
+
+
+# ─── Audit log scope columns ──────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestAuditLogScope:
+
+    def _log(self, user, location_id, room_id):
+        AuditLog.log(
+            user=user,
+            action=AuditLog.Action.ROOM_MAINTENANCE,
+            target_type="room",
+            target_id=room_id,
+            target_snapshot={"location_id": location_id, "room_id": room_id},
+        )
+
+    def test_log_copies_scope_out_of_snapshot(self, user):
+        self._log(user, location_id=4, room_id=9)
+        entry = AuditLog.objects.get()
+        assert (entry.location_id, entry.room_id, entry.desk_id) == (4, 9, None)
+
+    def test_staff_location_filter_uses_columns(self, admin_client, user):
+        self._log(user, location_id=1, room_id=1)
+        self._log(user, location_id=2, room_id=5)
+        resp = admin_client.get("/api/audit/?location_id=2")
+        assert [e["room_id"] for e in resp.data] == [5]
+
+    def test_non_numeric_scope_filter_returns_nothing(self, admin_client, user):
+        self._log(user, location_id=1, room_id=1)
+        resp = admin_client.get("/api/audit/?room_id=abc")
+        assert resp.status_code == 200
+        assert resp.data == []
+
+    def test_backfill_command_populates_legacy_rows(self, user):
+        AuditLog.objects.bulk_create([
+            AuditLog(user=user, username_snapshot=user.username, action="desk_locked",
+                     target_type="desk", target_snapshot={"location_id": 3, "room_id": 7, "desk_id": 11}),
+            AuditLog(user=user, username_snapshot=user.username, action="user_login",
+                     target_type="user", target_snapshot={"username": user.username}),
+        ])
+        call_command("backfill_audit_scope", batch_size=1, stdout=open("/dev/null", "w"))
+        scoped, login = AuditLog.objects.order_by("id")
+        assert (scoped.location_id, scoped.room_id, scoped.desk_id) == (3, 7, 11)
+        assert login.location_id is None
+
+    def test_staff_can_include_archived_months(self, admin_client, user, settings, tmp_path):
+        from booking.services.audit_partitions import archive_expired
+        settings.AUDIT_ARCHIVE_DIR = str(tmp_path)
+        settings.AUDIT_LOG_HOT_MONTHS = 1
+        self._log(user, location_id=2, room_id=5)
+        self._log(user, location_id=2, room_id=6)
+        self._log(user, location_id=3, room_id=7)
+        AuditLog.objects.exclude(room_id=5).update(timestamp=timezone.now() - timedelta(days=70))
+        archive_expired()
+
+        settings.AUDIT_ARCHIVE_MAX_MONTHS = 4  # 71 days back touches up to four calendar months
+        start, end = (timezone.now() - timedelta(days=71)).isoformat(), timezone.now().isoformat()
+        hot = admin_client.get("/api/audit/?location_id=2")
+        both = admin_client.get("/api/audit/", {"location_id": 2, "archived": "true", "start": start, "end": end})
+        assert [e["room_id"] for e in hot.data] == [5]
+        assert [e["room_id"] for e in both.data] == [5, 6]
+        assert both.data[1]["action_display"] == "Room Maintenance Toggled"
+
+    def test_archived_reads_need_a_bounded_range(self, admin_client, settings, tmp_path):
+        from booking.services import audit_archive
+        settings.AUDIT_ARCHIVE_DIR = str(tmp_path)
+        settings.AUDIT_ARCHIVE_MAX_MONTHS = 3
+        with patch.object(audit_archive, "read_month") as read_month:
+            for query in ("", "&start=2025-01-01", "&end=2025-03-31", "&start=2025-01-01&end=2025-04-01"):
+                resp = admin_client.get(f"/api/audit/?archived=true{query}")
+                assert resp.status_code == 400, query
+                assert "archived" in resp.data
+            read_month.assert_not_called()
+            assert admin_client.get("/api/audit/?archived=true&start=2025-01-15&end=2025-03-31").status_code == 200
+
+    def test_archived_flag_ignored_for_regular_users(self, auth_client, user, settings, tmp_path):
+        from booking.services.audit_partitions import archive_expired
+        settings.AUDIT_ARCHIVE_DIR = str(tmp_path)
+        settings.AUDIT_LOG_HOT_MONTHS = 1
+        self._log(user, location_id=2, room_id=5)
+        AuditLog.objects.update(timestamp=timezone.now() - timedelta(days=70))
+        archive_expired()
+
+        resp = auth_client.get("/api/audit/?archived=true")
+        assert resp.data == []
+
+    def test_invalid_start_is_a_bad_request(self, admin_client):
+        resp = admin_client.get("/api/audit/?start=yesterday")
+        assert resp.status_code == 400
+
+    def test_export_streams_filtered_csv(self, admin_client, user):
+        self._log(user, location_id=1, room_id=1)
+        self._log(user, location_id=2, room_id=5)
+        resp = admin_client.get("/api/audit/export/csv/?location_id=2")
+        assert resp.status_code == 200
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        assert lines[0].startswith("id,timestamp,username,action")
+        assert len(lines) == 2
+        assert ",room_maintenance,room," in lines[1]
+
+    def test_export_keeps_ownership_gate(self, auth_client, user, user2):
+        self._log(user, location_id=1, room_id=1)
+        self._log(user2, location_id=1, room_id=2)
+        resp = auth_client.get("/api/audit/export/ndjson/")
+        rows = b"".join(resp.streaming_content).decode().splitlines()
+        assert len(rows) == 1
+        assert '"username":"alice"' in rows[0]
+
+
+# ─── Utilization analytics ────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestUtilization:
+
+    def _rollup(self, desk, room, location, day, minutes, peak=1):
+        from booking.models_occupancy import DeskDayOccupancy, RoomDayOccupancy
+        DeskDayOccupancy.objects.create(desk=desk, room=room, date=day, booked_minutes=minutes, bookings=1)
+        RoomDayOccupancy.objects.create(
+            room=room, location=location, date=day, booked_minutes=minutes, bookings=1, peak_concurrent=peak,
+        )
+
+    def test_room_utilization_reads_rollups(self, admin_client, desk, desk2, room, location, settings):
+        import datetime
+        settings.OCCUPANCY_HOURS_PER_DAY = 8
+        settings.OCCUPANCY_WORKDAYS = [0, 1, 2, 3, 4, 5, 6]
+        day = datetime.date(2026, 3, 2)
+        self._rollup(desk, room, location, day, 240, peak=2)
+
+        resp = admin_client.get(f"/api/admin/rooms/{room.id}/utilization/?start=2026-03-02&end=2026-03-03")
+        assert resp.status_code == 200
+        assert resp.data["desk_count"] == 2
+        first, second = resp.data["series"]
+        assert first["booked_hours"] == 4.0
+        assert first["available_hours"] == 16.0
+        assert first["utilization"] == 0.25
+        assert first["peak_concurrent"] == 2
+        assert second["booked_hours"] == 0
+        by_desk = {d["desk_id"]: d for d in resp.data["desks"]}
+        assert by_desk[desk.id]["utilization"] == 0.25
+        assert by_desk[desk2.id]["booked_hours"] == 0
+
+    def test_location_utilization_by_week(self, admin_client, desk, room, location, settings):
+        import datetime
+        settings.OCCUPANCY_HOURS_PER_DAY = 8
+        settings.OCCUPANCY_WORKDAYS = [0, 1, 2, 3, 4]
+        self._rollup(desk, room, location, datetime.date(2026, 3, 2), 480)
+        self._rollup(desk, room, location, datetime.date(2026, 3, 10), 240)
+
+        resp = admin_client.get(
+            f"/api/admin/locations/{location.id}/utilization/"
+            f"?start=2026-03-02&end=2026-03-15&granularity=week"
+        )
+        assert resp.status_code == 200
+        weeks = resp.data["series"]
+        assert [str(w["period"]) for w in weeks] == ["2026-03-02", "2026-03-09"]
+        assert weeks[0]["utilization"] == 0.2
+        assert resp.data["totals"]["booked_hours"] == 12.0
+        assert resp.data["rooms"][0]["room_id"] == room.id
+
+    def test_non_manager_cannot_read_room_utilization(self, api_client, user, room):
+        api_client.force_authenticate(user=user)
+        assert api_client.get(f"/api/admin/rooms/{room.id}/utilization/").status_code == 404
+
+    def test_invalid_range_rejected(self, admin_client, room):
+        resp = admin_client.get(f"/api/admin/rooms/{room.id}/utilization/?start=2026-03-05&end=2026-03-01")
+        assert resp.status_code == 400
+
+
+# ─── Room heatmap ─────────────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestRoomHeatmap:
+
+    def _book(self, user, desk, start, hours):
+        import datetime
+        from booking.models import Booking
+        Booking.objects.bulk_create([
+            Booking(user=user, desk=desk, start_time=start, end_time=start + datetime.timedelta(hours=hours))
+        ])
+
+    def test_heatmap_figures(self, admin_client, user, desk, desk2, room, settings):
+        import datetime
+        settings.OCCUPANCY_DAY_START = "09:00"
+        settings.OCCUPANCY_HOURS_PER_DAY = 8
+        settings.OCCUPANCY_WORKDAYS = [0, 1, 2, 3, 4, 5, 6]
+        settings.HEATMAP_SLOT_MINUTES = 30
+        desk.pos_x, desk.pos_y = 0.1, 0.9
+        desk.save(update_fields=['pos_x', 'pos_y'])
+        desk2.pos_x, desk2.pos_y = 0.9, 0.1
+        desk2.save(update_fields=['pos_x', 'pos_y'])
+
+        monday = datetime.datetime(2026, 3, 2, 9, tzinfo=datetime.timezone.utc)
+        self._book(user, desk, monday, 4)
+        self._book(user, desk2, monday + datetime.timedelta(hours=1), 2)
+        # Spills over the end of the range; only the in-range part inside 09:00-17:00 counts
+        self._book(user, desk, monday + datetime.timedelta(hours=31), 4)
+
+        resp = admin_client.get(f"/api/admin/rooms/{room.id}/heatmap/?start=2026-03-02&end=2026-03-03&grid=8")
+        assert resp.status_code == 200
+        by_desk = {d["desk_id"]: d for d in resp.data["desks"]}
+        assert by_desk[desk.id]["booked_hours"] == 5.0
+        assert by_desk[desk.id]["utilization"] == 0.3125
+        assert by_desk[desk2.id]["booked_hours"] == 2.0
+        assert resp.data["peak_concurrent"] == 2
+
+        monday_profile = resp.data["weekday_hour"][0]
+        assert monday_profile[10] == 1.0   # both desks booked 10:00-11:00
+        assert monday_profile[12] == 0.5
+        assert monday_profile[14] == 0.0
+
+        density = resp.data["density"]
+        assert len(density) == 8 and len(density[0]) == 8
+        # Rows run top to bottom (pos_y), columns left to right (pos_x)
+        assert density[7][0] == 1.0
+        assert 0 < density[0][7] < density[7][0]
+
+    def test_heatmap_utilization_uses_the_working_window(self, admin_client, user, desk, desk2, room, settings):
+        import datetime
+        settings.OCCUPANCY_DAY_START = "09:00"
+        settings.OCCUPANCY_HOURS_PER_DAY = 8
+        settings.OCCUPANCY_WORKDAYS = [0, 1, 2, 3, 4]
+        monday = datetime.datetime(2026, 3, 2, tzinfo=datetime.timezone.utc)
+        self._book(user, desk, monday, 24)                                   # all day
+        self._book(user, desk2, monday + datetime.timedelta(days=5, hours=9), 8)  # Saturday
+
+        resp = admin_client.get(f"/api/admin/rooms/{room.id}/heatmap/?start=2026-03-02&end=2026-03-08&grid=4")
+        by_desk = {d["desk_id"]: d for d in resp.data["desks"]}
+        assert by_desk[desk.id]["booked_hours"] == 8.0
+        assert by_desk[desk.id]["utilization"] == 0.2
+        assert by_desk[desk2.id]["utilization"] == 0
+        assert max(max(row) for row in resp.data["density"]) <= 1
+
+    def test_heatmap_rejects_bad_grid(self, admin_client, room):
+        resp = admin_client.get(f"/api/admin/rooms/{room.id}/heatmap/?grid=0")
+        assert resp.status_code == 400
+
+    def test_non_manager_cannot_read_heatmap(self, api_client, user, room):
+        api_client.force_authenticate(user=user)
+        assert api_client.get(f"/api/admin/rooms/{room.id}/heatmap/").status_code == 404
+
+
+# ─── Room map pipeline ────────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestRoomMapPipeline:
+
+    @pytest.fixture(autouse=True)
+    def media(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.ROOM_MAP_WIDTHS = [480, 960, 1920]
+        settings.ROOM_MAP_TILE_THRESHOLD = 4096
+        settings.ROOM_MAP_TILE_SIZE = 256
+        return tmp_path
+
+    def _png(self, width, height, color=(30, 120, 200)):
+        import io
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        out = io.BytesIO()
+        Image.new("RGB", (width, height), color).save(out, "PNG")
+        return SimpleUploadedFile("Floor Plan.PNG", out.getvalue(), content_type="image/png")
+
+    def _upload(self, admin_client, room, upload, capture):
+        with patch("booking.services.outbox.current_app") as app:
+            with capture(execute=True):
+                resp = admin_client.post(f"/api/admin/rooms/{room.id}/upload-map/", {"map_image": upload},
+                                         format="multipart")
+        return resp, app
+
+    def test_upload_stores_hashed_name_and_queues_render(self, admin_client, room, django_capture_on_commit_callbacks):
+        import re
+        resp, app = self._upload(admin_client, room, self._png(1200, 800), django_capture_on_commit_callbacks)
+        assert resp.status_code == 200
+        room.refresh_from_db()
+        assert re.fullmatch(r"room_maps/[0-9a-f]{20}\.png", room.map_image.name)
+        assert resp.data["map_variants"] is None
+        app.send_task.assert_called_once_with("booking.tasks.process_room_map", kwargs={"room_id": room.id})
+
+    def test_render_variants_and_serialize_urls(self, admin_client, room, media, django_capture_on_commit_callbacks):
+        from PIL import Image
+        from booking.tasks import process_room_map
+        self._upload(admin_client, room, self._png(1200, 800), django_capture_on_commit_callbacks)
+        assert process_room_map(room.id) == f"Rendered 3 map variants for room {room.id}."
+
+        room.refresh_from_db()
+        variants = room.map_variants["variants"]
+        assert [(v["width"], v["height"]) for v in variants] == [(480, 320), (960, 640), (1200, 800)]
+        with Image.open(media / variants[0]["webp"]) as img:
+            assert img.format == "WEBP" and img.size == (480, 320)
+        assert room.map_variants["tiles"] is None
+
+        data = admin_client.get(f"/api/admin/rooms/{room.id}/").data["map_variants"]
+        assert data["width"] == 1200
+        assert data["variants"][1]["webp"] == f"http://testserver/media/{variants[1]['webp']}"
+
+    def test_large_plan_gets_tiles(self, settings, room, media):
+        from django.core.files.base import ContentFile
+        from booking.services import room_maps
+        settings.ROOM_MAP_TILE_THRESHOLD = 500
+        room.map_image.save("plan.png", ContentFile(self._png(600, 300).read()))
+        record = room_maps.process(room.id)
+        tiles = record["tiles"]
+        assert tiles["max_level"] == 10  # ceil(log2(600))
+        top = media / tiles["base"] / "10"
+        assert sorted(p.name for p in top.iterdir()) == ["0_0.webp", "0_1.webp", "1_0.webp", "1_1.webp", "2_0.webp", "2_1.webp"]
+        assert [p.name for p in (media / tiles["base"] / "0").iterdir()] == ["0_0.webp"]
+
+    def test_replacing_map_deletes_old_renditions(self, admin_client, room, media, django_capture_on_commit_callbacks):
+        from booking.services import room_maps
+        self._upload(admin_client, room, self._png(800, 400), django_capture_on_commit_callbacks)
+        old = room_maps.process(room.id)
+        self._upload(admin_client, room, self._png(800, 400, color=(0, 0, 0)), django_capture_on_commit_callbacks)
+        assert not (media / old["variants"][0]["webp"]).exists()
+        assert not (media / old["source"]).exists()
+        room.refresh_from_db()
+        assert room.map_variants == {}
+
+    def test_stale_render_not_recorded(self, room):
+        from django.core.files.base import ContentFile
+        from booking.services import room_maps
+        room.map_image.save("plan.png", ContentFile(self._png(300, 200).read()))
+        real_render = room_maps.render
+
+        def render_then_replace(name):
+            record = real_render(name)
+            Room.objects.filter(pk=room.id).update(map_image="room_maps/newer.png")
+            return record
+
+        with patch("booking.services.room_maps.render", side_effect=render_then_replace):
+            assert room_maps.process(room.id) is None
+        room.refresh_from_db()
+        assert room.map_variants == {}
+
+    def test_media_cache_headers(self, media, rf):
+        from booking.media_views import serve_media
+        (media / "room_maps").mkdir()
+        (media / "room_maps" / "abc.png").write_bytes(b"x")
+        (media / "other.txt").write_bytes(b"x")
+        resp = serve_media(rf.get("/media/room_maps/abc.png"), "room_maps/abc.png", document_root=str(media))
+        assert resp["Cache-Control"] == "public, max-age=31536000, immutable"
+        resp = serve_media(rf.get("/media/other.txt"), "other.txt", document_root=str(media))
+        assert resp["Cache-Control"] == "public, max-age=3600"
+
+
+# ─── Bulk desk layout ─────────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestRoomLayout:
+
+    def _save(self, client, room, body, capture):
+        with patch("booking.services.outbox.get_channel_layer"), \
+                patch("booking.services.outbox.async_to_sync") as send:
+            with capture(execute=True):
+                resp = client.post(f"/api/admin/rooms/{room.id}/layout/", body, format="json")
+        return resp, [call.args for call in send.return_value.call_args_list]
+
+    def test_rearrangement_applies_in_one_request(self, admin_client, room, django_assert_max_num_queries,
+                                                  django_capture_on_commit_callbacks):
+        desks = Desk.objects.bulk_create([Desk(room=room, name=f"D{i}") for i in range(152)])
+        moved, doomed = desks[:150], desks[150:]
+        body = {
+            "update": [{"id": d.id, "pos_x": 0.1 + i / 200, "pos_y": 0.9, "orientation": "left"}
+                       for i, d in enumerate(moved)],
+            "delete": [d.id for d in doomed],
+            "create": [{"key": "new-1", "name": "Window", "pos_x": 0.2, "pos_y": 0.3}],
+        }
+        with django_assert_max_num_queries(40):
+            resp, sent = self._save(admin_client, room, body, django_capture_on_commit_callbacks)
+        assert resp.status_code == 200
+
+        new_id = resp.data["created"]["new-1"]
+        assert len(resp.data["desks"]) == 151
+        assert not Desk.objects.filter(pk__in=[d.id for d in doomed]).exists()
+        assert Desk.objects.filter(room=room, orientation="left", pos_y=0.9).count() == 150
+        assert Desk.objects.get(pk=moved[10].id).pos_x == pytest.approx(0.15)
+        new = Desk.objects.get(pk=new_id)
+        assert (new.name, new.location_id, new.orientation) == ("Window", room.location_id, "bottom")
+
+        entry = AuditLog.objects.get(action=AuditLog.Action.ROOM_LAYOUT_CHANGED)
+        assert entry.room_id == room.id
+        assert len(entry.target_snapshot["updated"]) == 150
+        assert entry.target_snapshot["deleted"] == sorted(d.id for d in doomed)
+
+        [(group, message)] = sent
+        assert group == f"room_{room.id}"
+        assert message["type"] == "layout_changed"
+        assert len(message["desks"]) == 151
+        assert message["created_ids"] == [new_id]
+
+    def test_deleted_desks_announce_their_bookings(self, admin_client, room, desk, desk2, user,
+                                                   django_capture_on_commit_callbacks):
+        from booking.services import booking_changes
+        now = timezone.now()
+        bookings = Booking.objects.bulk_create([
+            Booking(user=user, desk=desk, start_time=now + timedelta(hours=h), end_time=now + timedelta(hours=h + 1))
+            for h in (1, 3)
+        ])
+        since = int(booking_changes.current_token())
+
+        resp, sent = self._save(admin_client, room, {"delete": [desk.id]}, django_capture_on_commit_callbacks)
+        assert resp.status_code == 200
+        assert not Booking.objects.filter(desk_id=desk.id).exists()
+
+        [(group, message)] = sent
+        assert group == f"room_{room.id}"
+        assert message["type"] == "outbox.batch"
+        deleted = next(e for e in message["events"] if e["type"] == "update_bookings")
+        assert (deleted["desk_id"], deleted["action"]) == (desk.id, "delete")
+        assert sorted(deleted["deleted_ids"]) == sorted(b.id for b in bookings)
+        assert [e["type"] for e in message["events"]].count("layout_changed") == 1
+        changes = booking_changes.changes_since(since, {"room_id": room.id})
+        assert changes["deleted_ids"] == sorted(b.id for b in bookings)
+
+    def test_invalid_batch_changes_nothing(self, admin_client, room, desk, desk2, floor,
+                                           django_capture_on_commit_callbacks):
+        other = Desk.objects.create(name="Elsewhere", room=Room.objects.create(name="Room B", floor=floor))
+        cases = [
+            {"update": [{"id": desk.id, "pos_x": 0.5}], "delete": [desk.id]},
+            {"update": [{"id": desk.id, "pos_x": 0.5}, {"id": other.id, "pos_x": 0.5}]},
+            {"update": [{"id": desk.id, "pos_x": 1.5}]},
+            {"update": [{"id": desk.id, "orientation": "diagonal"}]},
+            {"create": [{"key": "a", "name": "X"}, {"key": "a", "name": "Y"}]},
+            {},
+        ]
+        for body in cases:
+            resp, sent = self._save(admin_client, room, body, django_capture_on_commit_callbacks)
+            assert resp.status_code == 400, body
+            assert sent == []
+        assert Desk.objects.get(pk=desk.id).pos_x == 0
+        assert room.desks.count() == 2
+        assert not AuditLog.objects.filter(action=AuditLog.Action.ROOM_LAYOUT_CHANGED).exists()
+
+    def test_only_room_managers_can_edit(self, api_client, room, desk, user, location,
+                                         django_capture_on_commit_callbacks):
+        body = {"update": [{"id": desk.id, "name": "Renamed"}]}
+        api_client.force_authenticate(user=user)
+        resp, _ = self._save(api_client, room, body, django_capture_on_commit_callbacks)
+        assert resp.status_code in (403, 404)
+
+        room.room_managers.add(user)
+        resp, _ = self._save(api_client, room, body, django_capture_on_commit_callbacks)
+        assert resp.status_code == 200
+        assert Desk.objects.get(pk=desk.id).name == "Renamed"
@@ -4,6 +4,13 @@ tests_api_bookings.py — Integration tests for the Booking REST API.
 What is tested:
   POST   /api/bookings/              create (auth, access gates, validations)
   GET    /api/bookings/              list with user_only / desk / date filters
+  GET    /api/bookings/compact/      flat representation, fixed query count
+  GET    /api/bookings/export/{fmt}/ streamed CSV / NDJSON with list filters
+  GET    /api/bookings/stats/        SQL-aggregated dashboard stats, cache invalidation
+  GET    /api/bookings/changes/      delta sync tokens, tombstones, filters, expiry
+  GET    /api/bootstrap/             startup payload, inline and on the thread pool
+  GET    /api/rooms|desks/{id}/availability/  per-day free/busy from range predicates
+  GET    (any read-heavy viewset)  replica routing, read-your-writes pinning
   DELETE /api/bookings/{id}/         cancel own vs other user's booking
   PATCH  /api/bookings/{id}/         update times, overlap check, active booking extend
   POST   /api/bookings/lock/         desk lock acquire / conflict
@@ -12,7 +19,12 @@ What is tested:
   POST   /api/bookings/bulk_create/  partial and atomic modes, conflict reporting
   POST   /api/bookings/{id}/edit_intervals/  merge, split, supersede, conflict
 """
+import csv
+import io
+import json
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from datetime import timedelta
 from unittest.mock import patch
@@ -59,6 +71,26 @@ class TestBookingCreate:
         assert resp.data["desk"]["id"] == desk.id
         assert resp.data["username"] == user.username
 
+    def test_audit_snapshot_reads_denormalized_room_and_location(
+        self, auth_client, desk, room, floor, location, user
+    ):
+        from booking.models_audit import AuditLog
+        grant_access(user, room, location)
+        with CaptureQueriesContext(connection) as queries:
+            resp = auth_client.post("/api/bookings/", {
+                "desk_id": desk.id, "start_time": iso(future(1)), "end_time": iso(future(3)),
+            }, format="json")
+        assert resp.status_code == 201
+        entry = AuditLog.objects.get(action=AuditLog.Action.BOOKING_CREATED)
+        assert {k: entry.target_snapshot[k] for k in ("room_id", "floor_id", "location", "location_id")} == {
+            "room_id": room.id, "floor_id": floor.id, "location": location.name, "location_id": location.id,
+        }
+        # Names come in with the locked desk row, not one lazy query per hop
+        sql = [q["sql"] for q in queries]
+        audited = next(i for i, q in enumerate(sql) if q.startswith('INSERT INTO "booking_auditlog"'))
+        lazy = [q for q in sql[:audited] if q.startswith(('SELECT "booking_room"', 'SELECT "booking_floor"', 'SELECT "booking_location"'))]
+        assert lazy == []
+
     def test_unauthenticated_request_rejected(self, api_client, desk):
         resp = api_client.post("/api/bookings/", {
             "desk_id": desk.id,
@@ -201,6 +233,523 @@ class TestBookingRead:
         assert all(b["desk"]["id"] == desk.id for b in resp.data)
 
 
+# ─── Compact representation ───────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestBookingCompact:
+
+    def test_compact_rows_are_flat(self, auth_client, desk, room, floor, location, user):
+        Booking.objects.bulk_create([
+            Booking(user=user, desk=desk, start_time=future(1), end_time=future(2)),
+        ])
+        resp = auth_client.get("/api/bookings/compact/?user_only=true")
+        assert resp.status_code == 200
+        row = resp.data[0]
+        assert row["desk_id"] == desk.id
+        assert row["room_id"] == room.id
+        assert row["floor_name"] == floor.name
+        assert row["location_id"] == location.id
+        assert row["username"] == user.username
+        assert "desk" not in row
+
+    @pytest.mark.parametrize("url", ["/api/bookings/", "/api/bookings/compact/"])
+    def test_query_count_does_not_grow_with_bookings(self, url, auth_client, desk, desk2, user):
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                resp = auth_client.get(f"{url}?user_only=true")
+            assert resp.status_code == 200
+            return len(ctx.captured_queries)
+
+        Booking.objects.bulk_create([
+            Booking(user=user, desk=desk, start_time=future(1), end_time=future(2)),
+        ])
+        baseline = count_queries()
+
+        Booking.objects.bulk_create([
+            Booking(user=user, desk=d, start_time=future(24 * day), end_time=future(24 * day + 2))
+            for day in range(1, 31) for d in (desk, desk2)
+        ])
+        assert count_queries() == baseline
+
+
+# ─── Export ───────────────────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestBookingExport:
+
+    def _content(self, resp):
+        return b"".join(resp.streaming_content).decode()
+
+    def test_csv_export_streams_flat_rows(self, admin_client, desk, room, location, user):
+        Booking.objects.bulk_create([
+            Booking(user=user, desk=desk, start_time=future(1), end_time=future(2)),
+        ])
+        resp = admin_client.get("/api/bookings/export/csv/")
+        assert resp.status_code == 200
+        assert resp.streaming
+        assert resp["Content-Type"].startswith("text/csv")
+        assert "attachment" in resp["Content-Disposition"]
+
+        (row,) = csv.DictReader(io.StringIO(self._content(resp)))
+        assert row["desk_name"] == desk.name
+        assert row["room_id"] == str(room.id)
+        assert row["location_name"] == location.name
+        assert row["username"] == user.username
+
+    def test_ndjson_export_honours_room_and_date_filters(self, admin_client, desk, room, user):
+        Booking.objects.bulk_create([
+            Booking(user=user, desk=desk, start_time=future(1), end_time=future(2)),
+            Booking(user=user, desk=desk, start_time=future(48), end_time=future(50)),
+        ])
+        resp = admin_client.get(
+            f"/api/bookings/export/ndjson/?room_id={room.id}&start={iso(future(0))}&end={iso(future(10))}"
+        )
+        rows = [json.loads(line) for line in self._content(resp).splitlines()]
+        assert len(rows) == 1
+        assert rows[0]["desk_id"] == desk.id
+
+        resp = admin_client.get(f"/api/bookings/export/ndjson/?room_id={room.id + 1}")
+        assert self._content(resp) == ""
+
+    def test_regular_user_exports_only_own_bookings(self, auth_client, desk, desk2, user, user2):
+        Booking.objects.bulk_create([
+            Booking(user=user,  desk=desk,  start_time=future(1), end_time=future(2)),
+            Booking(user=user2, desk=desk2, start_time=future(3), end_time=future(4)),
+        ])
+        rows = list(csv.DictReader(io.StringIO(self._content(auth_client.get("/api/bookings/export/csv/")))))
+        assert [r["username"] for r in rows] == [user.username]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_asgi_export_streams_before_the_last_row_is_read(self, desk, user):
+        """Daphne path: chunks go out while the cursor is still being read."""
+        import asyncio
+        from asgiref.sync import async_to_sync
+        from django.core.handlers.asgi import ASGIHandler
+        from rest_framework_simplejwt.tokens import AccessToken
+        from booking.services import export
+
+        Booking.objects.bulk_create([
+            Booking(user=user, desk=desk, start_time=future(h), end_time=future(h) + timedelta(minutes=30))
+            for h in range(1, 31)
+        ])
+        pulled, bodies = [], []
+        next_chunk = export._next_chunk
+
+        def counting_next_chunk(lines):
+            pulled.append(1)
+            return next_chunk(lines)
+
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.Event().wait()  # client stays connected; cancelled once the response is done
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                bodies.append((len(pulled), message["body"]))
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/api/bookings/export/csv/", "raw_path": b"/api/bookings/export/csv/",
+            "query_string": b"", "root_path": "", "server": ("testserver", 80), "client": ("127.0.0.1", 1),
+            "headers": [(b"host", b"testserver"),
+                        (b"authorization", f"Bearer {AccessToken.for_user(user)}".encode())],
+        }
+        with patch.object(export, "LINES_PER_CHUNK", 5), patch.object(export, "_next_chunk", counting_next_chunk):
+            async_to_sync(ASGIHandler())(scope, receive, send)
+
+        assert len(bodies) == 7  # header + 30 rows, five lines per chunk
+        assert bodies[0][0] == 1  # first chunk sent after one pull, not after the whole export
+        rows = list(csv.DictReader(io.StringIO(b"".join(body for _, body in bodies).decode())))
+        assert len(rows) == 30
+
+
+# ─── Stats ────────────────────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestBookingStats:
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, user):
+        from booking.services import booking_stats
+        booking_stats.invalidate(user.id)
+
+    def test_stats_summarise_own_bookings(self, auth_client, desk, desk2, location, user, user2):
+        Booking.objects.bulk_create([
+            Booking(user=user,  desk=desk,  start_time=past(1),   end_time=future(1)),
+            Booking(user=user,  desk=desk2, start_time=future(3), end_time=future(5)),
+            Booking(user=user,  desk=desk2, start_time=past(50),  end_time=past(47)),
+            Booking(user=user2, desk=desk,  start_time=future(6), end_time=future(7)),
+        ])
+        resp = auth_client.get("/api/bookings/stats/")
+        assert resp.status_code == 200
+        data = resp.data
+        assert data["ongoing"]["desk_id"] == desk.id
+        assert data["next"]["desk_id"] == desk2.id
+        assert data["upcoming_count"] == 2
+        assert data["last_30_days"] == {"bookings": 1, "hours": 3.0}
+        assert data["favourite_location"] == location.name
+        assert data["favourite_desk"]["name"] == desk2.name
+        assert data["busiest_weekday"] == (past(50).isoweekday() % 7)
+
+    def test_hours_are_clipped_to_the_month(self, auth_client, desk, user):
+        now = timezone.now()
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        Booking.objects.bulk_create([
+            Booking(user=user, desk=desk,
+                    start_time=month_start - timedelta(hours=2), end_time=month_start + timedelta(hours=3)),
+        ])
+        resp = auth_client.get("/api/bookings/stats/?tz=UTC")
+        assert resp.data["hours_this_month"] == 3.0
+
+    def test_unknown_timezone_rejected(self, auth_client):
+        assert auth_client.get("/api/bookings/stats/?tz=Mars/Olympus").status_code == 400
+
+    def test_cached_until_the_user_books(
+        self, auth_client, desk, room, location, user, django_capture_on_commit_callbacks
+    ):
+        grant_access(user, room, location)
+        assert auth_client.get("/api/bookings/stats/").data["upcoming_count"] == 0
+
+        # Writes that bypass the API are not seen until the cache is invalidated
+        Booking.objects.create(user=user, desk=desk, start_time=future(10), end_time=future(11))
+        assert auth_client.get("/api/bookings/stats/").data["upcoming_count"] == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            resp = auth_client.post("/api/bookings/", {
+                "desk_id": desk.id,
+                "start_time": iso(future(1)),
+                "end_time": iso(future(2)),
+            }, format="json")
+        assert resp.status_code == 201
+        assert auth_client.get("/api/bookings/stats/").data["upcoming_count"] == 2
+
+
+# ─── Delta sync ───────────────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestBookingChanges:
+
+    @pytest.fixture
+    def settled(self, monkeypatch):
+        monkeypatch.setattr("booking.services.booking_changes.SETTLE_S", -60)
+
+    def _token(self, client, query=""):
+        return client.get(f"/api/bookings/changes/{query}").data["token"]
+
+    def test_feed_returns_upserts_and_tombstones(self, auth_client, desk, room, location, user, settled):
+        grant_access(user, room, location)
+        token = self._token(auth_client)
+
+        kept = auth_client.post("/api/bookings/", {
+            "desk_id": desk.id, "start_time": iso(future(1)), "end_time": iso(future(2)),
+        }, format="json").data["id"]
+        gone = auth_client.post("/api/bookings/", {
+            "desk_id": desk.id, "start_time": iso(future(3)), "end_time": iso(future(4)),
+        }, format="json").data["id"]
+        assert auth_client.delete(f"/api/bookings/{gone}/").status_code == 204
+
+        resp = auth_client.get(f"/api/bookings/changes/?since={token}")
+        assert resp.status_code == 200
+        assert [b["id"] for b in resp.data["upserts"]] == [kept]
+        assert resp.data["deleted_ids"] == [gone]
+        assert resp.data["has_more"] is False
+        assert int(resp.data["token"]) > int(token)
+
+        # Nothing new since the returned token
+        again = auth_client.get(f"/api/bookings/changes/?since={resp.data['token']}").data
+        assert again["upserts"] == [] and again["deleted_ids"] == []
+
+    def test_edit_intervals_records_superseded_bookings(self, auth_client, desk, room, location, user, settled):
+        grant_access(user, room, location)
+        base = Booking.objects.create(user=user, desk=desk, start_time=future(2), end_time=future(3))
+        other = Booking.objects.create(user=user, desk=desk, start_time=future(4), end_time=future(5))
+        token = self._token(auth_client)
+
+        resp = auth_client.post(f"/api/bookings/{base.id}/edit_intervals/", {
+            "intervals": [{"start_time": iso(future(2)), "end_time": iso(future(6))}],
+        }, format="json")
+        assert resp.status_code == 200
+
+        data = auth_client.get(f"/api/bookings/changes/?since={token}").data
+        assert [b["id"] for b in data["upserts"]] == [base.id]
+        assert data["deleted_ids"] == [other.id]
+
+    def test_filters_by_room_and_user(self, auth_client, desk, desk2, room, location, user, user2, settled):
+        from booking.services import booking_changes
+        token = self._token(auth_client)
+        mine = Booking.objects.create(user=user, desk=desk, start_time=future(1), end_time=future(2))
+        theirs = Booking.objects.create(user=user2, desk=desk2, start_time=future(1), end_time=future(2))
+        booking_changes.record(desk.id, desk.room_id, upserts=[(mine.id, user.id)])
+        booking_changes.record(desk2.id, desk2.room_id, upserts=[(theirs.id, user2.id)])
+
+        by_room = auth_client.get(f"/api/bookings/changes/?since={token}&room={room.id}").data
+        assert {b["id"] for b in by_room["upserts"]} == {mine.id, theirs.id}
+        by_desk = auth_client.get(f"/api/bookings/changes/?since={token}&desk={desk2.id}").data
+        assert [b["id"] for b in by_desk["upserts"]] == [theirs.id]
+        by_user = auth_client.get(f"/api/bookings/changes/?since={token}&user={user.id}").data
+        assert [b["id"] for b in by_user["upserts"]] == [mine.id]
+
+        assert auth_client.get(f"/api/bookings/changes/?since={token}&user={user2.id}").status_code == 403
+
+    def test_token_does_not_pass_unsettled_changes(self, auth_client, desk, user):
+        from booking.services import booking_changes
+        token = self._token(auth_client)
+        b = Booking.objects.create(user=user, desk=desk, start_time=future(1), end_time=future(2))
+        booking_changes.record(desk.id, desk.room_id, upserts=[(b.id, user.id)])
+
+        data = auth_client.get(f"/api/bookings/changes/?since={token}").data
+        assert [row["id"] for row in data["upserts"]] == [b.id]
+        assert data["token"] == token
+
+    def test_pruned_token_expires(self, auth_client, desk, user, settings):
+        from booking.models import BookingChange
+        from booking.services import booking_changes
+        settings.BOOKING_CHANGES_RETENTION_DAYS = 30
+        b = Booking.objects.create(user=user, desk=desk, start_time=future(1), end_time=future(2))
+        booking_changes.record(desk.id, desk.room_id, upserts=[(b.id, user.id)])
+        BookingChange.objects.update(changed_at=timezone.now() - timedelta(days=31))
+        old_token = "0"
+
+        assert booking_changes.prune() == 1
+        assert auth_client.get(f"/api/bookings/changes/?since={old_token}").status_code == 410
+        assert auth_client.get("/api/bookings/changes/?since=abc").status_code == 400
+        fresh = self._token(auth_client)
+        assert auth_client.get(f"/api/bookings/changes/?since={fresh}").status_code == 200
+
+
+# ─── Bootstrap ────────────────────────────────────────────────────────────────
+
+class TestBootstrap:
+
+    def _check(self, data, user, desk, location, booking_ids):
+        assert data["me"]["username"] == user.username
+        assert data["me"]["is_location_manager"] is True
+        assert data["preferences"]["theme"]
+        country = next(c for c in data["topology"] if c["id"] == location.country_id)
+        loc = next(l for l in country["locations"] if l["id"] == location.id)
+        assert loc["num_rooms"] == 1 and loc["num_desks"] >= 1
+        assert [b["id"] for b in data["bookings"]] == booking_ids
+        assert data["manager_scope"]["locations"] == [{"id": location.id, "name": location.name}]
+
+    def _setup(self, user, user2, desk, location):
+        from django.core.cache import cache
+        cache.clear()
+        location.location_managers.add(user)
+        soon = Booking.objects.create(user=user, desk=desk, start_time=future(1), end_time=future(2))
+        Booking.objects.create(user=user, desk=desk, start_time=future(24 * 10), end_time=future(24 * 10 + 1))
+        Booking.objects.create(user=user2, desk=desk, start_time=future(3), end_time=future(4))
+        return [soon.id]
+
+    @pytest.mark.django_db
+    def test_bootstrap_sections(self, auth_client, user, user2, desk, location):
+        expected = self._setup(user, user2, desk, location)
+        resp = auth_client.get("/api/bootstrap/?tz=Europe/Bucharest")
+        assert resp.status_code == 200
+        self._check(resp.data, user, desk, location, expected)
+        assert resp.data["timezone"] == "Europe/Bucharest"
+
+    @pytest.mark.django_db
+    def test_bookings_section_follows_booking_writes(
+        self, auth_client, user, user2, desk, room, location, django_capture_on_commit_callbacks
+    ):
+        self._setup(user, user2, desk, location)
+        grant_access(user, room, location)
+        before = len(auth_client.get("/api/bootstrap/").data["bookings"])
+        with django_capture_on_commit_callbacks(execute=True):
+            auth_client.post("/api/bookings/", {
+                "desk_id": desk.id, "start_time": iso(future(5)), "end_time": iso(future(6)),
+            }, format="json")
+        assert len(auth_client.get("/api/bootstrap/").data["bookings"]) == before + 1
+
+    @pytest.mark.django_db
+    def test_topology_counts_without_joins(self, location, floor, room, desk):
+        from booking.models import Floor, Room
+        from booking.services import bootstrap
+        second = Floor.objects.create(name="Second", location=location)
+        for name, on in (("R2", floor), ("R3", second)):
+            r = Room.objects.create(name=name, floor=on)
+            Desk.objects.bulk_create([Desk(room=r, location=location, name=f"{name}-{i}") for i in range(2)])
+
+        with CaptureQueriesContext(connection) as queries:
+            topology = bootstrap._compute_topology()
+        loc = next(l for c in topology for l in c["locations"] if l["id"] == location.id)
+        assert (loc["num_floors"], loc["num_rooms"], loc["num_desks"]) == (2, 3, 5)
+        location_sql = next(q["sql"] for q in queries.captured_queries if "num_desks" in q["sql"])
+        assert "JOIN" not in location_sql.upper()
+
+    @pytest.mark.django_db
+    def test_unknown_timezone_rejected(self, auth_client):
+        assert auth_client.get("/api/bootstrap/?tz=Nowhere/Land").status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sections_run_on_the_pool(self, auth_client, user, user2, desk, location, settings):
+        import threading
+        from booking.services import bootstrap
+        settings.BOOTSTRAP_WORKERS = 5
+        expected = self._setup(user, user2, desk, location)
+
+        threads = set()
+        original = bootstrap.manager_scope
+        def spy(u):
+            threads.add(threading.current_thread().name)
+            return original(u)
+        with patch.object(bootstrap, "manager_scope", spy):
+            resp = auth_client.get("/api/bootstrap/")
+        assert resp.status_code == 200
+        self._check(resp.data, user, desk, location, expected)
+        assert all(name.startswith("bootstrap") for name in threads)
+
+
+
+# ─── Replica routing ──────────────────────────────────────────────────────────
+
+class TestReplicaRouting:
+    """choose_replica is spied on to see routing; replica_1 is a second connection mirroring the test database."""
+
+    def _spy(self):
+        from booking import db_router
+        return patch.object(db_router, "choose_replica", wraps=db_router.choose_replica)
+
+    def test_replica_hosts_define_aliases(self, monkeypatch):
+        import runpy
+        from django.conf import settings
+        monkeypatch.setenv("DB_REPLICA_HOSTS", "replica.internal:6543/flexspace_replica, 10.0.0.7")
+        configured = runpy.run_path(settings.BASE_DIR / "booking_project" / "settings.py")
+        databases = configured["DATABASES"]
+        assert configured["DATABASE_REPLICAS"] == ["replica_1", "replica_2"]
+        assert (databases["replica_1"]["HOST"], databases["replica_1"]["PORT"], databases["replica_1"]["NAME"]) == (
+            "replica.internal", "6543", "flexspace_replica")
+        assert (databases["replica_2"]["HOST"], databases["replica_2"]["PORT"], databases["replica_2"]["NAME"]) == (
+            "10.0.0.7", databases["default"]["PORT"], databases["default"]["NAME"])
+        assert databases["replica_2"]["TEST"] == {"MIRROR": "default"}
+
+    @pytest.mark.django_db(transaction=True, databases=["default", "replica_1"])
+    def test_reads_run_on_the_replica_connection(self, auth_client, user, desk, room, location, settings):
+        from django.core.cache import cache
+        from django.db import connections
+        cache.clear()
+        settings.DATABASE_REPLICAS = ["replica_1"]
+        grant_access(user, room, location)
+        Booking.objects.create(user=user, desk=desk, start_time=future(1), end_time=future(2))
+
+        with CaptureQueriesContext(connections["replica_1"]) as replica:
+            resp = auth_client.get("/api/bookings/")
+        assert resp.status_code == 200
+        assert len(resp.data) == 1
+        assert any("booking_booking" in q["sql"] for q in replica.captured_queries)
+
+        with patch("booking.services.outbox.async_to_sync"), patch("booking.services.outbox.get_channel_layer"):
+            resp = auth_client.post("/api/bookings/", {
+                "desk_id": desk.id, "start_time": iso(future(3)), "end_time": iso(future(4)),
+            }, format="json")
+        assert resp.status_code == 201
+        with CaptureQueriesContext(connections["replica_1"]) as replica:
+            assert len(auth_client.get("/api/bookings/").data) == 2
+        assert replica.captured_queries == []
+
+    @pytest.mark.django_db
+    def test_router_keeps_writes_and_transactions_on_primary(self, settings):
+        from booking.db_router import PrimaryReplicaRouter, replica_reads
+        settings.DATABASE_REPLICAS = ["replica_1"]
+        router = PrimaryReplicaRouter()
+        assert router.db_for_read(Booking) == "default"  # not opted in
+        with replica_reads():
+            assert router.db_for_write(Booking) == "default"
+            assert router.db_for_read(Booking) == "default"  # django_db runs inside atomic
+        assert router.allow_migrate("replica_1", "booking") is False
+
+    @pytest.mark.django_db(transaction=True)
+    def test_router_sends_opted_in_reads_to_replica(self, settings):
+        from booking.db_router import PrimaryReplicaRouter, replica_reads
+        settings.DATABASE_REPLICAS = ["replica_1"]
+        router = PrimaryReplicaRouter()
+        with replica_reads():
+            assert router.db_for_read(Booking) == "replica_1"
+        assert router.db_for_read(Booking) == "default"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reads_go_to_replica_until_own_write(self, auth_client, user, desk, room, location, settings):
+        from django.core.cache import cache
+        cache.clear()
+        settings.DATABASE_REPLICAS = ["default"]
+        grant_access(user, room, location)
+        with self._spy() as spy:
+            assert auth_client.get("/api/bookings/").status_code == 200
+            assert spy.call_count > 0
+
+            spy.reset_mock()
+            with patch("booking.services.outbox.async_to_sync"), patch("booking.services.outbox.get_channel_layer"):
+                resp = auth_client.post("/api/bookings/", {
+                    "desk_id": desk.id, "start_time": iso(future(1)), "end_time": iso(future(2)),
+                }, format="json")
+            assert resp.status_code == 201
+            assert spy.call_count == 0
+
+            # Pinned to the primary right after writing
+            assert len(auth_client.get("/api/bookings/").data) == 1
+            assert spy.call_count == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_other_users_are_not_pinned(self, auth_client, auth_client2, user, desk, room, location, settings):
+        from django.core.cache import cache
+        cache.clear()
+        settings.DATABASE_REPLICAS = ["default"]
+        grant_access(user, room, location)
+        with patch("booking.services.outbox.async_to_sync"), patch("booking.services.outbox.get_channel_layer"):
+            auth_client.post("/api/bookings/", {
+                "desk_id": desk.id, "start_time": iso(future(1)), "end_time": iso(future(2)),
+            }, format="json")
+        with self._spy() as spy:
+            assert auth_client2.get("/api/bookings/").status_code == 200
+            assert spy.call_count > 0
+
+
+# ─── Availability ─────────────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestAvailability:
+
+    def _at(self, day, hour):
+        import datetime
+        return datetime.datetime.combine(day, datetime.time(hour), tzinfo=datetime.timezone.utc)
+
+    def test_room_availability_marks_every_touched_day(self, auth_client, user, desk, desk2, room):
+        import datetime
+        d0 = datetime.date(2026, 5, 4)
+        Booking.objects.bulk_create([
+            # Spans three days
+            Booking(user=user, desk=desk, start_time=self._at(d0, 22), end_time=self._at(d0 + timedelta(days=2), 3)),
+            # Ends exactly at midnight: still counts for the day it ends on, as __date did
+            Booking(user=user, desk=desk2, start_time=self._at(d0 + timedelta(days=3), 20),
+                    end_time=self._at(d0 + timedelta(days=4), 0)),
+            # Outside the window
+            Booking(user=user, desk=desk2, start_time=self._at(d0 - timedelta(days=2), 9),
+                    end_time=self._at(d0 - timedelta(days=2), 10)),
+        ])
+        with CaptureQueriesContext(connection) as ctx:
+            resp = auth_client.get(f"/api/rooms/{room.id}/availability/?start=2026-05-04&days=6")
+        assert resp.status_code == 200
+        by_desk = {d["desk_id"]: d["availability"] for d in resp.data["desks"]}
+        assert [day for day, free in by_desk[desk.id].items() if not free] == [
+            "2026-05-04", "2026-05-05", "2026-05-06",
+        ]
+        assert [day for day, free in by_desk[desk2.id].items() if not free] == ["2026-05-07", "2026-05-08"]
+        # One bookings query for the whole room, not one per desk and day
+        assert sum("booking_booking" in q["sql"] for q in ctx.captured_queries) == 1
+
+    def test_desk_availability(self, auth_client, user, desk):
+        import datetime
+        d0 = datetime.date(2026, 5, 4)
+        Booking.objects.bulk_create([
+            Booking(user=user, desk=desk, start_time=self._at(d0, 9), end_time=self._at(d0, 17)),
+        ])
+        resp = auth_client.get(f"/api/desks/{desk.id}/availability/?start=2026-05-03&days=3")
+        assert resp.data["availability"] == {"2026-05-03": True, "2026-05-04": False, "2026-05-05": True}
+
+
 # ─── Booking cancel ───────────────────────────────────────────────────────────
 
 @pytest.mark.django_db
@@ -297,8 +846,8 @@ class TestBookingUpdate:
 class TestDeskLock:
 
     @patch("booking.views.acquire_lock", return_value=True)
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_lock_succeeds_on_free_desk(self, _layer, _async, _acquire, auth_client, desk):
         resp = auth_client.post(
             "/api/bookings/lock/", {"desk_id": desk.id}, format="json"
@@ -321,8 +870,8 @@ class TestDeskLock:
         assert resp.status_code == 400
 
     @patch("booking.views.release_lock", return_value=True)
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_unlock_succeeds_for_lock_owner(self, _layer, _async, _release, auth_client, desk):
         resp = auth_client.post(
             "/api/bookings/unlock/", {"desk_id": desk.id}, format="json"
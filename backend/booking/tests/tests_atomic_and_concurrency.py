@@ -45,10 +45,16 @@ def grant_access(user, room, location, name=None):
 @pytest.mark.django_db(transaction=True)
 class TestAtomicTransactions:
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_booking_creation_is_atomic(self, _layer, _async, auth_client, desk, room, location, user):
-        """If broadcast fails after booking, entire transaction should roll back."""
+        """
+        A broadcast failure no longer rolls the booking back: the booking
+        commits, and its broadcasts stay in the outbox for relay_outbox.
+        """
+        from booking.models_outbox import OutboxEvent
+        from booking.services import outbox
+        from booking.tasks import relay_outbox
         grant_access(user, room, location)
 
         # Simulate broadcast failure
@@ -59,12 +65,26 @@ class TestAtomicTransactions:
             "start_time": iso(future(1)),
             "end_time": iso(future(3)),
         }, format="json")
+        assert resp.status_code == 201
+        assert Booking.objects.filter(desk=desk).exists()
+
+        # Wait for the on-commit fast path, which fails and leaves the events
+        outbox._pool().submit(lambda: None).result()
+        pending = OutboxEvent.objects.filter(kind=OutboxEvent.Kind.BROADCAST)
+        assert pending.exists()
+        assert set(pending.values_list("attempts", flat=True)) == {1}
+
+        # The sweeper retries them once past the grace period, still failing
+        pending.update(created_at=past(1))
+        relay_outbox()
+        assert set(pending.values_list("attempts", flat=True)) == {2}
 
-        # Booking should not exist since transaction rolled back
-        assert resp.status_code == 500 or not Booking.objects.filter(desk=desk).exists()
+        _async.side_effect = None
+        relay_outbox()
+        assert not pending.exists()
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_desk_state_consistent_after_booking(self, _layer, _async, auth_client, desk, room, location, user):
         """Desk is_booked state must reflect active booking accurately."""
         grant_access(user, room, location)
@@ -86,8 +106,8 @@ class TestAtomicTransactions:
         assert desk.is_booked is True
         assert desk.booked_by == user
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_desk_state_clears_after_booking_deleted(self, _layer, _async, auth_client, desk, room, location, user):
         """After cancelling active booking, desk should no longer be booked."""
         grant_access(user, room, location)
@@ -106,8 +126,8 @@ class TestAtomicTransactions:
         assert desk.is_booked is False
         assert desk.booked_by is None
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_overlapping_booking_rolls_back_cleanly(self, _layer, _async, auth_client, auth_client2, desk, room, location, user, user2):
         """Failed booking attempt must leave no partial state."""
         grant_access(user, room, location)
@@ -226,8 +246,8 @@ class TestConcurrency:
 @pytest.mark.django_db
 class TestBookingOwnership:
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_user_cannot_cancel_another_users_booking(self, _layer, _async, auth_client, desk, room, location, user, user2):
         """Regular user must receive 403 when trying to cancel another user's booking."""
         grant_access(user, room, location)
@@ -242,8 +262,8 @@ class TestBookingOwnership:
         assert resp.status_code == 403
         assert Booking.objects.filter(pk=booking.id).exists()
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_user_can_cancel_own_booking(self, _layer, _async, auth_client, desk, room, location, user):
         """User should be able to cancel their own booking."""
         grant_access(user, room, location)
@@ -255,8 +275,8 @@ class TestBookingOwnership:
         assert resp.status_code == 204
         assert not Booking.objects.filter(pk=booking.id).exists()
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_superuser_can_cancel_any_booking(self, _layer, _async, admin_client, desk, user):
         """Superusers should be able to cancel any booking."""
         booking = Booking.objects.create(
@@ -266,8 +286,8 @@ class TestBookingOwnership:
         resp = admin_client.delete(f"/api/bookings/{booking.id}/")
         assert resp.status_code == 204
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_staff_can_cancel_any_booking(self, _layer, _async, desk, user, user2):
         """Staff users should also be able to cancel any booking."""
         from rest_framework.test import APIClient
@@ -293,8 +313,8 @@ class TestBookingOwnership:
 @pytest.mark.django_db(transaction=True)
 class TestTaskTransactions:
 
-    @patch("booking.tasks.async_to_sync")
-    @patch("booking.tasks.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_expire_and_activate_updates_desk_atomically(self, _layer, _async, desk, user):
         """expire_and_activate_bookings should update desk state under a transaction."""
         from booking.tasks import expire_and_activate_bookings
@@ -312,8 +332,8 @@ class TestTaskTransactions:
         assert desk.is_booked is True
         assert desk.booked_by == user
 
-    @patch("booking.tasks.async_to_sync")
-    @patch("booking.tasks.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_expire_and_activate_clears_ended_booking(self, _layer, _async, desk, user):
         """expire_and_activate_bookings should clear desk state when booking ends."""
         from booking.tasks import expire_and_activate_bookings
@@ -335,8 +355,8 @@ class TestTaskTransactions:
         assert desk.booked_by is None
 
     @patch("booking.tasks.read_lock", return_value=None)
-    @patch("booking.tasks.async_to_sync")
-    @patch("booking.tasks.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_startup_sync_clears_stale_lock(self, _layer, _async, _read_lock, desk, user):
         """startup_sync_desks should clear DB lock if Redis lock has expired."""
         from booking.tasks import startup_sync_desks
@@ -357,8 +377,8 @@ class TestTaskTransactions:
 @pytest.mark.django_db
 class TestBookingDeletionGuardrail:
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_cannot_cancel_past_booking(self, _layer, _async, auth_client, desk, room, location, user):
         """User cannot cancel a booking that has already ended."""
         grant_access(user, room, location)
@@ -371,8 +391,8 @@ class TestBookingDeletionGuardrail:
         assert "past" in str(resp.data).lower()
         assert Booking.objects.filter(pk=booking.id).exists()
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_can_cancel_active_booking(self, _layer, _async, auth_client, desk, room, location, user):
         """User can cancel a booking that is currently active."""
         grant_access(user, room, location)
@@ -384,8 +404,8 @@ class TestBookingDeletionGuardrail:
         assert resp.status_code == 204
         assert not Booking.objects.filter(pk=booking.id).exists()
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_can_cancel_future_booking(self, _layer, _async, auth_client, desk, room, location, user):
         """User can cancel a booking that hasn't started yet."""
         grant_access(user, room, location)
@@ -397,8 +417,8 @@ class TestBookingDeletionGuardrail:
         assert resp.status_code == 204
         assert not Booking.objects.filter(pk=booking.id).exists()
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_staff_can_cancel_past_booking(self, _layer, _async, desk, user, user2):
         """Staff should be able to cancel past bookings."""
         from rest_framework.test import APIClient
@@ -418,8 +438,8 @@ class TestBookingDeletionGuardrail:
         resp = client.delete(f"/api/bookings/{booking.id}/")
         assert resp.status_code == 204
 
-    @patch("booking.views.async_to_sync")
-    @patch("booking.views.get_channel_layer")
+    @patch("booking.services.outbox.async_to_sync")
+    @patch("booking.services.outbox.get_channel_layer")
     def test_superuser_can_cancel_active_booking(self, _layer, _async, admin_client, desk, user):
         """Superuser can cancel active bookings."""
         booking = Booking.objects.create(
@@ -25,6 +25,15 @@ What is tested:
     - non-member cannot book
     - room manager / location manager / superuser bypass gate
     - location gate blocks even when user is in room group
+
+  Denormalized location / room columns
+    - set on save and bulk_create, follow floor / room / desk moves, backfill command
+
+  Booking query plans (Postgres only)
+    - hot booking queries use the Meta indexes on a large synthetic table (EXPLAIN)
+
+  Connection reuse (Postgres only)
+    - bench_db_connections: pool vs persistent vs fresh connections per request
 """
 import pytest
 from django.core.exceptions import ValidationError
@@ -347,4 +356,273 @@ class TestRoomAccessControl:
         room_g.members.add(user)
         room.allowed_groups.add(room_g)
 
-        assert room.can_user_book(user) is True
\ No newline at end of file
+        assert room.can_user_book(user) is True
+
+
+# ─── Denormalized location / room ─────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestDenormalizedLocation:
+
+    def test_columns_set_on_save(self, room, desk, location, user):
+        b = Booking.objects.create(user=user, desk=desk, start_time=future(1), end_time=future(2))
+        assert room.location_id == location.id
+        assert desk.location_id == location.id
+        assert (b.room_id, b.location_id) == (room.id, location.id)
+
+    def test_bulk_create_fills_columns(self, desk, room, location, user):
+        Booking.objects.bulk_create([Booking(user=user, desk=desk, start_time=future(1), end_time=future(2))])
+        d = Desk.objects.bulk_create([Desk(name="Bulk", room=room)])[0]
+        assert Booking.objects.filter(room=room, location=location).count() == 1
+        assert Desk.objects.get(pk=d.pk).location_id == location.id
+
+    def test_floor_move_cascades(self, floor, room, desk, user, country):
+        b = Booking.objects.create(user=user, desk=desk, start_time=future(1), end_time=future(2))
+        other = Location.objects.create(name="Elsewhere", country=country)
+        floor.location = other
+        floor.save()
+        assert Room.objects.get(pk=room.pk).location_id == other.id
+        assert Desk.objects.get(pk=desk.pk).location_id == other.id
+        assert Booking.objects.get(pk=b.pk).location_id == other.id
+
+    def test_room_and_desk_moves_cascade(self, location, country, room, desk, user):
+        b = Booking.objects.create(user=user, desk=desk, start_time=future(1), end_time=future(2))
+        other_loc = Location.objects.create(name="Elsewhere", country=country)
+        other_floor = Floor.objects.create(name="F9", location=other_loc)
+        room.floor = other_floor
+        room.save()
+        assert Booking.objects.get(pk=b.pk).location_id == other_loc.id
+
+        new_room = Room.objects.create(name="New", floor=Floor.objects.create(name="F1", location=location))
+        desk.room = new_room
+        desk.save()
+        b.refresh_from_db()
+        assert (b.room_id, b.location_id) == (new_room.id, location.id)
+
+    def test_partial_saves_leave_columns_alone(self, room, desk):
+        room.is_under_maintenance = True
+        room.save(update_fields=['is_under_maintenance'])
+        desk.refresh_booking_state()
+        assert Desk.objects.get(pk=desk.pk).location_id == room.location_id
+
+    def test_location_wide_query_needs_no_joins(self, location):
+        sql = str(Booking.objects.filter(location=location, end_time__gt=timezone.now()).query)
+        assert "JOIN" not in sql
+
+    def test_backfill_command(self, room, desk, location, user):
+        import io
+        from django.core.management import call_command
+        b = Booking.objects.create(user=user, desk=desk, start_time=future(1), end_time=future(2))
+        Room.objects.update(location=None)
+        Desk.objects.update(location=None)
+        Booking.objects.update(room=None, location=None)
+
+        call_command("backfill_location_columns", batch_size=1, stdout=io.StringIO())
+        assert Room.objects.get(pk=room.pk).location_id == location.id
+        assert Desk.objects.get(pk=desk.pk).location_id == location.id
+        b.refresh_from_db()
+        assert (b.room_id, b.location_id) == (room.id, location.id)
+
+    def test_migrate_backfills_missing_columns(self, room, desk, location, user):
+        import io
+        from booking.db_extensions import backfill_location_columns
+        b = Booking.objects.create(user=user, desk=desk, start_time=future(1), end_time=future(2))
+        Room.objects.update(location=None)
+        Desk.objects.update(location=None)
+        Booking.objects.update(room=None, location=None)
+
+        backfill_location_columns(stdout=io.StringIO())
+        b.refresh_from_db()
+        assert (b.room_id, b.location_id) == (room.id, location.id)
+        assert Desk.objects.get(pk=desk.pk).location_id == location.id
+
+    def test_index_hook_reports_missing_pg_trgm_only_when_verbose(self, capsys):
+        import io
+        from django.db import connection
+        from booking.db_extensions import create_postgres_indexes
+        if connection.vendor != "postgresql":
+            pytest.skip("Postgres-only indexes")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is not None:
+                pytest.skip("pg_trgm is installed here")
+
+        create_postgres_indexes(verbosity=0)
+        assert capsys.readouterr().out == ""
+        out = io.StringIO()
+        create_postgres_indexes(stdout=out)
+        assert out.getvalue() == "pg_trgm is not installed; skipping the audit username index\n"
+
+    def test_checks_fall_back_to_floor_before_backfill(self, room, location, user):
+        Room.objects.update(location=None)
+        legacy = Room.objects.get(pk=room.pk)
+        location.location_managers.add(user)
+        assert legacy.get_location() == location
+        assert legacy.is_room_manager(user) is True
+        assert legacy.can_user_book(user) is True
+
+
+# ─── Query plans ──────────────────────────────────────────────────────────────
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+@pytest.mark.django_db
+class TestBookingQueryPlans:
+    """
+    EXPLAIN the hot booking queries against ~100k synthetic bookings
+    (500 desks, 200 users, ~two years, mostly past) and fail on a sequential scan of
+    the booking table, so a dropped index or a non-sargable filter
+    shows up here rather than in production latency.
+    """
+    DESKS = 500
+    USERS = 200
+    BOOKINGS = 100_000
+
+    @pytest.fixture(scope="class")
+    def plan_desk_id(self, django_db_setup, django_db_blocker):
+        """Build the dataset once for the class, committed outside the per-test transactions."""
+        from django.contrib.auth.models import User
+        from django.db import connection
+        with django_db_blocker.unblock():
+            if connection.vendor != "postgresql":
+                pytest.skip("query plans are Postgres-specific")
+            country = Country.objects.create(name="Planland", country_code="PL")
+            location = Location.objects.create(name="Plan HQ", country=country)
+            room = Room.objects.create(name="Plan Room", floor=Floor.objects.create(name="P1", location=location))
+            desk_table, booking_table = Desk._meta.db_table, Booking._meta.db_table
+            user_table = User._meta.db_table
+            # Mostly history, about a month of upcoming bookings, like a real table
+            start = timezone.now() - timedelta(days=660)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {user_table} (username, password, is_superuser, is_staff, is_active, "
+                    f"first_name, last_name, email, date_joined) "
+                    f"SELECT 'synthetic' || n, '', false, false, true, '', '', '', now() "
+                    f"FROM generate_series(1, %s) n",
+                    [self.USERS],
+                )
+                cursor.execute(
+                    f"INSERT INTO {desk_table} (name, room_id, location_id, is_booked, is_locked, pos_x, pos_y, orientation, is_permanent) "
+                    f"SELECT 'D' || n, %s, %s, false, false, 0, 0, 'bottom', false FROM generate_series(1, %s) n",
+                    [room.id, room.location_id, self.DESKS],
+                )
+                # Bookings in time order, one to eight hours long, one every ten minutes
+                cursor.execute(
+                    f"INSERT INTO {booking_table} (user_id, desk_id, room_id, location_id, start_time, end_time) "
+                    f"SELECT u.ids[1 + n %% array_length(u.ids, 1)], d.ids[1 + n %% array_length(d.ids, 1)], %s, %s, "
+                    f"       %s + n * interval '10 minutes', %s + n * interval '10 minutes' + (1 + n %% 8) * interval '1 hour' "
+                    f"FROM generate_series(1, %s) n, "
+                    f"     (SELECT array_agg(id) ids FROM {user_table} WHERE username LIKE 'synthetic%%') u, "
+                    f"     (SELECT array_agg(id) ids FROM {desk_table} WHERE room_id = %s) d",
+                    [room.id, room.location_id, start, start, self.BOOKINGS, room.id],
+                )
+                cursor.execute(f"ANALYZE {user_table}, {desk_table}, {booking_table}")
+            yield Desk.objects.filter(room=room).order_by("id").values_list("id", flat=True).first()
+
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {booking_table} WHERE room_id = %s", [room.id])
+                cursor.execute(f"DELETE FROM {desk_table} WHERE room_id = %s", [room.id])
+                cursor.execute(f"DELETE FROM {user_table} WHERE username LIKE 'synthetic%%'")
+            country.delete()
+
+    @pytest.fixture
+    def dataset(self, plan_desk_id, db):
+        return Desk.objects.get(pk=plan_desk_id)
+
+    def _scans(self, qs):
+        import json
+        plan = json.loads(qs.explain(format="json"))[0]["Plan"]
+        # Bitmap Index Scan children carry the index name, not the relation
+        return [
+            (node["Node Type"], {n.get("Index Name") for n in _plan_nodes(node)} - {None})
+            for node in _plan_nodes(plan)
+            if node.get("Relation Name") == Booking._meta.db_table
+        ]
+
+    def _assert_indexed(self, qs, index=None):
+        scans = self._scans(qs)
+        assert scans, "booking table not scanned?"
+        assert not any(node == "Seq Scan" for node, _ in scans), scans
+        if index:
+            assert any(index in names for _, names in scans), scans
+
+    def test_overlap_check(self, dataset):
+        now = timezone.now()
+        self._assert_indexed(
+            Booking.objects.filter(desk=dataset, start_time__lt=now + timedelta(hours=2), end_time__gt=now),
+            "booking_desk_end_idx",
+        )
+
+    def test_current_booking_lookup(self, dataset):
+        now = timezone.now()
+        self._assert_indexed(dataset.bookings.filter(start_time__lte=now, end_time__gte=now), "booking_desk_end_idx")
+
+    def test_user_history(self, dataset):
+        uid = Booking.objects.values_list("user_id", flat=True).first()
+        self._assert_indexed(
+            Booking.objects.filter(user_id=uid).order_by("-start_time")[:50], "booking_user_start_idx"
+        )
+
+    def test_availability_window(self, dataset):
+        from booking.services.intervals import touches_days
+        today = timezone.now().date()
+        self._assert_indexed(
+            Booking.objects.filter(touches_days(today, today + timedelta(days=13)), desk=dataset)
+        )
+
+    def test_recently_ended_across_desks(self, dataset):
+        now = timezone.now()
+        self._assert_indexed(
+            Booking.objects.filter(end_time__gte=now - timedelta(minutes=1), end_time__lte=now),
+            "booking_time_brin",
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConnectionReuse:
+
+    def _bench(self, *args):
+        import io
+        from django.core.management import call_command
+        from django.db import connection
+        if connection.vendor != "postgresql":
+            pytest.skip("Connection benchmarks need Postgres")
+        out = io.StringIO()
+        call_command("bench_db_connections", "--requests", "10", *args, stdout=out)
+        return {line.split()[0]: int(line.split()[-1]) for line in out.getvalue().splitlines()[2:]}
+
+    def test_pool_reuses_connections_across_request_threads(self):
+        backends = self._bench()
+        assert backends["direct"] == 10
+        assert backends["persistent"] == 10  # thread-bound, lost with the thread
+        assert backends["pool"] <= 2
+
+    def test_persistent_connection_reused_on_one_thread(self):
+        assert self._bench("--same-thread", "--mode", "persistent")["persistent"] == 1
+
+    def test_pooled_settings_open_a_connection(self, monkeypatch):
+        import runpy
+        from django.conf import settings
+        from django.db import connection
+        from django.db.utils import ConnectionHandler
+        if connection.vendor != "postgresql":
+            pytest.skip("Connection pooling needs Postgres")
+        monkeypatch.setenv("DB_POOL", "true")
+        pooled = runpy.run_path(settings.BASE_DIR / "booking_project" / "settings.py")["DATABASES"]["default"]
+
+        # The test database's credentials with the production pool options
+        conf = {**settings.DATABASES["default"], "OPTIONS": pooled["OPTIONS"],
+                "CONN_HEALTH_CHECKS": pooled["CONN_HEALTH_CHECKS"]}
+        handler = ConnectionHandler({"default": conf})
+        try:
+            with handler["default"].cursor() as cursor:
+                cursor.execute("SELECT 1")
+                assert cursor.fetchone() == (1,)
+            assert handler["default"].pool is not None
+        finally:
+            handler["default"].close()
+            handler["default"].close_pool()
@@ -0,0 +1,65 @@
+"""
+tests_renderers.py — Unit tests for the orjson renderer / parser.
+
+What is tested:
+  ORJSONRenderer — output parses to the same value as DRF's JSONRenderer
+                   for datetimes, dates, Decimals, UUIDs and lazy strings
+  ORJSONParser   — round-trips JSON bodies, malformed input → ParseError
+  API            — list endpoints are served through the orjson renderer
+"""
+import io
+import uuid
+import decimal
+import datetime
+import json
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from booking_project.renderers import ORJSONRenderer, ORJSONParser
+
+
+SAMPLE = {
+    "aware": datetime.datetime(2026, 3, 1, 9, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+    "naive": datetime.datetime(2026, 3, 1, 9, 30),
+    "day": datetime.date(2026, 3, 1),
+    "price": decimal.Decimal("12.50"),
+    "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "label": gettext_lazy("Desk"),
+    "nested": [{"n": 1}, {"n": None}],
+}
+
+
+class TestORJSONRenderer:
+
+    def test_output_matches_drf_renderer(self):
+        ours = json.loads(ORJSONRenderer().render(SAMPLE))
+        theirs = json.loads(JSONRenderer().render(SAMPLE))
+        assert ours == theirs
+
+    def test_aware_utc_datetime_uses_z_suffix(self):
+        out = ORJSONRenderer().render({"t": SAMPLE["aware"]})
+        assert out == b'{"t":"2026-03-01T09:30:15.123456Z"}'
+
+    def test_none_renders_empty_body(self):
+        assert ORJSONRenderer().render(None) == b""
+
+
+class TestORJSONParser:
+
+    def test_parses_body(self):
+        data = ORJSONParser().parse(io.BytesIO(b'{"desk_id": 3, "intervals": []}'))
+        assert data == {"desk_id": 3, "intervals": []}
+
+    def test_malformed_body_raises_parse_error(self):
+        with pytest.raises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"desk_id": '))
+
+
+@pytest.mark.django_db
+def test_api_responses_use_orjson_renderer(auth_client, room):
+    resp = auth_client.get("/api/rooms/")
+    assert isinstance(resp.accepted_renderer, ORJSONRenderer)
+    assert resp.json()[0]["id"] == room.id
@@ -18,11 +18,42 @@ What is tested:
       — sets is_booked for active bookings on startup
       — clears stale is_booked flag when no active booking
       — clears stale lock flag when Redis key is absent
-    cleanup_expired_tokens — smoke test (no tokens → completes cleanly)
+    cleanup_expired_tokens
+      — smoke test (no tokens → completes cleanly)
+      — deletes expired tokens and their blacklist rows in id-range batches
+      — stops at the time budget and reports what is left; expires_at index exists
+    flush_audit_log
+      — AuditLog.log buffers entries after commit when AUDIT_LOG_ASYNC is on
+      — flush bulk-inserts buffered entries with their original timestamps
+      — falls back to a direct insert when Redis is unavailable
+    relay_outbox
+      — events are stored with the write and published only after commit
+      — one message per group per relay pass; failed sends retried by the sweeper
+      — consumers unpack batched messages
+    event bus (booking.events)
+      — bulk writes emit one event per desk batch; in-transaction subscribers run with it
+      — on-commit subscribers wait for commit; tasks and maintenance toggles emit events
+    room availability counters
+      — cached after the first read; room list reads them instead of counting
+      — desk state transitions (tasks, permanent assignment, desk PATCH) adjust and announce
+      — moving a desk to another room recounts both rooms
+      — reconcile_room_availability fixes drift
+    task queues
+      — tasks routed to realtime / notifications / maintenance
+      — wait-in-queue samples recorded per queue and capped
+      — single-flight guard skips overlapping desk state runs; skipped ticks are caught up
+    booking emails
+      — create / bulk create / cancel queue one send_booking_notifications task after commit
+      — a bulk operation becomes one digest per user; all messages share one SMTP connection
+      — after a partial SMTP failure the retry resends only the unsent messages
+    booking reminders
+      — sweep claims due, unreminded bookings once, in batches queued through the outbox
+      — moving a booking clears reminded_at; sends skip cancelled and started bookings
 
 Design notes:
   - All Redis interactions are mocked via unittest.mock.patch so no real Redis is needed.
-  - Channel layer broadcasts are also mocked to avoid network requirements.
+  - Channel layer broadcasts are also mocked (in services.outbox, which publishes them)
+    to avoid network requirements.
   - Bookings with past start_times are created via Booking.objects.bulk_create() to
     bypass the full_clean() validation that Booking.save() enforces.
 """
@@ -171,8 +202,8 @@ class TestExpireAndActivateBookings:
         _bk(user, desk, past(2), past(1/120))  # ended ~30 seconds ago
         Desk.objects.filter(pk=desk.pk).update(is_booked=True, booked_by=user)
 
-        with patch("booking.tasks.get_channel_layer"), \
-             patch("booking.tasks.async_to_sync"):
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync"):
             from booking.tasks import expire_and_activate_bookings
             expire_and_activate_bookings()
 
@@ -184,8 +215,8 @@ class TestExpireAndActivateBookings:
         # start_time must be within the last minute for the task to pick it up
         _bk(user, desk, past(1/120), future(3))  # started ~30 seconds ago
 
-        with patch("booking.tasks.get_channel_layer"), \
-             patch("booking.tasks.async_to_sync"):
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync"):
             from booking.tasks import expire_and_activate_bookings
             expire_and_activate_bookings()
 
@@ -197,8 +228,8 @@ class TestExpireAndActivateBookings:
     def test_stale_db_lock_cleared_when_redis_key_gone(self, _read, desk, user):
         Desk.objects.filter(pk=desk.pk).update(is_locked=True, locked_by=user)
 
-        with patch("booking.tasks.get_channel_layer"), \
-             patch("booking.tasks.async_to_sync"):
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync"):
             from booking.tasks import expire_and_activate_bookings
             expire_and_activate_bookings()
 
@@ -211,8 +242,8 @@ class TestExpireAndActivateBookings:
         mock_read.return_value = {"user_id": user.id, "username": user.username}
         Desk.objects.filter(pk=desk.pk).update(is_locked=True, locked_by=user)
 
-        with patch("booking.tasks.get_channel_layer"), \
-             patch("booking.tasks.async_to_sync"):
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync"):
             from booking.tasks import expire_and_activate_bookings
             expire_and_activate_bookings()
 
@@ -229,8 +260,8 @@ class TestStartupSyncDesks:
         _bk(user, desk, past(1), future(3))
         Desk.objects.filter(pk=desk.pk).update(is_booked=False)
 
-        with patch("booking.tasks.get_channel_layer"), \
-             patch("booking.tasks.async_to_sync"):
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync"):
             from booking.tasks import startup_sync_desks
             startup_sync_desks()
 
@@ -241,8 +272,8 @@ class TestStartupSyncDesks:
     def test_no_active_booking_clears_stale_booked_flag(self, desk, user):
         Desk.objects.filter(pk=desk.pk).update(is_booked=True, booked_by=user)
 
-        with patch("booking.tasks.get_channel_layer"), \
-             patch("booking.tasks.async_to_sync"):
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync"):
             from booking.tasks import startup_sync_desks
             startup_sync_desks()
 
@@ -254,8 +285,8 @@ class TestStartupSyncDesks:
     def test_stale_lock_cleared_on_startup(self, _read, desk, user):
         Desk.objects.filter(pk=desk.pk).update(is_locked=True, locked_by=user)
 
-        with patch("booking.tasks.get_channel_layer"), \
-             patch("booking.tasks.async_to_sync"):
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync"):
             from booking.tasks import startup_sync_desks
             startup_sync_desks()
 
@@ -272,4 +303,1109 @@ class TestCleanupExpiredTokens:
     def test_completes_with_no_tokens_present(self):
         from booking.tasks import cleanup_expired_tokens
         result = cleanup_expired_tokens()
-        assert "Cleaned up" in result
\ No newline at end of file
+        assert "Cleaned up" in result
+
+    def _tokens(self, user, expired, fresh=0, blacklist=0):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        tokens = [
+            OutstandingToken.objects.create(user=user, jti=f"jti-{i}", token="t", expires_at=past(48) if i < expired else future(24))
+            for i in range(expired + fresh)
+        ]
+        for token in tokens[:blacklist]:
+            BlacklistedToken.objects.create(token=token)
+        return tokens
+
+    def test_deletes_in_batches(self, user):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from booking.services.token_cleanup import cleanup
+        self._tokens(user, expired=5, fresh=1, blacklist=2)
+        stats = cleanup(past(24), batch_size=2, budget_s=60)
+        assert stats["outstanding"] == 5
+        assert stats["blacklisted"] == 2
+        assert stats["batches"] == 3
+        assert stats["complete"] is True
+        assert OutstandingToken.objects.count() == 1
+        assert BlacklistedToken.objects.count() == 0
+
+    def test_stops_at_time_budget(self, user):
+        from django.core.cache import cache
+        from booking.services.token_cleanup import LAST_RUN_KEY, cleanup
+        self._tokens(user, expired=3)
+        stats = cleanup(past(24), batch_size=2, budget_s=0)
+        assert stats["batches"] == 0
+        assert stats["complete"] is False
+        assert stats["remaining"] == 3
+        assert cache.get(LAST_RUN_KEY)["remaining"] == 3
+
+    def test_expires_at_index_created(self):
+        from django.db import connection
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, "token_blacklist_outstandingtoken")
+        assert constraints["token_outstanding_expires_idx"]["columns"] == ["expires_at", "id"]
+
+
+# ─── Audit buffer ─────────────────────────────────────────────────────────────
+
+class _FakeList:
+    """Just enough of a Redis connection for the audit buffer."""
+
+    def __init__(self):
+        self.items = []
+        self.dead = []
+        self.values = {}
+
+    def rpush(self, key, *values):
+        target = self.dead if key == "audit:dead" else self.items
+        target.extend(v if isinstance(v, bytes) else v.encode() for v in values)
+
+    def lrange(self, key, start, end):
+        return self.items[start:end + 1]
+
+    def ltrim(self, key, start, end):
+        self.items = self.items[start:]
+
+    def llen(self, key):
+        return len(self.dead if key == "audit:dead" else self.items)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return False
+        self.values[key] = str(value).encode()
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def expire(self, key, seconds):
+        return key in self.values
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def pipeline(self):
+        return _FakeWatchPipeline(self)
+
+
+class _FakeWatchPipeline:
+    """WATCH / MULTI / EXEC over _FakeList: execute() fails if the watched key changed."""
+
+    def __init__(self, conn):
+        self.conn, self.ops, self.watched = conn, [], {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, key):
+        self.watched[key] = self.conn.get(key)
+
+    def get(self, key):
+        return self.conn.get(key)
+
+    def multi(self):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args: self.ops.append((name, args))
+
+    def execute(self):
+        from redis.exceptions import WatchError
+        if any(self.conn.get(key) != value for key, value in self.watched.items()):
+            raise WatchError()
+        for name, args in self.ops:
+            getattr(self.conn, name)(*args)
+
+
+@pytest.mark.django_db
+class TestAuditBuffer:
+
+    def _log(self, user):
+        from booking.models_audit import AuditLog
+        return AuditLog.log(
+            user=user,
+            action=AuditLog.Action.DESK_LOCKED,
+            target_type="desk",
+            target_id=1,
+            target_snapshot={"desk_id": 1},
+        )
+
+    def test_log_is_buffered_until_flush(self, user, settings, django_capture_on_commit_callbacks):
+        from booking.models_audit import AuditLog
+        from booking.tasks import flush_audit_log
+        settings.AUDIT_LOG_ASYNC = True
+        fake = _FakeList()
+
+        with patch("booking.services.audit_buffer.get_redis_connection", return_value=fake):
+            with django_capture_on_commit_callbacks(execute=True):
+                assert self._log(user) is None
+                self._log(user)
+            assert AuditLog.objects.count() == 0
+            assert len(fake.items) == 2
+
+            flush_audit_log()
+
+        assert fake.items == []
+        entries = AuditLog.objects.all()
+        assert entries.count() == 2
+        assert all(e.user_id == user.id and e.target_snapshot == {"desk_id": 1} for e in entries)
+
+    def test_flushed_rows_keep_event_timestamp(self, user, settings, django_capture_on_commit_callbacks):
+        from booking.models_audit import AuditLog
+        from booking.services.audit_buffer import flush
+        settings.AUDIT_LOG_ASYNC = True
+        fake = _FakeList()
+
+        with patch("booking.services.audit_buffer.get_redis_connection", return_value=fake):
+            with django_capture_on_commit_callbacks(execute=True):
+                self._log(user)
+            logged_before = timezone.now()
+            with patch("django.utils.timezone.now", return_value=future(5)):
+                assert flush() == 1
+
+        assert AuditLog.objects.get().timestamp <= logged_before
+
+    def _buffer(self, user, count, django_capture_on_commit_callbacks):
+        fake = _FakeList()
+        with patch("booking.services.audit_buffer.get_redis_connection", return_value=fake):
+            with django_capture_on_commit_callbacks(execute=True):
+                for _ in range(count):
+                    self._log(user)
+        return fake
+
+    def test_poison_entries_move_to_dead_letter(self, user, settings, django_capture_on_commit_callbacks):
+        from booking.models_audit import AuditLog
+        from booking.services.audit_buffer import flush
+        settings.AUDIT_LOG_ASYNC = True
+        fake = self._buffer(user, 2, django_capture_on_commit_callbacks)
+        fake.items.insert(1, b"{not json")
+        fake.items.insert(2, b'{"action": "desk_locked", "no_such_field": 1, "timestamp": "2026-01-01T00:00:00Z"}')
+
+        with patch("booking.services.audit_buffer.get_redis_connection", return_value=fake):
+            assert flush() == 2
+            assert flush() == 0
+
+        assert AuditLog.objects.count() == 2
+        assert fake.items == []
+        assert len(fake.dead) == 2
+        assert "audit:flush_lock" not in fake.values
+
+    def test_flusher_that_lost_its_lock_does_not_trim(self, user, settings, django_capture_on_commit_callbacks):
+        from booking.services import audit_buffer
+        settings.AUDIT_LOG_ASYNC = True
+        fake = self._buffer(user, 3, django_capture_on_commit_callbacks)
+        write = audit_buffer._write
+
+        def slow_write(rows):
+            # The lock expires during the write and another flusher takes it
+            fake.values[audit_buffer.FLUSH_LOCK_KEY] = b"other-flusher"
+            return write(rows)
+
+        with patch("booking.services.audit_buffer.get_redis_connection", return_value=fake), \
+                patch("booking.services.audit_buffer._write", side_effect=slow_write):
+            assert audit_buffer.flush(batch_size=2) == 0
+
+        assert len(fake.items) == 3  # left for the current holder
+        assert fake.values[audit_buffer.FLUSH_LOCK_KEY] == b"other-flusher"  # not released by us
+
+    def test_flush_stops_when_budget_is_spent(self, user, settings, django_capture_on_commit_callbacks):
+        from booking.models_audit import AuditLog
+        from booking.services.audit_buffer import flush
+        settings.AUDIT_LOG_ASYNC = True
+        fake = self._buffer(user, 5, django_capture_on_commit_callbacks)
+
+        with patch("booking.services.audit_buffer.get_redis_connection", return_value=fake), \
+                patch("booking.services.audit_buffer.time") as clock:
+            clock.monotonic.side_effect = [0, 0, 10, 20]  # start, then one check per batch
+            assert flush(batch_size=2, budget_s=15) == 4
+
+        assert AuditLog.objects.count() == 4
+        assert len(fake.items) == 1
+
+    def test_redis_failure_falls_back_to_direct_insert(self, user, settings, django_capture_on_commit_callbacks):
+        from booking.models_audit import AuditLog
+        settings.AUDIT_LOG_ASYNC = True
+
+        with patch("booking.services.audit_buffer.get_redis_connection", side_effect=ConnectionError):
+            with django_capture_on_commit_callbacks(execute=True):
+                self._log(user)
+
+        assert AuditLog.objects.count() == 1
+
+
+# ─── Audit retention ──────────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestAuditArchive:
+
+    def _log_at(self, user, when, desk_id=1):
+        from booking.models_audit import AuditLog
+        entry = AuditLog.log(
+            user=user,
+            action=AuditLog.Action.DESK_LOCKED,
+            target_type="desk",
+            target_id=desk_id,
+            target_snapshot={"desk_id": desk_id},
+        )
+        AuditLog.objects.filter(pk=entry.pk).update(timestamp=when)
+        entry.timestamp = when
+        return entry
+
+    @pytest.fixture(autouse=True)
+    def archive_dir(self, settings, tmp_path):
+        settings.AUDIT_ARCHIVE_DIR = str(tmp_path)
+        settings.AUDIT_LOG_HOT_MONTHS = 2
+        return tmp_path
+
+    def test_old_months_are_moved_to_compressed_files(self, user):
+        from booking.models_audit import AuditLog
+        from booking.services import audit_archive
+        from booking.tasks import archive_audit_log
+        now = timezone.now()
+        kept = self._log_at(user, now)
+        old = self._log_at(user, now - timedelta(days=100))
+
+        result = archive_audit_log()
+
+        assert "Archived 1 audit entries from 1 months" in result
+        assert list(AuditLog.objects.values_list("id", flat=True)) == [kept.id]
+        (month,) = audit_archive.archived_months()
+        rows = list(audit_archive.read_month(month))
+        assert [r["id"] for r in rows] == [old.id]
+        assert rows[0]["target_snapshot"] == {"desk_id": 1}
+
+    def test_second_run_appends_to_existing_month(self, user):
+        from booking.services import audit_archive
+        from booking.services.audit_partitions import archive_expired
+        old = timezone.now() - timedelta(days=100)
+        first = self._log_at(user, old)
+        archive_expired()
+        late = self._log_at(user, old + timedelta(minutes=1))
+        archive_expired()
+
+        (month,) = audit_archive.archived_months()
+        assert {r["id"] for r in audit_archive.read_month(month)} == {first.id, late.id}
+
+    def test_partition_maintenance_is_noop_on_plain_table(self):
+        from booking.tasks import maintain_audit_partitions
+        assert maintain_audit_partitions() == "Created 0 audit partitions."
+
+    def test_convert_partitions_table_and_archive_drops_partition(self, user):
+        from django.db import connection
+        from booking.models_audit import AuditLog
+        from booking.services import audit_partitions
+        if connection.vendor != "postgresql":
+            pytest.skip("range partitioning is PostgreSQL-only")
+
+        old = self._log_at(user, timezone.now() - timedelta(days=100))
+        assert audit_partitions.convert() is True
+        assert audit_partitions.is_partitioned()
+        assert audit_partitions.partition_name(timezone.now()) in audit_partitions.existing_partitions()
+
+        # Rows and id sequence survive the conversion
+        recent = self._log_at(user, timezone.now())
+        assert recent.id > old.id
+        assert AuditLog.objects.count() == 2
+
+        archived = audit_partitions.archive_expired()
+        assert sum(archived.values()) == 1
+        assert list(AuditLog.objects.values_list("id", flat=True)) == [recent.id]
+        old_partition = audit_partitions.partition_name(old.timestamp)
+        assert old_partition not in audit_partitions.existing_partitions()
+
+        # Rows beyond the pre-created months land in the default partition
+        # until maintenance gives them their own
+        far = self._log_at(user, timezone.now() + timedelta(days=400))
+        created = audit_partitions.ensure_partitions()
+        assert audit_partitions.partition_name(far.timestamp) in created
+        assert AuditLog.objects.filter(pk=far.pk).exists()
+
+    def test_archive_detaches_before_export_and_resumes_after_a_crash(self, user):
+        from django.db import connection
+        from booking.models_audit import AuditLog
+        from booking.services import audit_archive, audit_partitions
+        if connection.vendor != "postgresql":
+            pytest.skip("range partitioning is PostgreSQL-only")
+
+        old = self._log_at(user, timezone.now() - timedelta(days=100))
+        audit_partitions.convert()
+        month = audit_partitions.partition_name(old.timestamp)
+        late = []
+
+        def crash(*args):
+            # Flushed while the month is being exported: must not be dropped with it
+            late.append(self._log_at(user, old.timestamp + timedelta(minutes=1)))
+            raise OSError("disk full")
+
+        with patch.object(audit_archive, "write_month", side_effect=crash), pytest.raises(OSError):
+            audit_partitions.archive_expired()
+        assert month not in audit_partitions.existing_partitions()
+        assert audit_partitions.detached_partitions() == {month}
+        assert AuditLog.objects.filter(pk=late[0].pk).exists()
+
+        assert sum(audit_partitions.archive_expired().values()) == 1
+        assert audit_partitions.detached_partitions() == set()
+
+        # The late entry waits in the default partition until maintenance gives it its month back
+        assert month in audit_partitions.ensure_partitions()
+        audit_partitions.archive_expired()
+        month_start = audit_archive.month_start(old.timestamp)
+        assert {r["id"] for r in audit_archive.read_month(month_start)} == {old.id, late[0].id}
+        assert not AuditLog.objects.exists()
+
+
+# ─── Occupancy rollups ────────────────────────────────────────────────────────
+
+class _FakeSet:
+    """Just enough of a Redis connection for the occupancy dirty set."""
+
+    def __init__(self):
+        self.members = set()
+
+    def sadd(self, key, *values):
+        self.members.update(v.encode() for v in values)
+
+    def spop(self, key, count):
+        popped = [self.members.pop() for _ in range(min(count, len(self.members)))]
+        return popped
+
+
+@pytest.mark.django_db
+class TestOccupancyRollups:
+
+    @pytest.fixture(autouse=True)
+    def working_window(self, settings):
+        # Every weekday is a workday here, so relative test days never fall on a weekend
+        settings.OCCUPANCY_WORKDAYS = [0, 1, 2, 3, 4, 5, 6]
+        settings.OCCUPANCY_DAY_START = "08:00"
+        settings.OCCUPANCY_HOURS_PER_DAY = 10
+
+    def _day(self, offset=1):
+        return (timezone.now() + timedelta(days=offset)).date()
+
+    def _at(self, day, hour, minute=0):
+        return datetime(day.year, day.month, day.day, hour, minute, tzinfo=dt_tz.utc)
+
+    def test_recompute_sums_clipped_minutes_and_peak(self, desk, desk2, room, user):
+        from booking.models_occupancy import DeskDayOccupancy, RoomDayOccupancy
+        from booking.services import occupancy
+        day = self._day()
+        # Overnight booking: counted for `day` but outside its 08:00-18:00 window
+        _bk(user, desk, self._at(day, 0) - timedelta(hours=2), self._at(day, 2))
+        _bk(user, desk, self._at(day, 7), self._at(day, 12))
+        _bk(user, desk2, self._at(day, 10), self._at(day, 11))
+        occupancy.recompute({(desk.id, day), (desk2.id, day)})
+
+        cell = DeskDayOccupancy.objects.get(desk=desk, date=day)
+        assert (cell.booked_minutes, cell.bookings) == (240, 2)
+        room_day = RoomDayOccupancy.objects.get(room=room, date=day)
+        assert room_day.booked_minutes == 300
+        assert room_day.peak_concurrent == 2
+
+    def test_utilization_never_exceeds_one(self, desk, room, user, settings):
+        import datetime as dt
+        from booking.services import occupancy
+        settings.OCCUPANCY_WORKDAYS = [0, 1, 2, 3, 4]
+        monday, saturday = dt.date(2026, 3, 2), dt.date(2026, 3, 7)
+        _bk(user, desk, self._at(monday, 0), self._at(monday, 0) + timedelta(days=1))
+        _bk(user, desk, self._at(saturday, 9), self._at(saturday, 17))
+        occupancy.recompute({(desk.id, monday), (desk.id, saturday)})
+
+        day = occupancy.room_utilization(room, monday, monday)
+        assert day["totals"]["booked_hours"] == 10.0
+        assert day["totals"]["utilization"] == 1.0
+        assert day["desks"][0]["utilization"] == 1.0
+
+        weekend = occupancy.room_utilization(room, saturday, saturday + timedelta(days=1))
+        assert weekend["totals"]["booked_hours"] == 0
+        assert weekend["totals"]["available_hours"] == 0
+        assert weekend["totals"]["bookings"] == 1
+
+    def test_booking_api_marks_cells_dirty_and_task_refreshes_them(
+        self, auth_client, desk, room, location, user, django_capture_on_commit_callbacks
+    ):
+        from booking.models import UserGroup
+        from booking.models_occupancy import DeskDayOccupancy
+        from booking.tasks import refresh_occupancy_rollups
+        group = UserGroup.objects.create(name="G", location=location, created_by=user)
+        group.members.add(user)
+        room.allowed_groups.add(group)
+        day = self._day(2)
+        fake = _FakeSet()
+
+        with patch("booking.services.occupancy.get_redis_connection", return_value=fake):
+            with django_capture_on_commit_callbacks(execute=True):
+                resp = auth_client.post("/api/bookings/", {
+                    "desk_id": desk.id,
+                    "start_time": self._at(day, 9).isoformat(),
+                    "end_time": self._at(day, 11).isoformat(),
+                }, format="json")
+            assert resp.status_code == 201
+            assert fake.members == {f"{desk.id}:{room.id}:{day.isoformat()}".encode()}
+
+            assert refresh_occupancy_rollups() == "Recomputed 1 occupancy cells."
+
+        assert DeskDayOccupancy.objects.get(desk=desk, date=day).booked_minutes == 120
+        assert fake.members == set()
+
+    def _refresh_after(self, client, method, url, capture, **kwargs):
+        from booking.services import occupancy
+        fake = _FakeSet()
+        with patch("booking.services.occupancy.get_redis_connection", return_value=fake), \
+             patch("booking.services.room_availability.get_redis_connection"), \
+             patch("booking.services.outbox.get_channel_layer"), patch("booking.services.outbox.async_to_sync"):
+            with capture(execute=True):
+                resp = getattr(client, method)(url, format="json", **kwargs)
+            occupancy.refresh_dirty()
+        return resp
+
+    def test_deleted_desk_clears_its_room_days(
+        self, admin_client, desk, desk2, room, user, django_capture_on_commit_callbacks
+    ):
+        from booking.models_occupancy import RoomDayOccupancy
+        from booking.services import occupancy
+        day = self._day()
+        _bk(user, desk, self._at(day, 9), self._at(day, 11))
+        _bk(user, desk2, self._at(day, 9), self._at(day, 10))
+        occupancy.recompute({(desk.id, day), (desk2.id, day)})
+
+        resp = self._refresh_after(admin_client, "delete", f"/api/desks/{desk.id}/", django_capture_on_commit_callbacks)
+        assert resp.status_code == 204
+        room_day = RoomDayOccupancy.objects.get(room=room, date=day)
+        assert (room_day.booked_minutes, room_day.bookings, room_day.peak_concurrent) == (60, 1, 1)
+
+    def test_moved_desk_moves_its_room_days(
+        self, admin_client, desk, floor, room, user, django_capture_on_commit_callbacks
+    ):
+        from booking.models import Room
+        from booking.models_occupancy import DeskDayOccupancy, RoomDayOccupancy
+        from booking.services import occupancy
+        other = Room.objects.create(name="Other", floor=floor)
+        day = self._day()
+        _bk(user, desk, self._at(day, 9), self._at(day, 11))
+        occupancy.recompute({(desk.id, day)})
+
+        resp = self._refresh_after(
+            admin_client, "patch", f"/api/desks/{desk.id}/", django_capture_on_commit_callbacks, data={"room": other.id}
+        )
+        assert resp.status_code == 200
+        assert DeskDayOccupancy.objects.get(desk=desk, date=day).room_id == other.id
+        assert not RoomDayOccupancy.objects.filter(room=room).exists()
+        assert RoomDayOccupancy.objects.get(room=other, date=day).booked_minutes == 120
+
+    def test_repair_backfills_and_clears_stale_rows(self, desk, room, user):
+        from booking.models_occupancy import DeskDayOccupancy, RoomDayOccupancy
+        from booking.tasks import repair_occupancy_rollups
+        day = self._day()
+        _bk(user, desk, self._at(day, 9), self._at(day, 10))
+        repair_occupancy_rollups(days_back=1, days_ahead=2)
+        assert DeskDayOccupancy.objects.get(desk=desk, date=day).booked_minutes == 60
+
+        Booking.objects.all().delete()
+        repair_occupancy_rollups(days_back=1, days_ahead=2)
+        assert not DeskDayOccupancy.objects.exists()
+        assert not RoomDayOccupancy.objects.exists()
+
+
+# ─── Transactional outbox ─────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def _grant(self, user, room, location):
+        from booking.models import UserGroup
+        group = UserGroup.objects.create(name="G", location=location, created_by=user)
+        group.members.add(user)
+        room.allowed_groups.add(group)
+
+    def _post(self, client, desk, start, end):
+        return client.post("/api/bookings/", {
+            "desk_id": desk.id, "start_time": start.isoformat(), "end_time": end.isoformat(),
+        }, format="json")
+
+    def test_booking_write_queues_events_until_commit(self, auth_client, desk, room, location, user):
+        from booking.models import OutboxEvent
+        self._grant(user, room, location)
+        with patch("booking.services.outbox.get_channel_layer") as layer:
+            assert self._post(auth_client, desk, future(1), future(2)).status_code == 201
+        # Still inside the test transaction: stored, nothing published yet
+        layer.assert_not_called()
+        assert list(OutboxEvent.objects.values_list("target", "payload__type")) == [
+            (f"room_{room.id}", "desk_status"), (f"room_{room.id}", "update_bookings"),
+        ]
+
+    def test_rolled_back_write_sends_nothing(self, auth_client, desk, room, location, user):
+        from booking.models import OutboxEvent
+        self._grant(user, room, location)
+        _bk(user, desk, future(1), future(3))
+        assert self._post(auth_client, desk, future(2), future(4)).status_code == 400
+        assert not OutboxEvent.objects.exists()
+
+    def test_rolled_back_block_drops_its_pending_ids(self, django_capture_on_commit_callbacks):
+        from django.db import transaction
+        from booking.models import OutboxEvent
+        from booking.services import outbox
+        with patch("booking.services.outbox.relay") as relay:
+            with django_capture_on_commit_callbacks(execute=True):
+                with pytest.raises(RuntimeError), transaction.atomic():
+                    outbox.broadcast("room_1", {"type": "desk_status", "desk_id": 1})
+                    raise RuntimeError
+                outbox.broadcast("room_1", {"type": "desk_status", "desk_id": 2})
+        relay.assert_called_once_with([OutboxEvent.objects.get().id])
+
+    def test_relay_batches_per_group_after_commit(self, django_capture_on_commit_callbacks):
+        from booking.models import OutboxEvent
+        from booking.services import outbox
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync") as mock_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                for desk_id in (1, 2, 3):
+                    outbox.broadcast("room_1", {"type": "desk_status", "desk_id": desk_id})
+                outbox.broadcast("location_1", {"type": "room_availability", "room_id": 1})
+                mock_async.assert_not_called()
+
+        sends = {c.args[0]: c.args[1] for c in mock_async.return_value.call_args_list}
+        assert sends["room_1"]["type"] == "outbox.batch"
+        assert [e["desk_id"] for e in sends["room_1"]["events"]] == [1, 2, 3]
+        assert sends["location_1"] == {"type": "room_availability", "room_id": 1}
+        assert not OutboxEvent.objects.exists()
+
+    def test_failed_publish_is_retried_by_sweeper(self):
+        from booking.models import OutboxEvent
+        from booking.services import outbox
+        from booking.tasks import relay_outbox
+        outbox.broadcast("room_1", {"type": "desk_lock", "desk_id": 1, "locked": False})
+        event = OutboxEvent.objects.get()
+
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync") as mock_async:
+            mock_async.return_value.side_effect = ConnectionError("redis down")
+            assert outbox.relay([event.id]) == 0
+            event.refresh_from_db()
+            assert event.attempts == 1
+
+            # Too recent for the sweeper, then picked up once past the grace period
+            mock_async.return_value.side_effect = None
+            assert relay_outbox() == "Relayed 0 outbox events."
+            OutboxEvent.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+            assert relay_outbox() == "Relayed 1 outbox events."
+        assert not OutboxEvent.objects.exists()
+
+    def test_enqueue_task_sends_after_commit(self, django_capture_on_commit_callbacks):
+        from booking.services import outbox
+        with patch("booking.services.outbox.current_app") as app:
+            with django_capture_on_commit_callbacks(execute=True):
+                outbox.enqueue_task("booking.email_notifications.send_booking_confirmation", booking_id=7)
+                app.send_task.assert_not_called()
+        app.send_task.assert_called_once_with(
+            "booking.email_notifications.send_booking_confirmation", kwargs={"booking_id": 7}
+        )
+
+    def test_consumer_unpacks_batches(self):
+        from asgiref.sync import async_to_sync
+        from booking.consumers import RoomConsumer
+        consumer = RoomConsumer()
+        sent = []
+
+        async def send(text_data):
+            sent.append(json.loads(text_data))
+        consumer.send = send
+        async_to_sync(consumer.outbox_batch)({"type": "outbox.batch", "events": [
+            {"type": "desk_lock", "desk_id": 1, "locked": True, "by": "a"},
+            {"type": "desk_status", "desk_id": 2, "is_booked": True, "booked_by": "b"},
+        ]})
+        assert [m["type"] for m in sent] == ["desk_lock", "desk_status"]
+
+
+# ─── Model-change event bus ───────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestEventBus:
+
+    def _grant(self, user, room, location):
+        from booking.models import UserGroup
+        group = UserGroup.objects.create(name="G", location=location, created_by=user)
+        group.members.add(user)
+        room.allowed_groups.add(group)
+
+    def test_bulk_create_emits_one_event_per_batch(self, auth_client, desk, room, location, user):
+        from booking import events
+        from booking.models import OutboxEvent
+        from booking.models_changes import BookingChange
+        self._grant(user, room, location)
+        intervals = [
+            {"start_time": future(24 * d).isoformat(), "end_time": future(24 * d + 1).isoformat()}
+            for d in range(1, 8)
+        ]
+        with patch("booking.events.emit", wraps=events.emit) as emit:
+            resp = auth_client.post("/api/bookings/bulk_create/", {
+                "desk_id": desk.id, "intervals": intervals, "atomic": True,
+            }, format="json")
+        assert resp.status_code == 201
+
+        emitted = [c.args[0] for c in emit.call_args_list]
+        assert [type(e) for e in emitted] == [events.DeskStateChanged, events.BookingsChanged]
+        assert len(emitted[1].upserted) == 7 and len(emitted[1].intervals) == 7
+        # Subscribers ran in the transaction: one broadcast, seven change-feed rows
+        updates = OutboxEvent.objects.filter(payload__type="update_bookings")
+        assert updates.count() == 1 and len(updates.get().payload["bookings"]) == 7
+        assert BookingChange.objects.filter(desk_id=desk.id).count() == 7
+
+    def test_on_commit_subscribers_wait_for_commit(self, desk, user, django_capture_on_commit_callbacks):
+        from booking import events
+        event = events.BookingsChanged(desk_id=desk.id, room_id=desk.room_id, upserted=((1, user.id),), actor_id=99)
+        with patch("booking.subscribers.booking_stats.invalidate") as invalidate, \
+             patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync"):
+            with django_capture_on_commit_callbacks(execute=True):
+                events.emit(event)
+                invalidate.assert_not_called()
+        invalidate.assert_called_once()
+        assert set(invalidate.call_args.args) == {user.id, 99}
+
+    def test_task_state_flip_emits_desk_state(self, desk, user):
+        from booking.models import OutboxEvent
+        from booking.tasks import startup_sync_desks
+        _bk(user, desk, past(1), future(3))
+        startup_sync_desks()
+        event = OutboxEvent.objects.get()
+        assert event.target == f"room_{desk.room_id}"
+        assert event.payload == {
+            "type": "desk_status", "desk_id": desk.id, "is_booked": True, "booked_by": user.username,
+        }
+
+    def test_maintenance_reaches_room_and_location(self, api_client, room, user):
+        from booking.models import OutboxEvent
+        room.room_managers.add(user)
+        api_client.force_authenticate(user=user)
+        assert api_client.post(f"/api/admin/rooms/{room.id}/set-maintenance/").status_code == 200
+        assert set(OutboxEvent.objects.values_list("target", flat=True)) == {
+            f"room_{room.id}", f"location_{room.location_id}",
+        }
+
+
+# ─── Room availability counters ───────────────────────────────────────────────
+
+class _FakeHash:
+    """Just enough of a Redis connection for the room availability hash."""
+
+    def __init__(self):
+        self.data = {}
+
+    def hmget(self, key, fields):
+        return [self.data.get(str(f)) for f in fields]
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        for f, v in ({field: value} if mapping is None else mapping).items():
+            self.data[str(f)] = str(v).encode()
+
+    def hexists(self, key, field):
+        return str(field) in self.data
+
+    def hincrby(self, key, field, amount):
+        value = int(self.data[str(field)]) + amount
+        self.data[str(field)] = str(value).encode()
+        return value
+
+    def hdel(self, key, *fields):
+        for f in fields:
+            self.data.pop(str(f), None)
+
+    def hgetall(self, key):
+        return {f.encode(): v for f, v in self.data.items()}
+
+
+@pytest.mark.django_db
+class TestRoomAvailability:
+
+    @pytest.fixture
+    def fake(self):
+        fake = _FakeHash()
+        with patch("booking.services.room_availability.get_redis_connection", return_value=fake):
+            yield fake
+
+    def _announced(self, mock_async, group):
+        return [c.args[1] for c in mock_async.return_value.call_args_list if c.args[0] == group]
+
+    def test_counts_cached_after_first_read(self, fake, room, desk, desk2, django_assert_num_queries):
+        from booking.services import room_availability
+        Desk.objects.filter(pk=desk2.pk).update(is_booked=True)
+        assert room_availability.counts([room.id]) == {room.id: 1}
+        with django_assert_num_queries(0):
+            assert room_availability.counts([room.id]) == {room.id: 1}
+
+    def test_room_list_reads_counters(self, fake, auth_client, room, desk):
+        fake.hset("room_availability", room.id, 7)
+        resp = auth_client.get("/api/rooms/?fields=id,available_desk_count")
+        assert resp.data == [{"id": room.id, "available_desk_count": 7}]
+
+    def test_booking_start_decrements_and_announces(
+        self, fake, room, desk, desk2, user, django_capture_on_commit_callbacks
+    ):
+        from booking.tasks import expire_and_activate_bookings
+        fake.hset("room_availability", room.id, 2)
+        _bk(user, desk, past(1/120), future(3))
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync") as mock_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                expire_and_activate_bookings()
+        assert fake.data[str(room.id)] == b"1"
+        assert self._announced(mock_async, f"location_{room.location_id}") == [
+            {"type": "room_availability", "room_id": room.id, "available_desk_count": 1},
+        ]
+
+    def test_unchanged_state_leaves_counter_alone(
+        self, fake, auth_client, room, desk, user, django_capture_on_commit_callbacks
+    ):
+        from booking.models import UserGroup
+        group = UserGroup.objects.create(name="G", location=room.location, created_by=user)
+        group.members.add(user)
+        room.allowed_groups.add(group)
+        fake.hset("room_availability", room.id, 1)
+        # A future booking does not make the desk busy now
+        with patch("booking.services.outbox.get_channel_layer"), patch("booking.services.outbox.async_to_sync"):
+            with django_capture_on_commit_callbacks(execute=True):
+                auth_client.post("/api/bookings/", {
+                    "desk_id": desk.id, "start_time": future(5).isoformat(), "end_time": future(6).isoformat(),
+                }, format="json")
+        assert fake.data[str(room.id)] == b"1"
+
+    def test_permanent_assignment_takes_desk(self, fake, admin_client, room, desk, user, django_capture_on_commit_callbacks):
+        fake.hset("room_availability", room.id, 1)
+        with patch("booking.services.outbox.get_channel_layer"), patch("booking.services.outbox.async_to_sync"):
+            with django_capture_on_commit_callbacks(execute=True):
+                resp = admin_client.post(f"/api/desks/{desk.id}/assign-permanent/", {"user_id": user.id}, format="json")
+        assert resp.status_code == 200
+        assert fake.data[str(room.id)] == b"0"
+
+    def test_patch_permanent_takes_desk(self, fake, admin_client, room, desk, user, django_capture_on_commit_callbacks):
+        fake.hset("room_availability", room.id, 1)
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync") as mock_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                resp = admin_client.patch(f"/api/desks/{desk.id}/", {
+                    "is_permanent": True, "permanent_assignee": user.id,
+                }, format="json")
+        assert resp.status_code == 200
+        assert fake.data[str(room.id)] == b"0"
+        assert self._announced(mock_async, f"room_{room.id}")[0]["type"] == "desk_status"
+
+    def test_patch_room_recounts_both_rooms(self, fake, admin_client, floor, room, desk, django_capture_on_commit_callbacks):
+        from booking.models import Room
+        other = Room.objects.create(name="Other", floor=floor)
+        fake.hset("room_availability", mapping={room.id: 1, other.id: 0})
+        with patch("booking.services.outbox.get_channel_layer"), patch("booking.services.outbox.async_to_sync"):
+            with django_capture_on_commit_callbacks(execute=True):
+                resp = admin_client.patch(f"/api/desks/{desk.id}/", {"room": other.id}, format="json")
+        assert resp.status_code == 200
+        assert fake.data == {}
+
+    def test_reconcile_fixes_drift(self, fake, room, desk, desk2, django_capture_on_commit_callbacks):
+        from booking.tasks import reconcile_room_availability
+        fake.hset("room_availability", mapping={room.id: 5, 999999: 3})
+        with patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync") as mock_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                assert reconcile_room_availability() == "Corrected 1 room availability counters."
+        assert fake.data == {str(room.id): b"2"}
+        assert self._announced(mock_async, f"location_{room.location_id}")[0]["available_desk_count"] == 2
+
+
+# ─── Task queues ──────────────────────────────────────────────────────────────
+
+class _FakeKV:
+    """Just enough of a Redis connection for task_guard locks and latency samples."""
+
+    def __init__(self):
+        self.data = {}
+        self.lists = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value).encode()
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, conn):
+        self.conn, self.ops = conn, []
+
+    def lpush(self, key, value):
+        self.ops.append(lambda: self.conn.lists.setdefault(key, []).insert(0, str(value).encode()))
+
+    def ltrim(self, key, start, end):
+        self.ops.append(lambda: self.conn.lists.__setitem__(key, self.conn.lists[key][start:end + 1]))
+
+    def execute(self):
+        for op in self.ops:
+            op()
+
+
+class TestTaskQueues:
+
+    @pytest.mark.parametrize("task,queue", [
+        ("booking.tasks.expire_and_activate_bookings", "realtime"),
+        ("booking.tasks.relay_outbox", "realtime"),
+        ("booking.email_notifications.send_booking_confirmation", "notifications"),
+        ("booking.tasks.cleanup_expired_tokens", "maintenance"),
+        ("booking.tasks.archive_audit_log", "maintenance"),
+    ])
+    def test_routing(self, task, queue):
+        from booking_project.celery import app
+        assert app.amqp.router.route({}, task)["queue"].name == queue
+
+    def test_latency_samples(self):
+        import time
+        from booking.services import queue_metrics
+        fake = _FakeKV()
+        with patch("booking.services.queue_metrics.get_redis_connection", return_value=fake):
+            queue_metrics.record("realtime", time.time() - 0.2)
+            queue_metrics.record("realtime", time.time() - 0.4)
+            stats = queue_metrics.latency("realtime")
+            assert queue_metrics.latency("maintenance")["samples"] == 0
+        assert stats["samples"] == 2
+        assert 190 <= stats["p50_ms"] <= stats["max_ms"] < 1000
+
+    def test_latency_samples_capped(self):
+        from booking.services import queue_metrics
+        fake = _FakeKV()
+        with patch("booking.services.queue_metrics.get_redis_connection", return_value=fake), \
+             patch("booking.services.queue_metrics.SAMPLES", 3):
+            for _ in range(5):
+                queue_metrics.record("realtime", 0)
+        assert len(fake.lists["celery:latency:realtime"]) == 3
+
+
+@pytest.mark.django_db
+class TestSingleFlight:
+
+    @pytest.fixture
+    def fake(self):
+        fake = _FakeKV()
+        with patch("booking.services.task_guard.get_redis_connection", return_value=fake):
+            yield fake
+
+    @pytest.fixture(autouse=True)
+    def no_watermark(self):
+        from django.core.cache import cache
+        from booking.tasks import TRANSITIONS_WATERMARK_KEY
+        cache.delete(TRANSITIONS_WATERMARK_KEY)
+        yield
+        cache.delete(TRANSITIONS_WATERMARK_KEY)
+
+    def test_overlapping_run_skipped(self, fake, desk, user):
+        from booking.services.task_guard import SKIPPED
+        from booking.tasks import expire_and_activate_bookings
+        _bk(user, desk, past(1/120), future(3))
+        fake.set("task_lock:desk_state", "other-run")
+        assert expire_and_activate_bookings() == SKIPPED
+        desk.refresh_from_db()
+        assert desk.is_booked is False
+
+    def test_lock_released_after_run(self, fake, desk):
+        from booking.tasks import expire_and_activate_bookings, startup_sync_desks
+        with patch("booking.services.outbox.get_channel_layer"), patch("booking.services.outbox.async_to_sync"):
+            expire_and_activate_bookings()
+            startup_sync_desks()
+        assert "task_lock:desk_state" not in fake.data
+
+    def test_skipped_tick_covered_by_next_run(self, fake, desk, user):
+        from django.core.cache import cache
+        from booking.tasks import TRANSITIONS_WATERMARK_KEY, expire_and_activate_bookings
+        # Previous run finished 5 minutes ago; the booking started in between
+        cache.set(TRANSITIONS_WATERMARK_KEY, past(5/60), None)
+        _bk(user, desk, past(3/60), future(3))
+        with patch("booking.services.outbox.get_channel_layer"), patch("booking.services.outbox.async_to_sync"):
+            expire_and_activate_bookings()
+        desk.refresh_from_db()
+        assert desk.is_booked is True
+        assert cache.get(TRANSITIONS_WATERMARK_KEY) > past(1/60)
+
+
+# ─── Booking emails ───────────────────────────────────────────────────────────
+
+def _grant_access(user, room, location):
+    from booking.models import UserGroup
+    group = UserGroup.objects.create(name="G", location=location, created_by=user)
+    group.members.add(user)
+    room.allowed_groups.add(group)
+
+
+@pytest.mark.django_db
+class TestBookingEmails:
+
+    @pytest.fixture(autouse=True)
+    def emails_on(self, settings):
+        settings.BOOKING_EMAILS_ENABLED = True
+        settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+        settings.EMAIL_DIGEST_THRESHOLD = 2
+
+    def _queued(self, client, url, payload, method="post", capture=None):
+        with patch("booking.services.outbox.current_app") as app, \
+             patch("booking.services.outbox.get_channel_layer"), \
+             patch("booking.services.outbox.async_to_sync"):
+            with capture(execute=True):
+                resp = getattr(client, method)(url, payload, format="json")
+        calls = [c for c in app.send_task.call_args_list
+                 if c.args[0] == "booking.email_notifications.send_booking_notifications"]
+        return resp, [c.kwargs["kwargs"] for c in calls]
+
+    def test_bulk_create_queues_one_task_after_commit(
+        self, auth_client, user, desk, room, location, django_capture_on_commit_callbacks
+    ):
+        _grant_access(user, room, location)
+        intervals = [{"start_time": future(24 * d).isoformat(), "end_time": future(24 * d + 1).isoformat()}
+                     for d in range(1, 4)]
+        resp, queued = self._queued(auth_client, "/api/bookings/bulk_create/",
+                                    {"desk_id": desk.id, "intervals": intervals},
+                                    capture=django_capture_on_commit_callbacks)
+        assert resp.status_code == 200
+        assert queued == [{"created": list(Booking.objects.filter(desk=desk).order_by("id").values_list("id", flat=True))}]
+
+    def test_cancel_queues_snapshot(self, admin_client, user, desk, django_capture_on_commit_callbacks):
+        booking = _bk(user, desk, future(2), future(3))
+        resp, queued = self._queued(admin_client, f"/api/bookings/{booking.id}/", None, method="delete",
+                                    capture=django_capture_on_commit_callbacks)
+        assert resp.status_code == 204
+        assert queued[0]["cancelled_by"] == "admin"
+        assert queued[0]["cancelled"][0]["user_email"] == user.email
+        assert queued[0]["cancelled"][0]["desk_name"] == desk.name
+
+    def test_bulk_operation_sends_one_digest(self, user, desk):
+        from django.core import mail
+        from booking.email_notifications import send_booking_notifications
+        ids = [_bk(user, desk, future(24 * d), future(24 * d + 1)).id for d in range(1, 61)]
+        send_booking_notifications(created=ids)
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].subject.startswith("60 Bookings Confirmed")
+        assert mail.outbox[0].to == [user.email]
+        assert mail.outbox[0].body.count(desk.name) == 60
+
+    def test_messages_share_one_connection(self, user, user2, desk, desk2):
+        from django.core import mail
+        from django.core.mail import get_connection
+        from booking.email_notifications import send_booking_notifications
+        ids = [_bk(user, desk, future(2), future(3)).id, _bk(user2, desk2, future(2), future(3)).id]
+        cancelled = [{"user_email": user2.email, "username": user2.username, "desk_name": "D9",
+                      "room_name": "R9", "start_time": "01 Jan 2030 09:00", "end_time": "01 Jan 2030 10:00"}]
+        with patch("booking.email_notifications.get_connection", wraps=get_connection) as conn:
+            send_booking_notifications(created=ids, cancelled=cancelled, cancelled_by="admin")
+        assert conn.call_count == 1
+        assert sorted(m.subject.split(" —")[0] for m in mail.outbox) == [
+            "Booking Cancelled", "Booking Confirmed", "Booking Confirmed",
+        ]
+        cancellation = next(m for m in mail.outbox if m.subject.startswith("Booking Cancelled"))
+        assert "cancelled by admin" in cancellation.body
+        assert cancellation.alternatives[0][1] == "text/html"
+
+    def test_partial_failure_retries_only_unsent_messages(self, user, user2, desk, desk2):
+        from django.core import mail
+        from django.core.mail.backends.locmem import EmailBackend
+        from booking.email_notifications import send_booking_notifications
+
+        class Flaky(EmailBackend):
+            def send_messages(self, messages):
+                if user2.email in messages[0].to:
+                    raise ConnectionResetError("SMTP session dropped")
+                return super().send_messages(messages)
+
+        ok, failed = _bk(user, desk, future(2), future(3)), _bk(user2, desk2, future(2), future(3))
+        cancelled = [{"user_email": user2.email, "username": user2.username, "desk_name": "D9",
+                      "room_name": "R9", "start_time": "01 Jan 2030 09:00", "end_time": "01 Jan 2030 10:00"}]
+        with patch("booking.email_notifications.get_connection", return_value=Flaky()), \
+             patch.object(send_booking_notifications, "retry", side_effect=RuntimeError("retry")) as retry:
+            with pytest.raises(RuntimeError):
+                send_booking_notifications(created=[ok.id, failed.id], cancelled=cancelled, cancelled_by="admin")
+        assert [m.to for m in mail.outbox] == [[user.email]]
+        assert retry.call_args.kwargs["kwargs"] == {
+            "created": [failed.id], "cancelled": cancelled, "cancelled_by": "admin",
+        }
+
+        mail.outbox.clear()
+        send_booking_notifications(**retry.call_args.kwargs["kwargs"])
+        assert sorted(m.subject.split(" —")[0] for m in mail.outbox) == ["Booking Cancelled", "Booking Confirmed"]
+        assert all(m.to == [user2.email] for m in mail.outbox)
+
+    def test_disabled_queues_nothing(self, settings, auth_client, user, desk, room, location,
+                                     django_capture_on_commit_callbacks):
+        settings.BOOKING_EMAILS_ENABLED = False
+        _grant_access(user, room, location)
+        resp, queued = self._queued(auth_client, "/api/bookings/",
+                                    {"desk_id": desk.id, "start_time": future(2).isoformat(),
+                                     "end_time": future(3).isoformat()},
+                                    capture=django_capture_on_commit_callbacks)
+        assert resp.status_code == 201
+        assert queued == []
+
+
+# ─── Booking reminders ────────────────────────────────────────────────────────
+
+@pytest.mark.django_db
+class TestBookingReminders:
+
+    @pytest.fixture(autouse=True)
+    def emails_on(self, settings):
+        settings.BOOKING_EMAILS_ENABLED = True
+        settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+        settings.REMINDER_LEAD_MINUTES = 60
+
+    def test_sweep_claims_due_bookings_in_batches(self, user, desk, desk2):
+        from booking.services import reminders
+        # Sweep as of a month ahead, clear of bookings other tests leave around now
+        now = future(24 * 30)
+        at = lambda hours: now + timedelta(hours=hours)
+        due = [_bk(user, desk, at(0.25 * i), at(0.25 * i + 0.1)).id for i in (1, 2, 3)]
+        later = _bk(user, desk2, at(5), at(6))
+        started = _bk(user, desk2, at(-1), at(1))
+        with patch("booking.services.outbox.enqueue_task") as enqueue:
+            assert reminders.sweep(now=now, batch_size=2) == 3
+            assert reminders.sweep(now=now, batch_size=2) == 0
+        assert [c.kwargs["booking_ids"] for c in enqueue.call_args_list] == [due[:2], due[2:]]
+        assert Booking.objects.filter(pk__in=due, reminded_at__isnull=False).count() == 3
+        assert Booking.objects.filter(pk__in=[later.id, started.id], reminded_at__isnull=True).count() == 2
+
+    def test_task_queues_through_outbox(self, user, desk, django_capture_on_commit_callbacks):
+        from booking.tasks import sweep_booking_reminders
+        booking = _bk(user, desk, future(0.5), future(1))
+        with patch("booking.services.outbox.current_app") as app:
+            with django_capture_on_commit_callbacks(execute=True):
+                assert sweep_booking_reminders().startswith("Queued reminders for ")
+        name, = {c.args[0] for c in app.send_task.call_args_list}
+        assert name == "booking.email_notifications.send_booking_reminders"
+        assert booking.id in app.send_task.call_args.kwargs["kwargs"]["booking_ids"]
+
+    def test_moved_booking_is_reminded_again(self, auth_client, user, desk):
+        booking = _bk(user, desk, future(0.5), future(1))
+        Booking.objects.filter(pk=booking.pk).update(reminded_at=timezone.now())
+        with patch("booking.services.outbox.get_channel_layer"), patch("booking.services.outbox.async_to_sync"):
+            resp = auth_client.patch(f"/api/bookings/{booking.id}/", {
+                "start_time": future(3).isoformat(), "end_time": future(4).isoformat(),
+            }, format="json")
+        assert resp.status_code == 200
+        booking.refresh_from_db()
+        assert booking.reminded_at is None
+
+    def test_send_skips_cancelled_and_started(self, user, user2, desk, desk2):
+        from django.core import mail
+        from booking.email_notifications import send_booking_reminders
+        ok = _bk(user, desk, future(0.5), future(1))
+        started = _bk(user2, desk2, past(0.1), future(1))
+        Booking.objects.filter(pk__in=[ok.id, started.id]).update(reminded_at=timezone.now())
+        send_booking_reminders(booking_ids=[ok.id, started.id, 999999])
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == [user.email]
+        assert mail.outbox[0].subject == "Reminder — Your desk booking starts in 30 minutes"
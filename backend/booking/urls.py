@@ -1,12 +1,13 @@
+import re
 from rest_framework import routers
 from django.conf import settings
-from django.conf.urls.static import static
-from .views import CookieTokenRefreshView,DeskViewSet,BookingViewSet,MeView,UserLoginView,UserLogoutView
-from django.urls import path,include
+from .views import CookieTokenRefreshView,DeskViewSet,BookingViewSet,MeView,BootstrapView,UserLoginView,UserLogoutView
+from django.urls import path, include, re_path
 from .views import CountryViewSet, LocationViewSet, FloorViewSet, RoomViewSet, DeskViewSet, BookingViewSet
 from .admin_views_module import UserGroupViewSet, LocationManagementViewSet, RoomManagementViewSet, UserSearchViewSet, UserPreferencesViewSet
 from .accounts.oauth_views import GoogleLoginView, GoogleCallbackView, LinkedAccountsView, DisconnectSocialAccountView, SetPasswordAfterOAuthView
 from .admin_views_module.audit_views import AuditLogViewSet
+from .media_views import serve_media
 
 router = routers.DefaultRouter()
 router.register(r'countries', CountryViewSet)
@@ -37,8 +38,13 @@ urlpatterns = [
     path('auth/disconnect/<str:provider>/', DisconnectSocialAccountView.as_view(), name='disconnect-social'),
     path('auth/set-password/', SetPasswordAfterOAuthView.as_view(), name='set-password'),
     
+    path('api/bootstrap/', BootstrapView.as_view(), name='bootstrap'),
     path('api/',include(router.urls)),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.SERVE_MEDIA:
+    # static() only works with DEBUG on; serve_media also sets cache headers
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.*)$', serve_media,
+                {'document_root': settings.MEDIA_ROOT}),
+    ]
\ No newline at end of file
@@ -15,43 +15,71 @@ from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.decorators import action
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 
+from booking import email_notifications, events
+from booking.services import booking_changes, booking_stats, bootstrap, occupancy, room_availability
 from booking.services.desk_lock import acquire_lock, read_lock, refresh_lock, release_lock
+from booking.services.export import stream_export
+from booking.services.intervals import days_touched, touches_days
+from .db_router import ReplicaReadsMixin
 from .models import Country, Location, Floor, Room, Desk, Booking
 
 from .serializers.accounts import LoginTokenObtainPairSerializer
 from .serializers.country import CountrySerializer
 from .serializers.desk import DeskSerializer
-from .serializers.booking import BookingSerializer
+from .serializers.booking import (
+    BookingSerializer, BookingCompactSerializer,
+    BOOKING_RELATED, BOOKING_COMPACT_RELATED, BOOKING_EXPORT_COLUMNS, compact_queryset,
+)
+from .serializers.dynamic_fields import DynamicFieldsViewSetMixin
 from .serializers.floor import FloorSerializer
 from .serializers.location import LocationSerializer
+from .serializers.querysets import annotate_location_counts, annotate_room_counts
 from .serializers.room import RoomSerializer, RoomListSerializer, RoomWithDesksSerializer
 
 import datetime
+import zoneinfo
+from collections import defaultdict
 from .models_audit import AuditLog
 
-class CountryViewSet(viewsets.ModelViewSet):
+
+def _desk_snapshot(desk, placed=None, with_floor=False, **extra):
+    """
+    Desk, room and location fields of an audit snapshot. Room and location come
+    from the denormalized FKs of placed (the desk itself or one of its bookings),
+    so load it with select_related('room', 'location'), plus 'room__floor' when
+    with_floor is set.
+    """
+    placed = placed or desk
+    location = placed.location if placed.location_id is not None else placed.room.get_location()
+    snapshot = {'desk': desk.name, 'desk_id': desk.id, 'room': placed.room.name, 'room_id': placed.room_id}
+    if with_floor:
+        snapshot.update(floor=placed.room.floor.name, floor_id=placed.room.floor_id)
+    return {**snapshot, 'location': location.name, 'location_id': location.id, **extra}
+
+class CountryViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     queryset = Country.objects.all()
     serializer_class = CountrySerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class LocationViewSet(viewsets.ModelViewSet):
+class LocationViewSet(ReplicaReadsMixin, DynamicFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['country']
 
-class FloorViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        return annotate_location_counts(self, super().get_queryset())
+
+class FloorViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     queryset = Floor.objects.all()
     serializer_class = FloorSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['location']
 
-class RoomViewSet(viewsets.ModelViewSet):
+class RoomViewSet(ReplicaReadsMixin, DynamicFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -61,8 +89,13 @@ class RoomViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'list':
             return RoomListSerializer
+        if self.action == 'desks':
+            return RoomWithDesksSerializer
         return RoomSerializer
 
+    def get_queryset(self):
+        return annotate_room_counts(self, super().get_queryset())
+
     @action(detail=True, methods=['get'])
     def desks(self, request, pk=None):
         room = self.get_object()
@@ -96,11 +129,11 @@ class RoomViewSet(viewsets.ModelViewSet):
 
         desks = Desk.objects.filter(room=room)
 
-        bookings = Booking.objects.filter(
-            desk__room=room,
-            start_time__date__lte=end_date,
-            end_time__date__gte=start_date
-        )
+        booked = defaultdict(set)
+        for desk_id, s, e in Booking.objects.filter(
+            touches_days(start_date, end_date), room=room
+        ).values_list('desk_id', 'start_time', 'end_time'):
+            booked[desk_id].update(days_touched(s, e, start_date, end_date))
 
         data = {
             "room_id":room.id,
@@ -114,12 +147,7 @@ class RoomViewSet(viewsets.ModelViewSet):
             daily_status = {}
             for i in range(days):
                 day = start_date + timedelta(days=i)
-                booked = bookings.filter(
-                    desk=desk,
-                    start_time__date__lte=day,
-                    end_time__date__gte=day
-                ).exists()
-                daily_status[str(day)] = not booked # True if available
+                daily_status[str(day)] = day not in booked[desk.id] # True if available
             data["desks"].append({
                 "desk_id": desk.id,
                 "desk_name":desk.name,
@@ -128,13 +156,53 @@ class RoomViewSet(viewsets.ModelViewSet):
         
         return Response(data)
     
-class DeskViewSet(viewsets.ModelViewSet):
+class DeskViewSet(ReplicaReadsMixin, DynamicFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Desk.objects.all()
     serializer_class = DeskSerializer
     permission_classes = [permissions.IsAuthenticated]  
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['room']
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        related = [
+            relation for relation, fields in (
+                ('room', ('room_name',)),
+                ('locked_by', ('locked_by',)),
+                ('booked_by', ('booked_by',)),
+                ('permanent_assignee', ('permanent_assignee_username', 'permanent_assignee_full_name')),
+            )
+            if self.field_requested(*fields)
+        ]
+        if self.action in ('assign_permanent', 'clear_permanent'):
+            related += ['room', 'location']  # audit snapshot
+        return qs.select_related(*related) if related else qs
+
+    def perform_create(self, serializer):
+        desk = serializer.save()
+        transaction.on_commit(lambda: room_availability.forget(desk.room_id))
+
+    def perform_update(self, serializer):
+        before = serializer.instance
+        was_available, old_room_id = before.is_available, before.room_id
+        old_permanent = (before.is_permanent, before.permanent_assignee_id)
+        desk = serializer.save()
+
+        if desk.room_id != old_room_id:
+            # The desk leaves one room's count and joins another's; recount both
+            occupancy.mark_desk_dirty(desk.id)
+            transaction.on_commit(lambda: room_availability.forget(old_room_id))
+            transaction.on_commit(lambda: room_availability.forget(desk.room_id))
+            events.emit(events.DeskStateChanged.of(desk))
+        elif (desk.is_permanent, desk.permanent_assignee_id) != old_permanent:
+            events.emit(events.DeskStateChanged.of(desk, was_available))
+
+    def perform_destroy(self, instance):
+        room_id = instance.room_id
+        occupancy.mark_desk_dirty(instance.id)
+        super().perform_destroy(instance)
+        transaction.on_commit(lambda: room_availability.forget(room_id))
+
     def _is_desk_manager(self, request, desk):
         """Check if user can manage this desk (room manager, location manager, or superuser)"""
         user = request.user
@@ -142,7 +210,7 @@ class DeskViewSet(viewsets.ModelViewSet):
             return True
         if desk.room.is_room_manager(user):
             return True
-        if desk.room.floor.location.is_location_manager(user):
+        if desk.room.get_location().is_location_manager(user):
             return True
         return False
 
@@ -178,25 +246,19 @@ class DeskViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        was_available = desk.is_available
         desk.is_permanent = True
         desk.permanent_assignee = assignee
         desk.full_clean()
         desk.save()
+        events.emit(events.DeskStateChanged.of(desk, was_available))
 
         AuditLog.log(
             user=request.user,
             action=AuditLog.Action.DESK_ASSIGNED,
             target_type='desk',
             target_id=desk.id,
-            target_snapshot={
-                'desk': desk.name,
-                'desk_id': desk.id,
-                'room': desk.room.name,
-                'room_id': desk.room.id,
-                'location': desk.room.floor.location.name,
-                'location_id': desk.room.floor.location.id,
-                'assigned_to': assignee.username,
-            },
+            target_snapshot=_desk_snapshot(desk, assigned_to=assignee.username),
             ip_address=request.META.get('REMOTE_ADDR'),
         )
 
@@ -218,24 +280,18 @@ class DeskViewSet(viewsets.ModelViewSet):
             )
 
         prev_assignee = desk.permanent_assignee.username if desk.permanent_assignee else None
+        was_available = desk.is_available
         desk.is_permanent = False
         desk.permanent_assignee = None
         desk.save()
+        events.emit(events.DeskStateChanged.of(desk, was_available))
 
         AuditLog.log(
             user=request.user,
             action=AuditLog.Action.DESK_UNASSIGNED,
             target_type='desk',
             target_id=desk.id,
-            target_snapshot={
-                'desk': desk.name,
-                'desk_id': desk.id,
-                'room': desk.room.name,
-                'room_id': desk.room.id,
-                'location': desk.room.floor.location.name,
-                'location_id': desk.room.floor.location.id,
-                'was_assigned_to': prev_assignee,
-            },
+            target_snapshot=_desk_snapshot(desk, was_assigned_to=prev_assignee),
             ip_address=request.META.get('REMOTE_ADDR'),
         )
 
@@ -274,20 +330,16 @@ class DeskViewSet(viewsets.ModelViewSet):
         
         end_date = start_date + timedelta(days=days - 1)
 
-        bookings = Booking.objects.filter(
-            desk = desk,
-            start_time__date__lte = end_date,
-            end_time__date__gte=start_date
-        )
+        booked = set()
+        for s, e in Booking.objects.filter(
+            touches_days(start_date, end_date), desk=desk
+        ).values_list('start_time', 'end_time'):
+            booked.update(days_touched(s, e, start_date, end_date))
 
         availability = {}
         for i in range(days):
             current_day = start_date + timedelta(days=i)
-            booked = bookings.filter(
-                start_time__date__lte=current_day,
-                end_time__date__gte=current_day
-            ).exists()
-            availability[str(current_day)] = not booked
+            availability[str(current_day)] = current_day not in booked
 
         return Response({
             "desk_id": desk.id,
@@ -297,14 +349,18 @@ class DeskViewSet(viewsets.ModelViewSet):
             "availability": availability
         })
 
-class BookingViewSet(viewsets.ModelViewSet):
-    queryset = Booking.objects.select_related('desk','user').all()
+class BookingViewSet(ReplicaReadsMixin, DynamicFieldsViewSetMixin, viewsets.ModelViewSet):
+    queryset = Booking.objects.select_related(*BOOKING_RELATED).all()
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         qs = super().get_queryset()
 
+        if not self.field_requested('desk'):
+            # Nested desk skipped: drop the desk's user joins
+            qs = qs.select_related(None).select_related(*BOOKING_COMPACT_RELATED)
+
         user_id = self.request.query_params.get('user')
         user_only = self.request.query_params.get('user_only')
 
@@ -324,6 +380,10 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         if desk:
             qs = qs.filter(desk_id=desk)
+
+        for param in ('room_id', 'location_id'):
+            if value := self.request.query_params.get(param):
+                qs = qs.filter(**{param: value}) if value.isdigit() else qs.none()
         
         if start and end:
             def parse_iso(s: str) -> Optional[datetime.datetime]:
@@ -347,41 +407,86 @@ class BookingViewSet(viewsets.ModelViewSet):
         
         return qs
 
-    def _broadcast_desk_status(self, desk:Desk):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f"room_{desk.room_id}",
-            {
-                "type": "desk_status",
-                "desk_id": desk.id,
-                "is_booked":desk.is_booked,
-                "booked_by": desk.booked_by.username if desk.booked_by else None,
-            }
-        )    
-    
-    def _broadcast_update_bookings(self, desk:Desk, *, upsert_qs=None, delete_ids=None):
-
-        channel_layer = get_channel_layer()
-        action = "mixed"
-        payload = {"type": "update_bookings", "desk_id":desk.id}
-
-        if upsert_qs is not None and (delete_ids is None or len(delete_ids)==0):
-            action = "upsert"
-        elif delete_ids and (upsert_qs is None or upsert_qs.count() == 0):
-            action = "delete"
+    @action(detail=False, methods=['get'])
+    def compact(self, request):
+        """
+        Flat booking list (ids plus denormalized names, no nested desk).
+        Endpoint: GET /api/bookings/compact/
+        Accepts the same filters as the list endpoint (user, user_only, desk, start, end).
+        """
+        qs = compact_queryset(self.filter_queryset(self.get_queryset()))
+        serializer = BookingCompactSerializer(qs, many=True)
+        return Response(serializer.data)
 
-        payload["action"] = action
+    @action(detail=False, methods=['get'], url_path=r'export/(?P<fmt>csv|ndjson)')
+    def export(self, request, fmt=None):
+        """
+        Stream bookings as CSV or NDJSON.
+        Endpoint: GET /api/bookings/export/csv/ (or /export/ndjson/)
+        Accepts the list filters (user, user_only, desk, room_id, location_id, start, end);
+        non-staff users only export their own bookings.
+        """
+        qs = self.get_queryset()
+        if not request.user.is_staff:
+            qs = qs.filter(user=request.user)
+        return stream_export(request, qs.order_by('start_time', 'id'), BOOKING_EXPORT_COLUMNS, fmt, 'bookings')
 
-        if upsert_qs is not None:
-            data = BookingSerializer(upsert_qs, many=True).data
-            payload["bookings"] = data
-        if delete_ids:
-            payload["deleted_ids"] = list(delete_ids)
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Delta sync: bookings inserted, updated or deleted since a token.
+        Endpoint: GET /api/bookings/changes/?since=<token>&room=|desk=|user=
+        Without since, returns only the current token (fetch the range, then pull from it).
+        Upserts are compact bookings; deletes are ids. 410 means the token has
+        expired and the client must refetch. Keep pulling while has_more is true.
+        """
+        params = request.query_params
+        filters = {}
+        for param, field in (('room', 'room_id'), ('desk', 'desk_id'), ('user', 'user_id')):
+            if value := params.get(param):
+                if not value.isdigit():
+                    return Response({"detail": f"{param} must be an id"}, status=400)
+                filters[field] = int(value)
+        if 'user_id' in filters and not request.user.is_staff and filters['user_id'] != request.user.id:
+            raise PermissionDenied("You can only view your own bookings.")
+
+        since = params.get('since')
+        if since is None:
+            return Response({"token": booking_changes.current_token(), "upserts": [], "deleted_ids": [], "has_more": False})
+        try:
+            since = booking_changes.parse_token(since)
+        except ValueError:
+            return Response({"detail": "Invalid sync token"}, status=400)
+        except booking_changes.TokenExpired:
+            return Response({"detail": "Sync token expired, refetch bookings"}, status=410)
+        return Response(booking_changes.changes_since(since, filters))
 
-        async_to_sync(channel_layer.group_send)(
-            f"room_{desk.room_id}",
-            payload
-        )
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Dashboard statistics for the current user, computed in SQL and cached.
+        Endpoint: GET /api/bookings/stats/?tz=Europe/Bucharest
+        tz (IANA name, default UTC) sets the week / month boundaries and weekdays.
+        """
+        try:
+            tz = zoneinfo.ZoneInfo(request.query_params.get('tz') or 'UTC')
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            return Response({"detail": "Unknown timezone"}, status=400)
+        return Response(booking_stats.get(request.user, tz))
+
+    def _bookings_changed(self, desk:Desk, *, upserted=(), deleted=(), intervals=()):
+        """Refresh the desk's booked state and emit the change events for this write."""
+        was_available = desk.is_available
+        desk.refresh_booking_state()
+        events.emit(events.DeskStateChanged.of(desk, was_available))
+        events.emit(events.BookingsChanged(
+            desk_id=desk.id,
+            room_id=desk.room_id,
+            upserted=tuple(upserted),
+            deleted=tuple(deleted),
+            intervals=tuple(intervals),
+            actor_id=self.request.user.id,
+        ))
 
     @action(detail=False, methods=['post'],url_path='lock')
     def lock(self, request):
@@ -391,28 +496,19 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         ok = acquire_lock(int(desk_id), request.user.id, request.user.username)
         if ok:
-            desk = Desk.objects.get(pk=desk_id)
+            desk = Desk.objects.select_related('room', 'location').get(pk=desk_id)
             Desk.objects.filter(pk=desk_id).update(is_locked=True,locked_by=request.user)
             AuditLog.log(
                 user=request.user,
                 action=AuditLog.Action.DESK_LOCKED,
                 target_type='desk',
                 target_id=int(desk_id),
-                target_snapshot={
-                    'desk': desk.name,
-                    'desk_id': desk.id,
-                    'room': desk.room.name,
-                    'room_id': desk.room.id,
-                    'location': desk.room.floor.location.name,
-                    'location_id': desk.room.floor.location.id,
-                },
+                target_snapshot=_desk_snapshot(desk),
                 ip_address=request.META.get('REMOTE_ADDR'),
             )
-            channel_layer=get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                f"room_{desk.room_id}",
-                {"type":"desk_lock","desk_id":int(desk_id),"locked":True, "by":request.user.username}
-            )
+            events.emit(events.DeskLockChanged(
+                desk_id=desk.id, room_id=desk.room_id, locked=True, by=request.user.username
+            ))
             return Response({"ok":True}, status=200)
         
         data = read_lock(int(desk_id)) or {}
@@ -435,7 +531,7 @@ class BookingViewSet(viewsets.ModelViewSet):
             return Response({"ok": False}, status=409)
         # Always clean up DB and broadcast, whether the Redis lock existed or had
         # already expired (TTL elapsed, server restart, or sendBeacon race).
-        desk = Desk.objects.get(pk=desk_id)
+        desk = Desk.objects.select_related('room', 'location').get(pk=desk_id)
         if desk.is_locked:
             Desk.objects.filter(pk=desk_id).update(is_locked=False, locked_by=None)
             AuditLog.log(
@@ -443,21 +539,10 @@ class BookingViewSet(viewsets.ModelViewSet):
                 action=AuditLog.Action.DESK_UNLOCKED,
                 target_type='desk',
                 target_id=desk_id,
-                target_snapshot={
-                    'desk': desk.name,
-                    'desk_id': desk.id,
-                    'room': desk.room.name,
-                    'room_id': desk.room.id,
-                    'location': desk.room.floor.location.name,
-                    'location_id': desk.room.floor.location.id,
-                },
+                target_snapshot=_desk_snapshot(desk),
                 ip_address=request.META.get('REMOTE_ADDR'),
             )
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                f"room_{desk.room_id}",
-                {"type": "desk_lock", "desk_id": desk_id, "locked": False}
-            )
+            events.emit(events.DeskLockChanged(desk_id=desk.id, room_id=desk.room_id, locked=False))
         return Response({"ok": True}, status=200)
     
     @transaction.atomic
@@ -472,7 +557,7 @@ class BookingViewSet(viewsets.ModelViewSet):
             raise ValidationError({"detail": "Desk currently locked by another user."})
 
         # Enforce room-level group access
-        desk_room = Desk.objects.select_related('room__floor__location').get(pk=desk_id).room
+        desk_room = Desk.objects.select_related('room__location').get(pk=desk_id).room
         if not desk_room.can_user_book(self.request.user):
             raise ValidationError({"detail": "You do not have permission to book desks in this room."})
 
@@ -486,7 +571,9 @@ class BookingViewSet(viewsets.ModelViewSet):
             raise ValidationError({"detail": "end_time must be after start_time."})
 
         with transaction.atomic():
-            desk_locked = Desk.objects.select_for_update().get(pk=desk_id)
+            desk_locked = (
+                Desk.objects.select_for_update(of=('self',)).select_related('room__floor', 'location').get(pk=desk_id)
+            )
 
             if desk_locked.is_permanent:
                 if not desk_locked.permanent_assignee:
@@ -513,25 +600,19 @@ class BookingViewSet(viewsets.ModelViewSet):
                 action=AuditLog.Action.BOOKING_CREATED,
                 target_type='booking',
                 target_id=booking.id,
-                target_snapshot={
-                    'desk': desk_locked.name,
-                    'desk_id': desk_locked.id,
-                    'room': desk_locked.room.name,
-                    'room_id': desk_locked.room.id,
-                    'floor': desk_locked.room.floor.name,
-                    'floor_id': desk_locked.room.floor.id,
-                    'location': desk_locked.room.floor.location.name,
-                    'location_id': desk_locked.room.floor.location.id,
-                    'start_time': str(booking.start_time),
-                    'end_time': str(booking.end_time),
-                },
+                target_snapshot=_desk_snapshot(
+                    desk_locked, with_floor=True,
+                    start_time=str(booking.start_time), end_time=str(booking.end_time),
+                ),
                 ip_address=self.request.META.get('REMOTE_ADDR'),
             )
 
-            desk_locked.refresh_booking_state()
-            self._broadcast_desk_status(desk_locked)
-
-            self._broadcast_update_bookings(desk_locked, upsert_qs=Booking.objects.filter(pk=booking.pk))
+            self._bookings_changed(
+                desk_locked,
+                upserted=[(booking.id, booking.user_id)],
+                intervals=[(booking.start_time, booking.end_time)],
+            )
+            email_notifications.queue_confirmations([booking])
         
         return booking
 
@@ -545,26 +626,20 @@ class BookingViewSet(viewsets.ModelViewSet):
             action=AuditLog.Action.BOOKING_CANCELLED,
             target_type='booking',
             target_id=deleted_id,
-            target_snapshot={
-                'desk': desk.name,
-                'desk_id': desk.id,
-                'room': desk.room.name,
-                'room_id': desk.room.id,
-                'floor': desk.room.floor.name,
-                'floor_id': desk.room.floor.id,
-                'location': desk.room.floor.location.name,
-                'location_id': desk.room.floor.location.id,
-                'start_time': str(instance.start_time),
-                'end_time': str(instance.end_time),
-                'booked_by': instance.user.username,
-            },
+            target_snapshot=_desk_snapshot(
+                desk, instance, with_floor=True,
+                start_time=str(instance.start_time), end_time=str(instance.end_time),
+                booked_by=instance.user.username,
+            ),
             ip_address=self.request.META.get('REMOTE_ADDR'),
         )
+        email_notifications.queue_cancellations([instance], cancelled_by=self.request.user.username)
         super().perform_destroy(instance)
-
-        desk.refresh_booking_state()
-        self._broadcast_desk_status(desk=desk)
-        self._broadcast_update_bookings(desk,delete_ids=[deleted_id])
+        self._bookings_changed(
+            desk,
+            deleted=[(deleted_id, instance.user_id)],
+            intervals=[(instance.start_time, instance.end_time)],
+        )
 
     
     # Bulk create
@@ -659,10 +734,10 @@ class BookingViewSet(viewsets.ModelViewSet):
                     bk = Booking.objects.create(user=request.user, desk=desk_locked, start_time=s, end_time = e)
                     created_objs.append(bk)
 
-                desk_locked.refresh_booking_state()
-                self._broadcast_desk_status(desk_locked)
-
-                self._broadcast_update_bookings(desk_locked,upsert_qs=Booking.objects.filter(pk__in=[b.pk for b in created_objs]))
+                self._bookings_changed(
+                    desk_locked, upserted=[(b.id, b.user_id) for b in created_objs], intervals=parsed
+                )
+                email_notifications.queue_confirmations(created_objs)
             
             return Response({"ok": True}, status = 201)
         
@@ -695,14 +770,21 @@ class BookingViewSet(viewsets.ModelViewSet):
                         "status": 201,
                     })
             
-            desk_locked.refresh_booking_state()
-            self._broadcast_desk_status(desk_locked)
-
-            if approved_objs:
-                self._broadcast_update_bookings(desk_locked, upsert_qs=Booking.objects.filter(pk__in=[b.pk for b in approved_objs]))
+            self._bookings_changed(
+                desk_locked,
+                upserted=[(b.id, b.user_id) for b in approved_objs],
+                intervals=[(b.start_time, b.end_time) for b in approved_objs],
+            )
+            email_notifications.queue_confirmations(approved_objs)
             
         return Response({"results": results}, status=200)
 
+    def perform_update(self, serializer):
+        start = serializer.validated_data.get('start_time')
+        moved = start is not None and start != serializer.instance.start_time
+        # A booking moved to a new start gets a reminder for the new time
+        serializer.save(**({'reminded_at': None} if moved else {}))
+
     def _parse_iso(self, s:str) -> datetime.datetime:
         return datetime.datetime.fromisoformat(s.replace('Z','+00:00')) if s.endswith('Z') else datetime.datetime.fromisoformat(s)
 
@@ -715,6 +797,7 @@ class BookingViewSet(viewsets.ModelViewSet):
     def _update_booking(self, request, partial:bool, *args, **kwargs):
         booking = self.get_object()
         desk = booking.desk
+        old_interval = (booking.start_time, booking.end_time)
 
         lock = read_lock(desk.id)
         if lock and lock.get("user_id") != request.user.id:
@@ -761,31 +844,25 @@ class BookingViewSet(viewsets.ModelViewSet):
                     action=AuditLog.Action.BOOKING_UPDATED,
                     target_type='booking',
                     target_id=booking.id,
-                    target_snapshot={
-                        'desk': desk.name,
-                        'desk_id': desk.id,
-                        'room': desk.room.name,
-                        'room_id': desk.room.id,
-                        'floor': desk.room.floor.name,
-                        'floor_id': desk.room.floor.id,
-                        'location': desk.room.floor.location.name,
-                        'location_id': desk.room.floor.location.id,
-                        'start_time': str(s_dt),
-                        'end_time': str(e_dt),
-                    },
+                    target_snapshot=_desk_snapshot(
+                        desk, booking, with_floor=True, start_time=str(s_dt), end_time=str(e_dt),
+                    ),
                     ip_address=request.META.get('REMOTE_ADDR'),
                 )
 
-                desk_locked.refresh_booking_state()
-                self._broadcast_desk_status(desk_locked)
-                self._broadcast_update_bookings(desk_locked, upsert_qs=Booking.objects.filter(pk=booking.pk))
+                self._bookings_changed(
+                    desk_locked, upserted=[(booking.id, booking.user_id)], intervals=[old_interval, (s_dt, e_dt)]
+                )
             
             return Response(serializer.data, status=200)
 
         response= super().partial_update(request, *args, **kwargs) if partial else super().update(request, *args, **kwargs)
-        desk.refresh_booking_state()
-        self._broadcast_desk_status(desk)
-        self._broadcast_update_bookings(desk, upsert_qs=Booking.objects.filter(pk=booking.pk))
+        booking.refresh_from_db(fields=['start_time', 'end_time'])
+        self._bookings_changed(
+            desk,
+            upserted=[(booking.id, booking.user_id)],
+            intervals=[old_interval, (booking.start_time, booking.end_time)],
+        )
         return response
     
     @action(detail=True, methods=['post'], url_path='edit_intervals')
@@ -816,7 +893,7 @@ class BookingViewSet(viewsets.ModelViewSet):
             return Response({"detail": "You can only edit your own bookings"}, status=403)
 
         # Enforce room-level group access (user must still have access to modify bookings here)
-        desk_room = desk.room if hasattr(desk, 'room') else Desk.objects.select_related('room__floor__location').get(pk=desk.pk).room
+        desk_room = desk.room if hasattr(desk, 'room') else Desk.objects.select_related('room__location').get(pk=desk.pk).room
         if not desk_room.can_user_book(user):
             return Response({"detail": "You do not have permission to book desks in this room."}, status=403)
         
@@ -831,9 +908,11 @@ class BookingViewSet(viewsets.ModelViewSet):
                 desk_locked = Desk.objects.select_for_update().get(pk=desk.pk)
                 base_booking.delete()
 
-                desk_locked.refresh_booking_state()
-                self._broadcast_desk_status(desk_locked)
-                self._broadcast_update_bookings(desk_locked,upsert_qs=None,delete_ids=[deleted_id])
+                self._bookings_changed(
+                    desk_locked,
+                    deleted=[(deleted_id, user.id)],
+                    intervals=[(base_booking.start_time, base_booking.end_time)],
+                )
 
             return Response({
                 "message": "Booking deleted",
@@ -928,13 +1007,13 @@ class BookingViewSet(viewsets.ModelViewSet):
                     bk = Booking.objects.create(user=user, desk=desk_locked, start_time=s, end_time=e)
                     created_objs.append(bk)
             
-            desk_locked.refresh_booking_state()
-            self._broadcast_desk_status(desk_locked)
-
             upsert_ids = [base_booking.pk] + [b.pk for b in created_objs]
-            upsert_qs = Booking.objects.filter(pk__in=upsert_ids)
-
-            self._broadcast_update_bookings(desk_locked, upsert_qs = upsert_qs, delete_ids=deleted_ids)
+            self._bookings_changed(
+                desk_locked,
+                upserted=[(pk, user.id) for pk in upsert_ids],
+                deleted=[(pk, user.id) for pk in deleted_ids],
+                intervals=[(win_start, win_end)],
+            )
 
         return Response({
             "message": f"Updated booking and created {len(created_objs)} additional interval(s)",
@@ -1085,23 +1164,22 @@ class MeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        
-        # Check if user is a location manager or room manager
-        is_location_manager = user.managed_locations.exists()
-        is_room_manager = user.managed_rooms.exists()
-        is_any_manager = is_location_manager or is_room_manager
+        return Response(bootstrap.me(request.user))
 
-        return Response({
-            "username": user.username,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "email": user.email,
-            "is_staff": user.is_staff,
-            "is_superuser": user.is_superuser,
-            "is_location_manager": is_location_manager,
-            "is_room_manager": is_room_manager,
-            "is_any_manager": is_any_manager,
-            "role": "Superuser" if user.is_superuser else ("Staff" if user.is_staff else "User"),
-            "groups": [group.name for group in user.groups.all()],
-        })
\ No newline at end of file
+
+class BootstrapView(APIView):
+    """
+    Startup payload for the SPA: profile, preferences, topology summary,
+    bookings for today and the next 7 days, and manager scope in one response.
+    Endpoint: GET /api/bootstrap/?tz=Europe/Bucharest
+    tz (IANA name, default UTC) sets where "today" starts.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            tz = zoneinfo.ZoneInfo(request.query_params.get('tz') or 'UTC')
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            return Response({"detail": "Unknown timezone"}, status=400)
+        return Response(bootstrap.build(request.user, tz))
@@ -1,6 +1,7 @@
 import os, redis
 from celery import Celery
-from celery.signals import worker_ready
+from celery.signals import before_task_publish, task_prerun, worker_ready
+from kombu import Queue
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booking_project.settings')
 
@@ -8,7 +9,48 @@ app = Celery('booking_project')
 
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
+# Queues, highest priority first. docker-compose runs one worker per queue so
+# a slow SMTP retry or nightly job never delays desk state; a single worker
+# consuming all of them (start_celery.bat) drains them in this order.
+#   realtime       desk state, outbox relay, live counters
+#   notifications  email
+#   maintenance    audit, occupancy rollups, retention jobs (default queue)
+app.conf.task_queues = (
+    Queue('realtime', routing_key='realtime'),
+    Queue('notifications', routing_key='notifications'),
+    Queue('maintenance', routing_key='maintenance'),
+)
+app.conf.task_default_queue = 'maintenance'
+app.conf.task_default_routing_key = 'maintenance'
+app.conf.broker_transport_options = {'queue_order_strategy': 'priority'}
+app.conf.task_routes = {
+    'booking.tasks.expire_and_activate_bookings': {'queue': 'realtime'},
+    'booking.tasks.startup_sync_desks': {'queue': 'realtime'},
+    'booking.tasks.relay_outbox': {'queue': 'realtime'},
+    'booking.tasks.reconcile_room_availability': {'queue': 'realtime'},
+    'booking.tasks.sweep_booking_reminders': {'queue': 'notifications'},
+    'booking.email_notifications.*': {'queue': 'notifications'},
+}
+
 app.autodiscover_tasks()
+app.autodiscover_tasks(related_name='email_notifications')
+
+
+@before_task_publish.connect
+def stamp_published_at(sender=None, headers=None, **kwargs):
+    from booking.services.queue_metrics import stamp
+    if headers is not None:
+        stamp(headers)
+
+
+@task_prerun.connect
+def record_queue_latency(sender=None, task=None, **kwargs):
+    from booking.services.queue_metrics import record
+    published_at = getattr(task.request, 'published_at', None)
+    queue = (task.request.delivery_info or {}).get('routing_key')
+    if published_at is not None and queue:
+        record(queue, published_at)
+
 
 @worker_ready.connect
 def at_celery_start(sender, **kwargs):
@@ -21,4 +63,4 @@ def at_celery_start(sender, **kwargs):
             r.expire('startup_sync_triggered', 60)
             startup_sync_desks.apply_async(countdown=5)
     except Exception as e:
-        print(f"Startup sync trigger failed: {e}")
\ No newline at end of file
+        print(f"Startup sync trigger failed: {e}")
@@ -0,0 +1,74 @@
+"""
+orjson-backed JSON encoding for the API, WebSocket consumers and audit snapshots.
+
+Output matches DRF's stock JSONRenderer: aware UTC datetimes end in "Z",
+Decimals become floats, UUIDs and lazy strings become strings.
+"""
+import datetime
+import decimal
+
+import orjson
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    """Types orjson does not handle natively, mirroring rest_framework.utils.encoders."""
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__getitem__') and hasattr(obj, 'keys'):
+        return dict(obj)
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(data, option=0) -> bytes:
+    return orjson.dumps(data, default=_default, option=OPTIONS | option)
+
+
+def dumps_str(data) -> str:
+    """dumps() for text channels (WebSocket frames, JSONField payloads)."""
+    return dumps(data).decode()
+
+
+loads = orjson.loads
+
+
+def to_jsonable(data):
+    """Coerce datetimes, Decimals, UUIDs, ... into plain JSON types."""
+    return orjson.loads(dumps(data))
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in replacement for rest_framework.renderers.JSONRenderer."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        return dumps(data, orjson.OPT_INDENT_2 if indent else 0)
+
+
+class ORJSONParser(JSONParser):
+    """Drop-in replacement for rest_framework.parsers.JSONParser."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
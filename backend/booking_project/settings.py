@@ -54,8 +54,14 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+        'booking_project.renderers.ORJSONRenderer',
+        # The Browsable API is a development aid only
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'booking_project.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'booking_project.authentication.CookieJWTAuthentication',
@@ -90,6 +96,8 @@ CORS_ALLOW_HEADERS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Compresses responses (large list payloads) for clients sending Accept-Encoding: gzip
+    'django.middleware.gzip.GZipMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -97,6 +105,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'booking.middleware.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'booking_project.urls'
@@ -161,6 +170,52 @@ DATABASES = {
     }
 }
 
+# Connection reuse, sized per process type through env (see docker-compose.yml).
+# Daphne runs each request's sync code on a fresh thread, so thread-bound
+# persistent connections are never reused there: web processes use a psycopg
+# pool capped at the number of concurrent requests they serve. Celery prefork
+# children run tasks on a single thread and keep one persistent connection
+# (DB_POOL=false), checked for health before reuse.
+# `python manage.py bench_db_connections` compares the modes.
+if os.getenv('DB_POOL', 'true').lower() in ('1', 'true', 'yes'):
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 16)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+        },
+    }
+    # Django hands the pool ConnectionPool.check_connection when this is set
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 300))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Optional read replicas: comma-separated host[:port][/name] list, same
+# credentials as the primary; name defaults to the primary's DB_NAME. Locally,
+# DB_REPLICA_HOSTS=localhost/flexspace_replica gives a second alias on the same
+# server. Safe-method requests on read-heavy viewsets read from them (see
+# booking.db_router); tests mirror them onto the primary's test database.
+DATABASE_REPLICAS = []
+for i, replica in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    address, _, name = replica.strip().partition('/')
+    host, _, port = address.partition(':')
+    alias = f'replica_{i}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'NAME': name or DATABASES['default']['NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['booking.db_router.PrimaryReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write (read-your-writes)
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Password validation
@@ -240,6 +295,17 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Serve MEDIA_URL from Django (booking.media_views.serve_media) when no web server does
+SERVE_MEDIA = os.getenv('SERVE_MEDIA', str(DEBUG)) == 'True'
+# Content-hashed media (room maps) never change under the same URL
+MEDIA_IMMUTABLE_MAX_AGE = int(os.getenv('MEDIA_IMMUTABLE_MAX_AGE', 365 * 24 * 3600))
+
+# Room map renditions (booking/services/room_maps.py)
+ROOM_MAP_WIDTHS = [int(w) for w in os.getenv('ROOM_MAP_WIDTHS', '480,960,1920').split(',')]
+ROOM_MAP_WEBP_QUALITY = int(os.getenv('ROOM_MAP_WEBP_QUALITY', 80))
+# Plans larger than this (px, either side) also get deep-zoom tiles
+ROOM_MAP_TILE_THRESHOLD = int(os.getenv('ROOM_MAP_TILE_THRESHOLD', 4096))
+ROOM_MAP_TILE_SIZE = int(os.getenv('ROOM_MAP_TILE_SIZE', 256))
 
 CELERY_BROKER_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/0'
 CELERY_RESULT_BACKEND = f'redis://{REDIS_HOST}:{REDIS_PORT}/1'
@@ -254,15 +320,109 @@ CELERY_RESULT_EXPIRES = 3600
 
 from celery.schedules import crontab
 
+# Audit entries are buffered in Redis and bulk-inserted by flush_audit_log
+AUDIT_LOG_ASYNC = os.getenv('AUDIT_LOG_ASYNC', 'True') == 'True'
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('AUDIT_LOG_BATCH_SIZE', 500))
+# Longest a single flush run drains before leaving the rest to the next run
+AUDIT_LOG_FLUSH_BUDGET_S = float(os.getenv('AUDIT_LOG_FLUSH_BUDGET_S', 20))
+# Months of audit history kept in Postgres; older months move to compressed files
+AUDIT_LOG_HOT_MONTHS = int(os.getenv('AUDIT_LOG_HOT_MONTHS', 12))
+AUDIT_ARCHIVE_DIR = os.getenv('AUDIT_ARCHIVE_DIR', os.path.join(BASE_DIR, 'audit_archive'))
+# Widest start..end an ?archived=true read may cover; each month is one file to decompress
+AUDIT_ARCHIVE_MAX_MONTHS = int(os.getenv('AUDIT_ARCHIVE_MAX_MONTHS', 3))
+
+# Occupancy rollups: bookable hours per desk on each workday (0 = Monday),
+# starting at OCCUPANCY_DAY_START (UTC). Only booked time inside that window
+# counts toward utilization.
+OCCUPANCY_DAY_START = os.getenv('OCCUPANCY_DAY_START', '09:00')
+OCCUPANCY_HOURS_PER_DAY = float(os.getenv('OCCUPANCY_HOURS_PER_DAY', 8))
+OCCUPANCY_WORKDAYS = [int(d) for d in os.getenv('OCCUPANCY_WORKDAYS', '0,1,2,3,4').split(',')]
+OCCUPANCY_REFRESH_BATCH = int(os.getenv('OCCUPANCY_REFRESH_BATCH', 500))
+OCCUPANCY_REPAIR_DAYS = int(os.getenv('OCCUPANCY_REPAIR_DAYS', 35))
+# Room heatmap time resolution; must divide 60
+HEATMAP_SLOT_MINUTES = int(os.getenv('HEATMAP_SLOT_MINUTES', 30))
+
+# Threads used to build /api/bootstrap/ sections concurrently (1 = inline)
+BOOTSTRAP_WORKERS = int(os.getenv('BOOTSTRAP_WORKERS', 5))
+
+# Booking change feed (delta sync); older sync tokens get 410 Gone
+BOOKING_CHANGES_RETENTION_DAYS = int(os.getenv('BOOKING_CHANGES_RETENTION_DAYS', 30))
+
+# Email (booking/email_notifications.py); printed to the console until EMAIL_HOST is set
+EMAIL_HOST = os.getenv('EMAIL_HOST', '')
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND',
+    'django.core.mail.backends.smtp.EmailBackend' if EMAIL_HOST else 'django.core.mail.backends.console.EmailBackend',
+)
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 30))
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'flexspace@yourcompany.com')
+FLEXSPACE_BASE_URL = os.getenv('FLEXSPACE_BASE_URL', 'http://localhost:5173')
+BOOKING_EMAILS_ENABLED = os.getenv('BOOKING_EMAILS_ENABLED', 'True') == 'True'
+# A user with this many bookings in one operation gets a single digest email
+EMAIL_DIGEST_THRESHOLD = int(os.getenv('EMAIL_DIGEST_THRESHOLD', 2))
+# Expired JWT cleanup: rows per id-range batch (one short transaction each)
+# and seconds per hourly run before the rest is left for the next one
+TOKEN_CLEANUP_BATCH_SIZE = int(os.getenv('TOKEN_CLEANUP_BATCH_SIZE', 1000))
+TOKEN_CLEANUP_BUDGET_S = float(os.getenv('TOKEN_CLEANUP_BUDGET_S', 60))
+
+# Reminder emails go out this long before a booking starts (swept every 5 minutes)
+REMINDER_LEAD_MINUTES = int(os.getenv('REMINDER_LEAD_MINUTES', 60))
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 200))
+
 CELERY_BEAT_SCHEDULE = {
+    'relay-outbox': {
+        'task': 'booking.tasks.relay_outbox',
+        'schedule': timedelta(seconds=10),
+        'options': {'expires': 10},
+    },
+    'flush-audit-log': {
+        'task': 'booking.tasks.flush_audit_log',
+        'schedule': timedelta(seconds=5),
+    },
+    'reconcile-room-availability': {
+        'task': 'booking.tasks.reconcile_room_availability',
+        'schedule': crontab(minute='*/5'),
+    },
+    'sweep-booking-reminders': {
+        'task': 'booking.tasks.sweep_booking_reminders',
+        'schedule': crontab(minute='*/5'),
+        'options': {'expires': 290},
+    },
     'expire_and_activate_bookings': {
         'task': 'booking.tasks.expire_and_activate_bookings',
-        'schedule': crontab(minute='*', hour='*') # Run at each minute
+        'schedule': crontab(minute='*', hour='*'), # Run at each minute
+        # A tick still queued when the next one fires is redundant
+        'options': {'expires': 55},
     },
     'cleanup-expired-tokens': {
         'task': 'booking.tasks.cleanup_expired_tokens',
-        'schedule': crontab(hour=3, minute=0),
-    }
+        'schedule': crontab(minute=7),
+    },
+    'maintain-audit-partitions': {
+        'task': 'booking.tasks.maintain_audit_partitions',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'archive-audit-log': {
+        'task': 'booking.tasks.archive_audit_log',
+        'schedule': crontab(hour=2, minute=45),
+    },
+    'refresh-occupancy-rollups': {
+        'task': 'booking.tasks.refresh_occupancy_rollups',
+        'schedule': timedelta(seconds=30),
+        'options': {'expires': 30},
+    },
+    'repair-occupancy-rollups': {
+        'task': 'booking.tasks.repair_occupancy_rollups',
+        'schedule': crontab(hour=1, minute=30),
+    },
+    'prune-booking-changes': {
+        'task': 'booking.tasks.prune_booking_changes',
+        'schedule': crontab(hour=3, minute=15),
+    },
 }
 
 AUTHENTICATION_BACKENDS = (
@@ -45,6 +45,44 @@ def pytest_configure(config):
         config._metadata["Python"] = sys.version.split()[0]
 
 
+# ─── Databases ─────────────────────────────────────────────────────────────────
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix):
+    """Give the router a real second alias; like DB_REPLICA_HOSTS replicas it mirrors the test database."""
+    from django.conf import settings
+    settings.DATABASES.setdefault("replica_1", {**settings.DATABASES["default"], "TEST": {"MIRROR": "default"}})
+
+
+# ─── Audit log ─────────────────────────────────────────────────────────────────
+
+@pytest.fixture(autouse=True)
+def sync_audit_log(settings):
+    """Write audit entries synchronously; tests opt in to the Redis buffer explicitly."""
+    settings.AUDIT_LOG_ASYNC = False
+
+
+# ─── Email ─────────────────────────────────────────────────────────────────────
+
+@pytest.fixture(autouse=True)
+def no_booking_emails(settings):
+    """Booking writes queue no email tasks; email tests opt in explicitly."""
+    settings.BOOKING_EMAILS_ENABLED = False
+
+
+# ─── Room availability counters ───────────────────────────────────────────────
+
+@pytest.fixture(autouse=True)
+def uncached_room_availability():
+    """The counters live in Redis, outside the test transaction: start each test uncached."""
+    from django_redis import get_redis_connection
+    from booking.services.room_availability import KEY
+    try:
+        get_redis_connection("default").delete(KEY)
+    except Exception:
+        pass  # no Redis: reads fall back to the database
+
+
 # ─── Users ─────────────────────────────────────────────────────────────────────
 
 @pytest.fixture
@@ -97,6 +97,10 @@ const SnapshotSummary: React.FC<{ log: AuditLog; timeFormat: '12' | '24' }> = ({
       return <div className={styles.snapshotCell}><Text className={styles.snapshotLine}>{s.desk as string} · {s.room as string}</Text><Text className={styles.snapshotLine}>Was: {s.was_assigned_to as string}</Text>{locationLine}</div>;
     case 'room_maintenance':
       return <div className={styles.snapshotCell}><Text className={styles.snapshotLine}>{s.room as string}</Text><Text className={styles.snapshotLine}>{s.maintenance ? 'Enabled' : 'Cleared'} by {s.by as string}</Text>{locationLine}</div>;
+    case 'room_layout_changed': {
+      const counts = `${(s.created as unknown[] | undefined)?.length ?? 0} added · ${(s.updated as unknown[] | undefined)?.length ?? 0} changed · ${(s.deleted as unknown[] | undefined)?.length ?? 0} removed`;
+      return <div className={styles.snapshotCell}><Text className={styles.snapshotLine}>{s.room as string}</Text><Text className={styles.snapshotLine}>{counts}</Text>{locationLine}</div>;
+    }
     case 'user_login': case 'user_logout':
       return <Text className={styles.snapshotLine}>{log.ip_address || '—'}</Text>;
     default:
@@ -272,6 +272,7 @@ export const ManageDesksModal: React.FC<ManageDesksModalProps> = ({
   const [loading, setLoading] = useState(false);
   const [savingDeskId, setSavingDeskId] = useState<number | null>(null);
   const [addingDesk, setAddingDesk] = useState(false);
+  const [savingAll, setSavingAll] = useState(false);
   const [newDeskName, setNewDeskName] = useState('');
   const [draggingDeskId, setDraggingDeskId] = useState<number | null>(null);
   const [editingPositionDeskId, setEditingPositionDeskId] = useState<number | null>(null);
@@ -590,6 +591,34 @@ const handleWheel = (e: React.WheelEvent) => {
     }
   };
 
+  // Saves every unsaved position in one layout request (one transaction, one broadcast)
+  const handleSaveAllPositions = async () => {
+    if (!room) return;
+    const unsaved = [...deskPositions.values()].filter(p => !p.saved);
+    if (unsaved.length === 0) return;
+    try {
+      setSavingAll(true);
+      const res = await authenticatedFetch(`${API_BASE_URL}/admin/rooms/${room.id}/layout/`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ update: unsaved.map(p => ({ id: p.id, pos_x: p.x, pos_y: p.y })) }),
+      });
+      if (!res.ok) throw new Error((await res.json().catch(() => ({}))).detail || 'Failed to save layout');
+      const { desks: saved } = await res.json();
+      setDesks(saved);
+      setDeskPositions(prev => {
+        const next = new Map(prev);
+        unsaved.forEach(p => next.set(p.id, { ...p, saved: true }));
+        return next;
+      });
+      setEditingPositionDeskId(null);
+    } catch (err: any) {
+      alert(err.message || 'Failed to save layout');
+    } finally {
+      setSavingAll(false);
+    }
+  };
+
   const handleAssignPermanent = async (deskId: number, userId: number) => {
     const res = await authenticatedFetch(`${API_BASE_URL}/desks/${deskId}/assign-permanent/`, {
       method: 'POST',
@@ -633,6 +662,7 @@ const handleWheel = (e: React.WheelEvent) => {
   const bookedDesks    = desks.filter(d => d.is_booked).length;
   const permanentDesks = desks.filter(d => d.is_permanent).length;
   const availableDesks = totalDesks - bookedDesks - permanentDesks;
+  const unsavedCount   = [...deskPositions.values()].filter(p => !p.saved).length;
 
   const markerBgColor = (desk: Desk, isEditing: boolean): string => {
     if (isEditing || selectedDeskId === desk.id) return '#f59e0b';
@@ -685,6 +715,17 @@ const handleListDeskClick = (desk: Desk) => {
                 <div className={styles.leftPanel}>
                   <div className={styles.desksHeader}>
                     <Text size={400} weight="semibold">Desks ({desks.length})</Text>
+                    {unsavedCount > 0 && (
+                      <Button
+                        size="small"
+                        appearance="primary"
+                        icon={<Checkmark20Regular />}
+                        disabled={savingAll}
+                        onClick={handleSaveAllPositions}
+                      >
+                        {savingAll ? 'Saving...' : `Save all (${unsavedCount})`}
+                      </Button>
+                    )}
                   </div>
 
                   <div className={styles.desksList}>
@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useMemo } from 'react';
+import React, { useEffect, useState } from 'react';
 import { makeStyles, tokens, Text, Spinner } from '@fluentui/react-components';
 import {
   ClockRegular,
@@ -8,7 +8,7 @@ import {
   FlashRegular,
   DoorRegular,
 } from '@fluentui/react-icons';
-import { createBookingApi, type Booking } from '../../services/bookingApi';
+import { createBookingApi, type BookingStats } from '../../services/bookingApi';
 import { useAuth } from '../../contexts/AuthContext';
 import { usePreferences } from '../../contexts/PreferencesContext';
 
@@ -189,26 +189,6 @@ const useStyles = makeStyles({
 
 // ─── Helpers ──────────────────────────────────────────────────────────────────
 
-function startOfDay(d: Date): Date {
-  return new Date(d.getFullYear(), d.getMonth(), d.getDate());
-}
-function startOfWeek(d: Date): Date {
-  const dow = d.getDay();
-  const mon = new Date(d);
-  mon.setDate(d.getDate() - ((dow + 6) % 7));
-  return startOfDay(mon);
-}
-function startOfMonth(d: Date): Date {
-  return new Date(d.getFullYear(), d.getMonth(), 1);
-}
-function endOfMonth(d: Date): Date {
-  return new Date(d.getFullYear(), d.getMonth() + 1, 0, 23, 59, 59, 999);
-}
-
-function durationHours(b: Booking): number {
-  return (new Date(b.end_time).getTime() - new Date(b.start_time).getTime()) / 3_600_000;
-}
-
 function formatCountdown(ms: number): string {
   if (ms <= 0) return 'Now';
   const totalMins = Math.floor(ms / 60_000);
@@ -252,7 +232,7 @@ export const BookingStatsPanel: React.FC<BookingStatsPanelProps> = ({ refreshTok
   const { formatTime: prefFormatTime } = usePreferences();
   const fmt = (iso: string) => { try { return prefFormatTime(new Date(iso)); } catch { return ''; } };
 
-  const [bookings, setBookings] = useState<Booking[]>([]);
+  const [stats, setStats] = useState<BookingStats | null>(null);
   const [loading, setLoading] = useState(true);
   const [now, setNow] = useState(new Date());
 
@@ -262,102 +242,15 @@ export const BookingStatsPanel: React.FC<BookingStatsPanelProps> = ({ refreshTok
     return () => clearInterval(id);
   }, []);
 
-  // Fetch past 30 days + next 60 days for rich stats
+  // Figures are aggregated server-side; refetch when bookings change
   useEffect(() => {
     setLoading(true);
-    const past   = new Date(now); past.setDate(past.getDate() - 30);
-    const future = new Date(now); future.setDate(future.getDate() + 60);
-    bookingApi.getMyBookings({ start: past.toISOString(), end: future.toISOString() })
-      .then(data => setBookings(data))
-      .catch(() => setBookings([]))
+    bookingApi.getMyStats()
+      .then(data => setStats(data))
+      .catch(() => setStats(null))
       .finally(() => setLoading(false));
   }, [refreshToken]);
 
-  // ── Derived stats ──
-  const stats = useMemo(() => {
-    const weekStart  = startOfWeek(now);
-    const weekEnd    = new Date(weekStart); weekEnd.setDate(weekStart.getDate() + 7);
-    const monthStart = startOfMonth(now);
-    const monthEnd   = endOfMonth(now);
-
-    // Ongoing right now
-    const ongoing = bookings.find(b =>
-      new Date(b.start_time) <= now && new Date(b.end_time) > now
-    ) ?? null;
-
-    // Next upcoming booking
-    const next = bookings
-      .filter(b => new Date(b.start_time) > now)
-      .sort((a, b) => new Date(a.start_time).getTime() - new Date(b.start_time).getTime())[0] ?? null;
-
-    // This week — only count past portion of ongoing + future bookings fully in week
-    const weekBookings = bookings.filter(b => {
-      const s = new Date(b.start_time);
-      const e = new Date(b.end_time);
-      return s < weekEnd && e > weekStart;
-    });
-    const hoursThisWeek = weekBookings.reduce((sum, b) => {
-      const s = Math.max(new Date(b.start_time).getTime(), weekStart.getTime());
-      const e = Math.min(new Date(b.end_time).getTime(), weekEnd.getTime());
-      return sum + Math.max(0, (e - s) / 3_600_000);
-    }, 0);
-
-    // This month
-    const monthBookings = bookings.filter(b => {
-      const s = new Date(b.start_time);
-      const e = new Date(b.end_time);
-      return s < monthEnd && e > monthStart;
-    });
-    const hoursThisMonth = monthBookings.reduce((sum, b) => {
-      const s = Math.max(new Date(b.start_time).getTime(), monthStart.getTime());
-      const e = Math.min(new Date(b.end_time).getTime(), monthEnd.getTime());
-      return sum + Math.max(0, (e - s) / 3_600_000);
-    }, 0);
-
-    // Total upcoming (future only)
-    const upcomingCount = bookings.filter(b => new Date(b.end_time) > now).length;
-
-    // Most used location (by booking count, past 30 days)
-    const thirtyDaysAgo = new Date(now); thirtyDaysAgo.setDate(thirtyDaysAgo.getDate() - 30);
-    const recentBookings = bookings.filter(b => new Date(b.start_time) >= thirtyDaysAgo && new Date(b.end_time) <= now);
-    const locationCounts: Record<string, number> = {};
-    recentBookings.forEach(b => {
-      locationCounts[b.location_name] = (locationCounts[b.location_name] ?? 0) + 1;
-    });
-    const favouriteLocation = Object.entries(locationCounts)
-      .sort((a, b) => b[1] - a[1])[0]?.[0] ?? null;
-
-    // Most used desk (by hours, past 30 days)
-    const deskHours: Record<string, { name: string; room: string; hours: number }> = {};
-    recentBookings.forEach(b => {
-      const key = String(b.desk.id);
-      if (!deskHours[key]) deskHours[key] = { name: b.desk.name, room: b.room_name, hours: 0 };
-      deskHours[key].hours += durationHours(b);
-    });
-    const favouriteDesk = Object.values(deskHours)
-      .sort((a, b) => b.hours - a.hours)[0] ?? null;
-
-    // Busiest day of week (past 30 days, by number of bookings)
-    const dayCounts = [0, 0, 0, 0, 0, 0, 0];
-    recentBookings.forEach(b => {
-      dayCounts[new Date(b.start_time).getDay()]++;
-    });
-    const busiestDayIdx = dayCounts.indexOf(Math.max(...dayCounts));
-    const busiestDay = Math.max(...dayCounts) > 0 ? WEEKDAY_NAMES[busiestDayIdx] : null;
-
-    return {
-      ongoing,
-      next,
-      hoursThisWeek,
-      hoursThisMonth,
-      upcomingCount,
-      favouriteLocation,
-      favouriteDesk,
-      busiestDay,
-      weekBookingsCount: weekBookings.filter(b => new Date(b.start_time) >= now || (new Date(b.start_time) < now && new Date(b.end_time) > now)).length,
-    };
-  }, [bookings, now]);
-
   if (loading) {
     return (
       <div className={styles.loadingRow}>
@@ -366,6 +259,9 @@ export const BookingStatsPanel: React.FC<BookingStatsPanelProps> = ({ refreshTok
     );
   }
 
+  if (!stats) return null;
+
+  const busiestDay = stats.busiest_weekday != null ? WEEKDAY_NAMES[stats.busiest_weekday] : null;
   const nextMs = stats.next ? new Date(stats.next.start_time).getTime() - now.getTime() : null;
   const ongoingMs = stats.ongoing ? new Date(stats.ongoing.end_time).getTime() - now.getTime() : null;
 
@@ -378,7 +274,7 @@ export const BookingStatsPanel: React.FC<BookingStatsPanelProps> = ({ refreshTok
           <div className={styles.ongoingDot} />
           <div style={{ display: 'flex', flexDirection: 'column', gap: '1px', flex: 1, minWidth: 0 }}>
             <span className={styles.ongoingLabel}>Active now</span>
-            <span className={styles.ongoingValue}>{stats.ongoing.desk.name}</span>
+            <span className={styles.ongoingValue}>{stats.ongoing.desk_name}</span>
             <span className={styles.ongoingMeta}>
               {stats.ongoing.room_name} · {stats.ongoing.location_name}
             </span>
@@ -402,7 +298,7 @@ export const BookingStatsPanel: React.FC<BookingStatsPanelProps> = ({ refreshTok
           </div>
           <div className={styles.nextBannerContent}>
             <span className={styles.nextBannerLabel}>Next booking</span>
-            <span className={styles.nextBannerValue}>{stats.next.desk.name}</span>
+            <span className={styles.nextBannerValue}>{stats.next.desk_name}</span>
             <span className={styles.nextBannerMeta}>
               {stats.next.room_name} · {stats.next.location_name} · {fmt(stats.next.start_time)}–{fmt(stats.next.end_time)}
             </span>
@@ -419,28 +315,28 @@ export const BookingStatsPanel: React.FC<BookingStatsPanelProps> = ({ refreshTok
         <StatCard
           icon={<ClockRegular />}
           label="This week"
-          value={formatHours(stats.hoursThisWeek)}
-          sub={`${stats.weekBookingsCount} booking${stats.weekBookingsCount !== 1 ? 's' : ''}`}
+          value={formatHours(stats.hours_this_week)}
+          sub={`${stats.week_bookings} booking${stats.week_bookings !== 1 ? 's' : ''}`}
         />
 
         <StatCard
           icon={<CalendarCheckmarkRegular />}
           label="This month"
-          value={formatHours(stats.hoursThisMonth)}
+          value={formatHours(stats.hours_this_month)}
           sub="hours booked"
         />
 
         <StatCard
           icon={<FlashRegular />}
           label="Upcoming"
-          value={String(stats.upcomingCount)}
-          sub={`booking${stats.upcomingCount !== 1 ? 's' : ''}`}
+          value={String(stats.upcoming_count)}
+          sub={`booking${stats.upcoming_count !== 1 ? 's' : ''}`}
         />
 
         <StatCard
           icon={<BuildingRegular />}
           label="Top location"
-          value={stats.favouriteLocation ?? '—'}
+          value={stats.favourite_location ?? '—'}
           sub="last 30 days"
           compact
         />
@@ -448,15 +344,15 @@ export const BookingStatsPanel: React.FC<BookingStatsPanelProps> = ({ refreshTok
         <StatCard
           icon={<DoorRegular />}
           label="Fav desk"
-          value={stats.favouriteDesk?.name ?? '—'}
-          sub={stats.favouriteDesk ? stats.favouriteDesk.room : 'no history'}
+          value={stats.favourite_desk?.name ?? '—'}
+          sub={stats.favourite_desk ? stats.favourite_desk.room_name : 'no history'}
           compact
         />
 
         <StatCard
           icon={<ArrowTrendingRegular />}
           label="Busiest day"
-          value={stats.busiestDay ?? '—'}
+          value={busiestDay ?? '—'}
           sub="last 30 days"
         />
 
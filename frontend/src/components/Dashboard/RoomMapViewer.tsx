@@ -381,6 +381,17 @@ export const RoomMapViewer: React.FC<RoomMapViewerProps> = ({ room, onClose, onB
         } else if (data.type === 'room_maintenance') {
           setIsMaintenance(data.enabled);
           setMaintenanceBy(data.enabled ? (data.by ?? null) : null);
+        } else if (data.type === 'layout_changed') {
+          const deleted = new Set<number>(data.deleted_ids ?? []);
+          const changed = new Map<number, any>((data.desks ?? []).map((d: any) => [d.id, d]));
+          // Created desks need full booking state: reload them rather than guess
+          if ((data.created_ids ?? []).length > 0) {
+            onBookingChange?.();
+          }
+          setDesks(prev => prev
+            .filter(d => !deleted.has(d.id))
+            .map(d => changed.has(d.id) ? { ...d, ...changed.get(d.id) } : d)
+          );
         }
       },
     });
@@ -1,6 +1,7 @@
 import React, { createContext, useState, useEffect, useContext, type ReactNode } from 'react';
 import { useAuth } from './AuthContext';
 import { useTheme } from './ThemeContext';
+import { createBootstrapApi, type BootstrapData } from '../services/bootstrapApi';
 
 export interface UserPreferences {
   theme: 'light' | 'dark' | 'auto';
@@ -15,6 +16,8 @@ export interface UserPreferences {
 
 interface PreferencesContextType {
   preferences: UserPreferences | null;
+  /** The startup snapshot (topology, upcoming bookings, manager scope) fetched with the preferences */
+  bootstrap: BootstrapData | null;
   loading: boolean;
   updatePreferences: (updates: Partial<UserPreferences>) => Promise<void>;
   formatDate: (date: Date) => string;
@@ -40,6 +43,7 @@ export const PreferencesProvider: React.FC<{ children: ReactNode }> = ({ childre
   const { authenticatedFetch, user } = useAuth();
   const { setTheme } = useTheme();
   const [preferences, setPreferences] = useState<UserPreferences | null>(null);
+  const [bootstrap, setBootstrap] = useState<BootstrapData | null>(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -47,6 +51,7 @@ export const PreferencesProvider: React.FC<{ children: ReactNode }> = ({ childre
       fetchPreferences();
     } else {
       setPreferences(defaultPreferences);
+      setBootstrap(null);
       setLoading(false);
     }
   }, [user]);
@@ -61,9 +66,10 @@ export const PreferencesProvider: React.FC<{ children: ReactNode }> = ({ childre
   const fetchPreferences = async () => {
     try {
       setLoading(true);
-      const response = await authenticatedFetch(`${API_BASE_URL}/preferences/me/`);
-      const data = await response.json();
-      setPreferences(data);
+      // One round trip at startup: preferences arrive with the rest of the bootstrap data
+      const data = await createBootstrapApi(authenticatedFetch).getBootstrap();
+      setBootstrap(data);
+      setPreferences(data.preferences);
     } catch (error) {
       console.error('Error fetching preferences:', error);
       setPreferences(defaultPreferences);
@@ -165,6 +171,7 @@ export const PreferencesProvider: React.FC<{ children: ReactNode }> = ({ childre
     <PreferencesContext.Provider
       value={{
         preferences,
+        bootstrap,
         loading,
         updatePreferences,
         formatDate,
@@ -9,6 +9,7 @@ export type AuditAction =
   | 'desk_assigned'
   | 'desk_unassigned'
   | 'room_maintenance'
+  | 'room_layout_changed'
   | 'user_login'
   | 'user_logout';
 
@@ -18,6 +18,48 @@ export interface Booking {
   end_time: string;
 }
 
+/** Flat booking row (GET /bookings/compact/, WebSocket update_bookings) */
+export interface CompactBooking {
+  id: number;
+  desk_id: number;
+  desk_name: string;
+  room_id: number;
+  room_name: string;
+  floor_id: number;
+  floor_name: string;
+  location_id: number;
+  location_name: string;
+  user_id: number;
+  username: string;
+  start_time: string;
+  end_time: string;
+}
+
+/** GET /bookings/changes/ — delta since a sync token */
+export interface BookingChanges {
+  token: string;
+  upserts: CompactBooking[];
+  deleted_ids: number[];
+  has_more: boolean;
+}
+
+/** GET /bookings/stats/ — dashboard figures computed server-side */
+export interface BookingStats {
+  ongoing: CompactBooking | null;
+  next: CompactBooking | null;
+  hours_this_week: number;
+  week_bookings: number;
+  hours_this_month: number;
+  upcoming_count: number;
+  last_30_days: { bookings: number; hours: number };
+  favourite_location: string | null;
+  favourite_desk: { id: number; name: string; room_name: string; hours: number } | null;
+  /** 0 = Sunday … 6 = Saturday, like Date.getDay() */
+  busiest_weekday: number | null;
+  timezone: string;
+  generated_at: string;
+}
+
 export interface CreateBookingPayload {
   desk_id: number;
   start_time: string; // ISO 8601
@@ -50,6 +92,30 @@ export const createBookingApi = (
     return handleResponse<Booking[]>(response);
   },
 
+  /** Get the current user's dashboard stats; week/month boundaries follow the browser timezone */
+  async getMyStats(): Promise<BookingStats> {
+    const tz = Intl.DateTimeFormat().resolvedOptions().timeZone || 'UTC';
+    const qs = new URLSearchParams({ tz });
+    const response = await authenticatedFetch(`${API_BASE_URL}/bookings/stats/?${qs}`);
+    return handleResponse<BookingStats>(response);
+  },
+
+  /**
+   * Pull booking changes since a sync token (omit it to get the current token).
+   * Resolves to null when the token has expired and the range must be refetched.
+   */
+  async getBookingChanges(
+    since?: string,
+    filters: { room?: number; desk?: number; user?: number } = {}
+  ): Promise<BookingChanges | null> {
+    const qs = new URLSearchParams();
+    if (since !== undefined) qs.set('since', since);
+    Object.entries(filters).forEach(([k, v]) => { if (v !== undefined) qs.set(k, String(v)); });
+    const response = await authenticatedFetch(`${API_BASE_URL}/bookings/changes/?${qs}`);
+    if (response.status === 410) return null;
+    return handleResponse<BookingChanges>(response);
+  },
+
   /** Get bookings for a specific desk on a given date */
   async getDeskBookings(deskId: number, date: string): Promise<Booking[]> {
     const start = `${date}T00:00:00Z`;
@@ -0,0 +1,70 @@
+import type { CompactBooking } from './bookingApi';
+import type { UserPreferences } from '../contexts/PreferencesContext';
+
+const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
+
+export interface BootstrapLocation {
+  id: number;
+  name: string;
+  lat: number | null;
+  lng: number | null;
+  num_floors: number;
+  num_rooms: number;
+  num_desks: number;
+}
+
+export interface BootstrapCountry {
+  id: number;
+  name: string;
+  country_code: string | null;
+  lat: number | null;
+  lng: number | null;
+  locations: BootstrapLocation[];
+}
+
+/** GET /bootstrap/ — everything the app needs right after login */
+export interface BootstrapData {
+  me: {
+    username: string;
+    first_name: string;
+    last_name: string;
+    email: string;
+    is_staff: boolean;
+    is_superuser: boolean;
+    is_location_manager: boolean;
+    is_room_manager: boolean;
+    is_any_manager: boolean;
+    role: string;
+    groups: string[];
+  };
+  preferences: UserPreferences;
+  topology: BootstrapCountry[];
+  /** The user's bookings for today and the next 7 days */
+  bookings: CompactBooking[];
+  manager_scope: {
+    locations: { id: number; name: string }[];
+    rooms: { id: number; name: string; location_id: number }[];
+  };
+  timezone: string;
+  generated_at: string;
+}
+
+const handleResponse = async <T>(response: Response): Promise<T> => {
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({ detail: 'Request failed' }));
+    throw new Error(error.detail || error.error || `HTTP ${response.status}`);
+  }
+  return response.json();
+};
+
+export const createBootstrapApi = (
+  authenticatedFetch: (url: string, options?: RequestInit) => Promise<Response>
+) => ({
+  /** One round trip for profile, preferences, topology, upcoming bookings and manager scope */
+  async getBootstrap(): Promise<BootstrapData> {
+    const tz = Intl.DateTimeFormat().resolvedOptions().timeZone || 'UTC';
+    const qs = new URLSearchParams({ tz });
+    const response = await authenticatedFetch(`${API_BASE_URL}/bootstrap/?${qs}`);
+    return handleResponse<BootstrapData>(response);
+  },
+});